@@ -0,0 +1,80 @@
+"""
+Compares the legacy linear scan of client scopes against the compiled
+ClientAuthorizer of github_proxy.proxy, with and without the memoization of
+decisions, for clients with 10, 100 and 1000 scopes.
+
+Requests target a path that only the last scope of the client allows, which is
+the worst case of the linear scan.
+
+Usage: python -m benchmarks.bench_auth [--number N]
+"""
+import argparse
+import re
+import timeit
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+
+from github_proxy.proxy import ClientAuthorizer
+from github_proxy.proxy import ProxyClient
+from github_proxy.proxy import ProxyClientScope
+
+SCOPE_COUNTS = [10, 100, 1000]
+TOKEN = "H+hYxlecgRq7yfmhq2COlJk7tpSwDmdsp8thdPsnbnQ="
+
+Authorize = Callable[[str, str, str], Optional[str]]
+
+
+def make_scopes(count: int) -> Sequence[ProxyClientScope]:
+    return [
+        ProxyClientScope(
+            method=re.compile("GET|POST" if i % 2 else "GET"),
+            path=re.compile(f"/repos/org/repo-{i}/.*"),
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_authorizer(client: ProxyClient) -> Authorize:
+    client_tokens = {client.token: (client.name, client.scopes)}
+
+    def authorize(token: str, method: str, path: str) -> Optional[str]:
+        if token in client_tokens:
+            name, scopes = client_tokens[token]
+            for scope in scopes:
+                method_match = scope.method.match(method.lower()) or scope.method.match(
+                    method.upper()
+                )
+                if method_match and scope.path.match(path):
+                    return name
+
+        return None
+
+    return authorize
+
+
+def measure(authorize: Authorize, path: str, number: int) -> float:
+    assert authorize(TOKEN, "GET", path) == "bench"
+    return timeit.timeit(lambda: authorize(TOKEN, "GET", path), number=number) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'scopes':<8}{'authorizer':<12}{'us/auth':>10}")
+    for count in SCOPE_COUNTS:
+        client = ProxyClient(name="bench", token=TOKEN, scopes=make_scopes(count))
+        path = f"/repos/org/repo-{count - 1}/pulls"
+        for name, authorize in [
+            ("legacy", legacy_authorizer(client)),
+            ("compiled", ClientAuthorizer([client], maxsize=0).authorize),
+            ("memoized", ClientAuthorizer([client]).authorize),
+        ]:
+            elapsed = measure(authorize, path, args.number)
+            print(f"{count:<8}{name:<12}{elapsed * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
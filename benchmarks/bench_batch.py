@@ -0,0 +1,116 @@
+"""
+Compares single-key get/set against the batch get_many/set_many API of the
+redis cache backend, at 10, 100 and 1000 keys.
+
+Runs against the redis server of ``--redis-url`` if given. Otherwise, against
+an in-process stand-in of redis that simulates a round trip latency of
+``--rtt-ms`` per command (or pipeline).
+
+Usage: python -m benchmarks.bench_batch [--redis-url URL] [--rtt-ms MS]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from unittest import mock
+
+import werkzeug
+
+from github_proxy.cache import RedisCache
+from github_proxy.cache.backend import CacheKey
+
+BATCH_SIZES = [10, 100, 1000]
+
+
+class SimulatedRedis:
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.store: Dict[str, bytes] = {}
+
+    def get(self, name: str) -> Optional[bytes]:
+        self._sleep()
+        return self.store.get(name)
+
+    def setex(self, name: str, time: int, value: bytes) -> None:
+        self._sleep()
+        self.store[name] = value
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        self._sleep()
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "SimulatedPipeline":
+        return SimulatedPipeline(self)
+
+    def _sleep(self) -> None:
+        time.sleep(self.rtt)
+
+
+class SimulatedPipeline:
+    def __init__(self, client: SimulatedRedis) -> None:
+        self.client = client
+        self.items: Dict[str, bytes] = {}
+
+    def setex(self, name: str, time: int, value: bytes) -> None:
+        self.items[name] = value
+
+    def execute(self) -> None:
+        self.client._sleep()
+        self.client.store.update(self.items)
+
+
+def measure(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url")
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        cache_backend_url=args.redis_url or "redis://localhost:6379",
+        cache_ttl=60,
+        cache_compression="none",
+        cache_compression_min_size=1024,
+    )
+    if args.redis_url:
+        cache = RedisCache(config)
+    else:
+        client = SimulatedRedis(args.rtt_ms / 1e3)
+        with mock.patch("redis.Redis.from_url", return_value=client):
+            cache = RedisCache(config)
+
+    value = werkzeug.Response(
+        b'{"sha": "3a1b4e5c6d7f8a9b0c1d2e3f4a5b6c7d"}',
+        headers=[("Content-Type", "application/json; charset=utf-8")],
+    )
+
+    print(f"{'keys':>6}{'op':>6}{'single ms':>12}{'batch ms':>12}{'speedup':>10}")
+    for size in BATCH_SIZES:
+        keys: List[CacheKey] = [
+            (f"repos/foo/bar/commits/{i}", None, "application/json")
+            for i in range(size)
+        ]
+        set_single = measure(lambda: [cache.set(*key, value) for key in keys])
+        set_batch = measure(lambda: cache.set_many({key: value for key in keys}))
+        get_single = measure(lambda: [cache.get(*key) for key in keys])
+        get_batch = measure(lambda: cache.get_many(keys))
+
+        for op, single, batch in [
+            ("set", set_single, set_batch),
+            ("get", get_single, get_batch),
+        ]:
+            print(
+                f"{size:>6}{op:>6}{single:>12.1f}{batch:>12.1f}{single / batch:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
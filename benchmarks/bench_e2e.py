@@ -0,0 +1,454 @@
+"""
+End-to-end load benchmark of the proxy. The Flask app of example.py, served by
+a threaded WSGI server in a subprocess, proxies a local stub of the GitHub
+origin while concurrent clients load it.
+
+The stub origin responds after ``--latency-ms``, with stable ETag and
+Last-Modified validators per path (and 304s upon revalidation), and with rate
+limit headers. Under /search, all the tokens of the proxy but the last one have
+a budget of ``--token-budget`` requests, past which they are rate limited.
+
+Scenarios, run against the inmemory cache backend, and against the redis one if
+``--redis-url`` is given:
+
+- cold-miss: every request targets a distinct, uncached resource
+- warm-hit: requests target cached resources within their freshness window
+- revalidation: requests target cached resources, revalidated with 304s
+- token-exhaustion: requests target distinct resources under /search, draining
+  the budget of the tokens until the proxy fails over to the last token
+
+Throughput and latency percentiles are printed, and written as JSON to
+``--output`` for comparison across commits via ``--baseline``. The proxy is
+otherwise configured by the environment, eg ``CACHE_COMPRESSION``.
+
+Usage: python -m benchmarks.bench_e2e [--redis-url URL] [--latency-ms MS]
+       [--requests N] [--concurrency C] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+CLIENT_TOKEN = "H+hYxlecgRq7yfmhq2COlJk7tpSwDmdsp8thdPsnbnQ="
+# PATs of the proxy, in order of selection. The last one is never rate limited.
+PATS = [f"bench-pat-{i}" for i in range(4)]
+CORE_LIMIT = 5000
+READY_TIMEOUT = 30
+
+CLIENT_REGISTRY = f"""\
+---
+version: 1
+clients:
+  - name: bench
+    token: {CLIENT_TOKEN}
+cache_freshness:
+  - path: /fresh/.*
+    max_age: 3600
+...
+"""
+
+
+class StubOrigin(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, body_bytes: int, token_budget: int) -> None:
+        super().__init__(("127.0.0.1", 0), StubOriginHandler)
+        self.latency = latency
+        self.body = b"x" * body_bytes
+        self.token_budget = token_budget
+        self.reset_at = int(time.time()) + 3600
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        self.lock = threading.Lock()
+        self.spent: Dict[str, int] = Counter()
+        self.stats: Dict[str, int] = Counter()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def spend(self, token: str) -> int:
+        """Spend the search budget of a token. Returns the remaining budget."""
+        if token == PATS[-1]:
+            return self.token_budget
+
+        with self.lock:
+            self.spent[token] += 1
+            return self.token_budget - self.spent[token]
+
+    def count(self, outcome: str) -> None:
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.spent.clear()
+            self.stats.clear()
+
+    def reset_stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.stats)
+            self.stats.clear()
+            return stats
+
+
+class StubOriginHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubOrigin
+
+    def do_GET(self) -> None:
+        origin = self.server
+        time.sleep(origin.latency)
+
+        path = urlsplit(self.path).path
+        token = self.headers.get("Authorization", "").rpartition(" ")[2]
+        if path.startswith("/search"):
+            resource, limit = "search", origin.token_budget
+            remaining = origin.spend(token)
+        else:
+            resource, limit, remaining = "core", CORE_LIMIT, CORE_LIMIT - 1
+
+        headers = {
+            "x-ratelimit-limit": str(limit),
+            "x-ratelimit-remaining": str(max(remaining, 0)),
+            "x-ratelimit-reset": str(origin.reset_at),
+            "x-ratelimit-resource": resource,
+        }
+        if remaining < 0:
+            origin.count("rate_limited")
+            body = b'{"message": "API rate limit exceeded"}'
+            self._respond(403, headers, body)
+            return
+
+        etag = f'"{hashlib.sha1(path.encode()).hexdigest()}"'
+        headers.update({"ETag": etag, "Last-Modified": origin.last_modified})
+        if (
+            self.headers.get("If-None-Match") == etag
+            or self.headers.get("If-Modified-Since") == origin.last_modified
+        ):
+            origin.count("not_modified")
+            self._respond(304, headers, b"")
+            return
+
+        origin.count("ok")
+        body = json.dumps({"path": path, "data": origin.body.decode()}).encode()
+        self._respond(200, headers, body)
+
+    def _respond(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class Scenario(NamedTuple):
+    name: str
+    path: Callable[[str, int], str]
+    warm: bool
+
+
+SCENARIOS = [
+    Scenario("cold-miss", lambda run, i: f"repos/bench/{run}/cold/{i}", False),
+    Scenario("warm-hit", lambda run, i: f"fresh/{run}/{i}", True),
+    Scenario("revalidation", lambda run, i: f"repos/bench/{run}/warm/{i}", True),
+    # Last, since the tokens stay rate limited afterwards
+    Scenario("token-exhaustion", lambda run, i: f"search/{run}/{i}", False),
+]
+
+
+def serve_proxy(port: int) -> None:
+    sys.path.insert(0, str(ROOT))
+    from werkzeug.serving import make_server
+
+    from example import app
+
+    # example.py logs every request, which would skew the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_proxy(
+    origin: StubOrigin, backend_url: str, workdir: str
+) -> Tuple[subprocess.Popen, str]:  # type: ignore[type-arg]
+    registry = os.path.join(workdir, "clients.yml")
+    with open(registry, "w") as fp:
+        fp.write(CLIENT_REGISTRY)
+
+    env = {
+        env: value
+        for env, value in os.environ.items()
+        if not env.startswith(("GITHUB_PAT_", "GITHUB_APP_"))
+    }
+    env.update(
+        {
+            "GITHUB_API_URL": origin.url,
+            "CACHE_BACKEND_URL": backend_url,
+            "CLIENT_REGISTRY_FILE_PATH": registry,
+            "GITHUB_TOKEN_SELECTION": "ordered",
+            **{f"GITHUB_PAT_BENCH{i}": pat for i, pat in enumerate(PATS)},
+        }
+    )
+    port = get_free_port()
+    log = os.path.join(workdir, "proxy.log")
+    with open(log, "wb") as fp:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_e2e", "--serve-proxy", str(port)],
+            cwd=ROOT,
+            env=env,
+            stdout=fp,
+            stderr=subprocess.STDOUT,
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            if get(requests, f"{url}/zen").status_code == 200:
+                return process, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+
+    process.kill()
+    with open(log) as fp:
+        raise RuntimeError(f"The proxy failed to start:\n{fp.read()}")
+
+
+def get(session: Any, url: str) -> requests.Response:
+    return session.get(  # type: ignore[no-any-return]
+        url, headers={"Authorization": f"token {CLIENT_TOKEN}"}, timeout=30
+    )
+
+
+def run_load(
+    url: Callable[[int], str], number: int, concurrency: int
+) -> Dict[str, Any]:
+    indices: Iterator[int] = itertools.count()
+
+    def work() -> Tuple[List[float], int]:
+        latencies = []
+        errors = 0
+        with requests.Session() as session:
+            while True:
+                # Under the GIL, itertools.count hands out every index once
+                i = next(indices)
+                if i >= number:
+                    break
+                start = time.perf_counter()
+                try:
+                    ok = get(session, url(i)).status_code == 200
+                except requests.RequestException:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: work(), range(concurrency)))
+    duration = time.perf_counter() - start
+
+    latencies = [latency for worker, _ in results for latency in worker]
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+    }
+
+
+def run_backend(
+    origin: StubOrigin, backend_url: str, args: argparse.Namespace
+) -> Dict[str, Any]:
+    # Resources are distinct across runs, as the redis cache outlives them
+    run = uuid.uuid4().hex[:8]
+    origin.reset()
+    with tempfile.TemporaryDirectory() as workdir:
+        process, proxy_url = start_proxy(origin, backend_url, workdir)
+        try:
+            results = {}
+            for scenario in SCENARIOS:
+                keys = args.keys if scenario.warm else args.requests
+                path = scenario.path
+
+                def url(i: int) -> str:
+                    return f"{proxy_url}/{path(run, i % keys)}"
+
+                if scenario.warm:
+                    for i in range(keys):
+                        get(requests, url(i)).raise_for_status()
+                    time.sleep(args.settle)
+
+                origin.reset_stats()
+                results[scenario.name] = run_load(url, args.requests, args.concurrency)
+                results[scenario.name]["origin"] = origin.reset_stats()
+            return results
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(
+    results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None
+) -> None:
+    metrics = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+    header = f"{'backend':<10}{'scenario':<18}{'errors':>8}"
+    print(header + "".join(f"{metric:>16}" for metric in metrics))
+    for backend, scenarios in results.items():
+        if "skipped" in scenarios:
+            print(f"{backend:<10}skipped: {scenarios['skipped']}")
+            continue
+
+        for name, result in scenarios.items():
+            line = f"{backend:<10}{name:<18}{result['errors']:>8}"
+            base = (baseline or {}).get(backend, {}).get(name)
+            for metric in metrics:
+                value = f"{result[metric]:.1f}"
+                if base and base.get(metric):
+                    value += f" ({(result[metric] / base[metric] - 1) * 100:+.0f}%)"
+                line += f"{value:>16}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--serve-proxy", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--redis-url")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--keys", type=int, default=100, help="Resources of the warm scenarios"
+    )
+    parser.add_argument("--body-bytes", type=int, default=2048)
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        help=(
+            "Search budget of the tokens. Defaults to draining them halfway "
+            "through the token-exhaustion scenario."
+        ),
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=1,
+        help=(
+            "Time (in seconds) given to the asynchronous cache writes of the "
+            "warm-up requests"
+        ),
+    )
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    if args.serve_proxy is not None:
+        serve_proxy(args.serve_proxy)
+        return
+
+    if args.requests < 2:
+        parser.error("--requests must be at least 2")
+
+    token_budget = args.token_budget or max(1, args.requests // (2 * (len(PATS) - 1)))
+    origin = StubOrigin(args.latency_ms / 1000, args.body_bytes, token_budget)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+
+    backends = {"inmemory": "inmemory://", "redis": args.redis_url}
+    results: Dict[str, Any] = {}
+    try:
+        for backend, backend_url in backends.items():
+            if backend_url is None:
+                results[backend] = {"skipped": "no --redis-url"}
+                continue
+            results[backend] = run_backend(origin, backend_url, args)
+    finally:
+        origin.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "params": {
+                "latency_ms": args.latency_ms,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "keys": args.keys,
+                "body_bytes": args.body_bytes,
+                "token_budget": token_budget,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+            fp.write("\n")
+
+
+if __name__ == "__main__":
+    main()
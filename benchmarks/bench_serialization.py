@@ -0,0 +1,107 @@
+"""
+Compares the legacy JSON serialization of cached responses against the binary
+envelope of github_proxy.cache.serialization, in terms of encode/decode cost
+and stored bytes.
+
+Usage: python -m benchmarks.bench_serialization [--number N]
+"""
+import argparse
+import json
+import os
+import timeit
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+import werkzeug
+
+from github_proxy.cache.serialization import deserialize_value
+from github_proxy.cache.serialization import serialize_value
+
+HEADERS = [
+    ("Content-Type", "application/json; charset=utf-8"),
+    ("Etag", 'W/"3a1b4e5c6d7f8a9b0c1d2e3f4a5b6c7d"'),
+    ("Last-Modified", "Mon, 02 May 2022 10:00:00 GMT"),
+    ("X-RateLimit-Limit", "5000"),
+    ("X-RateLimit-Remaining", "4999"),
+    ("X-RateLimit-Reset", "1651485600"),
+    ("X-GitHub-Media-Type", "github.v3; format=json"),
+]
+
+
+def json_payload(items: int) -> bytes:
+    return json.dumps(
+        [
+            {
+                "id": i,
+                "title": f'Fix "quoted" bug #{i}',
+                "body": "Line one\nLine two\twith tab and unicode: ✓\n" * 4,
+                "user": {"login": f"user-{i}", "url": f"https://api.github.com/{i}"},
+            }
+            for i in range(items)
+        ]
+    ).encode()
+
+
+PAYLOADS = {
+    "zen": b"Keep it logically awesome.",
+    "pulls (100 items)": json_payload(100),
+    "commits (1000 items)": json_payload(1000),
+    "tarball (1MB)": os.urandom(1024 * 1024),
+}
+
+
+def legacy_serialize(value: werkzeug.Response) -> bytes:
+    return json.dumps(
+        (value.data.decode(), value.status_code, value.headers.to_wsgi_list())
+    ).encode()
+
+
+def legacy_deserialize(data: bytes) -> werkzeug.Response:
+    body, status, headers = json.loads(data)
+    return werkzeug.Response(response=body, status=status, headers=headers)
+
+
+def measure(
+    serialize: Callable[[werkzeug.Response], bytes],
+    deserialize: Callable[[bytes], werkzeug.Response],
+    value: werkzeug.Response,
+    number: int,
+) -> Optional[Dict[str, float]]:
+    try:
+        data = serialize(value)
+    except UnicodeDecodeError:
+        return None  # the serializer does not support binary bodies
+
+    encode = timeit.timeit(lambda: serialize(value), number=number) / number
+    decode = timeit.timeit(lambda: deserialize(data), number=number) / number
+    return {"encode_us": encode * 1e6, "decode_us": decode * 1e6, "bytes": len(data)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'payload':<22}{'format':<8}{'encode us':>12}{'decode us':>12}{'bytes':>12}"
+    )
+    for name, body in PAYLOADS.items():
+        value = werkzeug.Response(response=body, status=200, headers=HEADERS)
+        for fmt, serialize, deserialize in [
+            ("json", legacy_serialize, legacy_deserialize),
+            ("binary", serialize_value, deserialize_value),
+        ]:
+            result = measure(serialize, deserialize, value, args.number)
+            if result is None:
+                print(f"{name:<22}{fmt:<8}{'unsupported':>36}")
+                continue
+
+            print(
+                f"{name:<22}{fmt:<8}{result['encode_us']:>12.1f}"
+                f"{result['decode_us']:>12.1f}{result['bytes']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import logging
 from flask import Flask
 
 from github_proxy import blueprint
+from github_proxy import metrics_blueprint
 
 logging.basicConfig(format="%(asctime)s %(message)s", level=logging.DEBUG, force=True)
 
@@ -12,6 +13,7 @@ app.register_blueprint(blueprint)
 app.register_blueprint(
     blueprint, name="github_enterprise_proxy", url_prefix="/api/v3"
 )  # enterprise server
+app.register_blueprint(metrics_blueprint, url_prefix="/_proxy")  # /_proxy/metrics
 
 if __name__ == "__main__":
     app.run()
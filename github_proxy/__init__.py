@@ -1,9 +1,11 @@
+from github_proxy.async_proxy import AsyncProxy
 from github_proxy.cache import CacheBackend
 from github_proxy.cache import CacheBackendConfig
 from github_proxy.config import Config
 from github_proxy.github_tokens import GitHubAppConfig
 from github_proxy.github_tokens import GitHubTokenConfig
 from github_proxy.proxy import Proxy
+from github_proxy.proxy import TokensRateLimitedError
 from github_proxy.ratelimit import get_ratelimit_limit
 from github_proxy.ratelimit import get_ratelimit_remaining
 from github_proxy.ratelimit import get_ratelimit_reset
@@ -12,6 +14,8 @@ from github_proxy.telemetry import TelemetryCollector
 
 __all__ = [
     "Proxy",
+    "AsyncProxy",
+    "TokensRateLimitedError",
     "GitHubTokenConfig",
     "GitHubAppConfig",
     "TelemetryCollector",
@@ -26,8 +30,9 @@ __all__ = [
 
 try:
     from github_proxy.views import blueprint  # noqa: F401
+    from github_proxy.views import metrics_blueprint  # noqa: F401
 
-    __all__.append("blueprint")
+    __all__.extend(["blueprint", "metrics_blueprint"])
 except ImportError:
     # flask is not installed
     pass
@@ -0,0 +1,157 @@
+"""
+ASGI application serving the ``AsyncProxy``. The asyncio counterpart of the
+Flask blueprint of ``github_proxy.views``.
+
+Run with any ASGI server, eg ``uvicorn github_proxy.asgi:app``.
+"""
+import asyncio
+import logging
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import List
+from typing import MutableMapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import werkzeug
+
+from github_proxy.async_proxy import AsyncProxy
+from github_proxy.dependencies import get_async_proxy
+from github_proxy.dependencies import get_config
+
+logger = logging.getLogger(__name__)
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+CACHED_METHODS = {"GET"}
+UNCACHED_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class ProxyApp:
+    """
+    ASGI application proxying the requests of authorized clients to GitHub.
+    Clients authenticate via the ``Authorization: token <client token>`` header.
+
+    :param proxy: The proxy serving the requests. Defaults to the proxy
+                  configured from the environment, built upon the startup
+                  of the application.
+    :param url_prefixes: Prefixes of the request paths that are not forwarded to
+                         GitHub (eg ``/api/v3`` for GitHub Enterprise Server).
+                         The first matching prefix is stripped.
+    """
+
+    def __init__(
+        self,
+        proxy: Optional[AsyncProxy] = None,
+        url_prefixes: Sequence[str] = ("",),
+    ) -> None:
+        self._proxy = proxy
+        self.url_prefixes = [f"{prefix.rstrip('/')}/" for prefix in url_prefixes]
+
+    @property
+    def proxy(self) -> AsyncProxy:
+        if self._proxy is None:
+            self._proxy = get_async_proxy(get_config())
+        return self._proxy
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            request = await read_request(scope, receive)
+            resp = await self.handle(request)
+            await send_response(resp, send)
+
+    async def handle(self, request: werkzeug.Request) -> werkzeug.Response:
+        prefix = next(
+            (p for p in self.url_prefixes if request.path.startswith(p)), None
+        )
+        if prefix is None:
+            return werkzeug.Response("Not Found", status=404)
+
+        path = request.path[len(prefix) :]
+        if request.method not in CACHED_METHODS | UNCACHED_METHODS:
+            return werkzeug.Response("Method Not Allowed", status=405)
+
+        client = None
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "token" and token:
+            client = self.proxy.auth(token.strip(), request)
+        if client is None:
+            return werkzeug.Response(
+                "Unauthorized Access",
+                status=401,
+                headers={"WWW-Authenticate": 'token realm="Authentication Required"'},
+            )
+
+        if request.method in CACHED_METHODS:
+            return await self.proxy.cached_request(path, request, client)
+        return await self.proxy.request(path, request, client)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self._proxy is None:
+                    # Setting up the backends and warming up the proxy block,
+                    # hence the proxy is built off the event loop.
+                    try:
+                        self._proxy = await asyncio.to_thread(
+                            lambda: get_async_proxy(get_config())
+                        )
+                    except Exception as e:
+                        logger.exception("Failed building the proxy")
+                        await send(
+                            {"type": "lifespan.startup.failed", "message": str(e)}
+                        )
+                        return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._proxy is not None:
+                    await self._proxy.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def read_request(scope: Scope, receive: Receive) -> werkzeug.Request:
+    body: List[bytes] = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        body.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+
+    headers: List[Tuple[str, str]] = [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in scope["headers"]
+    ]
+    return werkzeug.Request.from_values(
+        path=scope["path"],
+        method=scope["method"],
+        query_string=scope["query_string"],
+        headers=headers,
+        data=b"".join(body),
+    )
+
+
+async def send_response(resp: werkzeug.Response, send: Send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": resp.status_code,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in resp.headers.to_wsgi_list()
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": resp.get_data()})
+
+
+# Serves both github.com (/) and GitHub Enterprise Server (/api/v3) style paths
+app = ProxyApp(url_prefixes=("/api/v3", ""))
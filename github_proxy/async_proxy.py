@@ -0,0 +1,321 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from datetime import timezone
+from typing import AsyncIterator
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # type: ignore
+
+import werkzeug
+from werkzeug.datastructures import Headers
+
+from github_proxy.cache.async_backend import AsyncCacheBackend
+from github_proxy.github_tokens import GitHubTokenConfig
+from github_proxy.github_tokens import RateLimitBudgets
+from github_proxy.github_tokens import RateLimited
+from github_proxy.github_tokens import TokenSelection
+from github_proxy.github_tokens import get_resource_owner
+from github_proxy.proxy import RESPONSE_FILTERED_HEADERS
+from github_proxy.proxy import BaseProxy
+from github_proxy.proxy import CacheFreshnessRule
+from github_proxy.proxy import ProxyClient
+from github_proxy.proxy import TokensRateLimitedError
+from github_proxy.proxy import copy_response
+from github_proxy.proxy import get_response_age
+from github_proxy.proxy import revalidated_response
+from github_proxy.ratelimit import get_ratelimit_bucket
+from github_proxy.requester import ConnectionStats
+from github_proxy.telemetry import TelemetryCollector
+from github_proxy.throttle import ConcurrencyThrottle
+from github_proxy.timing import CACHE_GET_PHASE
+from github_proxy.timing import CACHE_SET_PHASE
+from github_proxy.timing import FILTER_HEADERS_PHASE
+from github_proxy.timing import TOKEN_PHASE
+from github_proxy.timing import UPSTREAM_PHASE
+from github_proxy.timing import request_timing
+from github_proxy.timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncProxy(BaseProxy):
+    """
+    asyncio counterpart of the ``Proxy``, on top of the httpx HTTP client.
+    In-flight requests to GitHub do not hold a thread, hence a single process
+    can serve many concurrent slow requests.
+
+    Serves fresh cache hits, revalidates cached responses, and serves stale
+    responses on error, in the same fashion as the ``Proxy``. The write-behind,
+    coalescing, background revalidation, and streaming features of the ``Proxy``
+    are not supported.
+
+    :param cache: Asynchronous facade of the cache backend.
+    :param http_client: The HTTP client used for requesting GitHub (see
+                        ``build_async_requester``). Defaults to a client with
+                        the default settings of httpx, following redirects.
+
+    See ``Proxy`` for the description of the rest of the parameters.
+    """
+
+    def __init__(
+        self,
+        github_api_url: str,
+        github_token_config: GitHubTokenConfig,
+        cache: AsyncCacheBackend,
+        rate_limited: RateLimited,
+        tel_collector: TelemetryCollector,
+        clients: Sequence[ProxyClient] = (),
+        cache_freshness: Sequence[CacheFreshnessRule] = (),
+        stale_if_error: int = 0,
+        http_client: Optional["httpx.AsyncClient"] = None,
+        budgets: Optional[RateLimitBudgets] = None,
+        cooldowns: Optional[RateLimited] = None,
+        token_selection: TokenSelection = TokenSelection.ORDERED,
+        token_min_remaining: int = 0,
+        throttle: Optional[ConcurrencyThrottle] = None,
+        auth_cache_maxsize: int = 1024,
+        server_timing: bool = False,
+    ) -> None:
+        if httpx is None:
+            raise RuntimeError(
+                "The httpx package needs to be installed in order to "
+                "use the asyncio proxy: pip install github-proxy[asgi]"
+            )
+
+        super().__init__(
+            github_api_url,
+            github_token_config,
+            rate_limited,
+            tel_collector,
+            clients=clients,
+            cache_freshness=cache_freshness,
+            stale_if_error=stale_if_error,
+            budgets=budgets,
+            cooldowns=cooldowns,
+            token_selection=token_selection,
+            token_min_remaining=token_min_remaining,
+            throttle=throttle,
+            auth_cache_maxsize=auth_cache_maxsize,
+            server_timing=server_timing,
+        )
+        self.cache = cache
+        self.requester = http_client or httpx.AsyncClient(follow_redirects=True)
+        self.connection_stats = ConnectionStats()
+
+    async def request(
+        self, path: str, request: werkzeug.Request, client: str
+    ) -> werkzeug.Response:
+        """
+        Proxy a request to the GitHub origin without using the cache.
+        See ``Proxy.request``.
+        """
+        logger.info("%s client requesting %s %s", client, request.method, path)
+        self.tel_collector.collect_proxy_request_metrics(client, request)
+        with request_timing() as timing:
+            resp = await self._send_gh_request(path, request)
+
+        return self._collect_timing(client, request, resp, timing)
+
+    async def cached_request(
+        self, path: str, request: werkzeug.Request, client: str
+    ) -> werkzeug.Response:
+        """
+        Proxy a request for a cacheable resource to the GitHub origin.
+        See ``Proxy.cached_request``.
+        """
+        media_type = request.accept_mimetypes.best
+        qs = request.query_string.decode() or None
+        logger.info(
+            "%s client requesting %s %s %s, with Etag: %s, Last-Modified: %s",
+            client,
+            path,
+            qs,
+            media_type,
+            request.headers.get("If-None-Match"),
+            request.headers.get("If-Modified-Since"),
+        )
+
+        with request_timing() as timing:
+            resp, cache_hit = await self._cached_request(path, qs, media_type, request)
+
+            # Compressed cached responses are passed through to the clients that
+            # accept their content-coding.
+            encoding = resp.headers.get("Content-Encoding")
+            if encoding is not None and not request.accept_encodings[encoding]:
+                resp = self.cache.decompress(resp)
+
+        self.tel_collector.collect_proxy_request_metrics(
+            client, request, cache_hit=cache_hit
+        )
+        return self._collect_timing(client, request, resp, timing, cache_hit)
+
+    async def _cached_request(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+    ) -> Tuple[werkzeug.Response, Optional[bool]]:
+        with timed(CACHE_GET_PHASE):
+            cached_response = await self.cache.get(path, qs, media_type)
+
+        if cached_response is None:  # cache miss
+            resp = await self._send_gh_request(path, request)
+            etag_value, _ = resp.get_etag()
+            if not (etag_value or resp.last_modified):
+                return resp, None
+
+            await self._cache_set(path, qs, media_type, resp)
+            return resp, False
+
+        rule = self._get_freshness_rule(path)
+        age = get_response_age(cached_response, datetime.now(timezone.utc))
+        if rule is not None and age is not None and age < rule.max_age:
+            # fresh cache hit
+            fresh_response = copy_response(cached_response)
+            fresh_response.headers["Age"] = str(age)
+            return fresh_response, True
+
+        try:
+            # conditional request
+            resp = await self._send_gh_request(
+                path,
+                request,
+                etag=cached_response.headers.get("Etag"),
+                last_modified=cached_response.headers.get("Last-Modified"),
+            )
+        except (TokensRateLimitedError, httpx.HTTPError) as e:
+            reason = (
+                "rate_limited"
+                if isinstance(e, TokensRateLimitedError)
+                else type(e).__name__
+            )
+            fallback = self._stale_if_error(cached_response, age, request, reason)
+            if fallback is None:
+                raise
+            return fallback, True
+
+        if resp.status_code >= 500:
+            # Server errors must not replace the cached response
+            fallback = self._stale_if_error(
+                cached_response, age, request, str(resp.status_code)
+            )
+            return (resp, False) if fallback is None else (fallback, True)
+
+        if resp.status_code != 304:
+            await self._cache_set(path, qs, media_type, resp)
+            return resp, False
+
+        # The cached response was revalidated, hence its age (which freshness
+        # windows and stale-if-error are based on) is renewed.
+        cached_response = revalidated_response(cached_response, resp)
+        await self._cache_set(path, qs, media_type, cached_response)
+        return cached_response, True  # cache hit
+
+    async def _cache_set(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        resp: werkzeug.Response,
+    ) -> None:
+        if resp.date is None:
+            # The Date header marks the age of the cached response
+            resp.date = datetime.now(timezone.utc)
+
+        with timed(CACHE_SET_PHASE):
+            await self.cache.set(path, qs, media_type, resp)
+
+    async def _send_gh_request(
+        self,
+        path: str,
+        request: werkzeug.Request,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> werkzeug.Response:
+        headers = self._gh_request_headers(request, etag, last_modified)
+
+        # Generating the token of a GitHub App may require a request to GitHub,
+        # hence the token generator is advanced in a worker thread.
+        bucket = get_ratelimit_bucket(path)
+        owner = get_resource_owner(path)
+        if self._integrations_resolved:
+            tokens = self._tokens(bucket, owner)
+        else:
+            # Discovering the installations of the GitHub Apps requires requests
+            # to GitHub as well
+            tokens = await asyncio.to_thread(self._tokens, bucket, owner)
+        while True:
+            with timed(TOKEN_PHASE):
+                token = await asyncio.to_thread(next, tokens, None)
+            if token is None:
+                break
+
+            logger.info("Using %s %s token", token.origin.value, token.name)
+            # Adding auth
+            headers["Authorization"] = f"token {token.value}"
+
+            with timed(UPSTREAM_PHASE):
+                async with self._async_throttle_slot():
+                    resp = await self.requester.request(
+                        method=request.method,
+                        url=self._gh_url(path),
+                        content=request.get_data(),
+                        headers=headers,
+                        params=request.args.to_dict(),
+                        extensions={"trace": self.connection_stats.atrace},
+                    )
+            self.connection_stats.add_request()
+            self.tel_collector.collect_gh_response_metrics(token, resp)
+            self.tel_collector.collect_connection_reuse_metrics(
+                self.connection_stats.connections, self.connection_stats.requests
+            )
+
+            # The rate limit stores may be shared across processes via redis
+            rate_limited = await asyncio.to_thread(
+                self._record_rate_limit, token, resp, bucket
+            )
+            if not rate_limited:
+                with timed(FILTER_HEADERS_PHASE):
+                    # Filter response headers
+                    resp_headers = Headers(list(resp.headers.multi_items()))
+                    for h in RESPONSE_FILTERED_HEADERS:
+                        resp_headers.remove(h)
+
+                    return werkzeug.Response(
+                        response=resp.content,
+                        status=resp.status_code,
+                        headers=resp_headers,
+                    )
+
+        raise TokensRateLimitedError("All available GitHub tokens are rate limited")
+
+    @asynccontextmanager
+    async def _async_throttle_slot(self) -> AsyncIterator[None]:
+        if self.throttle is None:
+            yield
+            return
+
+        async with self.throttle.async_slot():
+            yield
+
+    async def health(self) -> bool:
+        """
+        Check that the proxy can successfully integrate with the GitHub origin.
+        """
+        resp = await self.cached_request(
+            "zen", werkzeug.Request.from_values(), "healthcheck"
+        )
+        return resp.status_code == 200
+
+    async def aclose(self) -> None:
+        """Release the connections of the proxy"""
+        await self.requester.aclose()
+        await self.cache.aclose()
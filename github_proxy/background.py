@@ -0,0 +1,157 @@
+import logging
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Callable
+from typing import Hashable
+from typing import List
+from typing import MutableMapping
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+Task = Callable[[], object]
+
+
+class OverflowPolicy(Enum):
+    DROP = "drop"
+    BLOCK = "block"
+
+
+class KeyedWorkQueue:
+    """
+    Bounded queue of tasks that are executed by a pool of daemon worker threads.
+
+    Every task is indexed by a key. Submitting a task for a key that is already
+    pending replaces the pending task, so that only the latest task of a key gets
+    executed (coalescing). Tasks of the same key are never executed concurrently,
+    which preserves the submission order of tasks sharing a key.
+
+    :param name: Name of the queue. Used for naming the worker threads.
+    :param maxsize: Max number of pending (not yet started) tasks.
+    :param workers: Number of worker threads.
+    :param overflow: What to do when submitting a task to a full queue. ``DROP``
+                     discards the submitted task, ``BLOCK`` waits for a free slot.
+    :param dedupe_in_flight: If set, tasks submitted while a task of the same key
+                             is being executed are discarded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        workers: int,
+        overflow: OverflowPolicy = OverflowPolicy.DROP,
+        dedupe_in_flight: bool = False,
+    ) -> None:
+        if maxsize < 1 or workers < 1:
+            raise ValueError("maxsize and workers must be positive")
+
+        self.name = name
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dedupe_in_flight = dedupe_in_flight
+        self.dropped = 0
+
+        self._pending: MutableMapping[Hashable, Task] = OrderedDict()
+        self._in_flight: Set[Hashable] = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self) -> int:
+        """Number of pending tasks"""
+        return len(self._pending)
+
+    def submit(self, key: Hashable, task: Task) -> bool:
+        """
+        Enqueue a task. Returns ``False`` if the task was discarded.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+
+            if key in self._pending:
+                self._pending[key] = task
+                return True
+
+            if self.dedupe_in_flight and key in self._in_flight:
+                return False
+
+            while len(self._pending) >= self.maxsize:
+                if self.overflow is OverflowPolicy.DROP or self._closed:
+                    self.dropped += 1
+                    return False
+                self._cond.wait()
+
+            self._pending[key] = task
+            self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until all the pending and running tasks are completed.
+        Returns ``False`` if the timeout expired before that.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._in_flight, timeout=timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Flush the queue and stop the worker threads. Tasks submitted after
+        closing the queue are discarded.
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout)
+
+        if not flushed:
+            logger.warning(
+                "%s queue closed with %d pending tasks", self.name, self.depth
+            )
+        return flushed
+
+    def _next_task(self) -> Optional[Tuple[Hashable, Task]]:
+        # Tasks whose key is already being executed are skipped, so that
+        # an older task never completes after a newer task of the same key.
+        for key in self._pending:
+            if key not in self._in_flight:
+                return key, self._pending.pop(key)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                next_task = self._next_task()
+                while next_task is None:
+                    if self._closed and not self._pending:
+                        return
+                    self._cond.wait()
+                    next_task = self._next_task()
+
+                key, task = next_task
+                self._in_flight.add(key)
+                self._cond.notify_all()
+
+            try:
+                task()
+            except Exception:
+                logger.exception("%s task %s failed", self.name, key)
+            finally:
+                with self._cond:
+                    self._in_flight.discard(key)
+                    self._cond.notify_all()
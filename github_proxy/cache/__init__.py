@@ -1,8 +1,13 @@
+from github_proxy.cache.async_backend import AsyncCacheBackend
+from github_proxy.cache.async_backend import AsyncRedisCache
 from github_proxy.cache.backend import CacheBackend
 from github_proxy.cache.backend import CacheBackendConfig
 from github_proxy.cache.inmemory import InMemoryCache
 from github_proxy.cache.redis import RedisCache
 from github_proxy.cache.redis import SecureRedisCache
+from github_proxy.cache.tiered import SecureTieredRedisCache
+from github_proxy.cache.tiered import TieredRedisCache
+from github_proxy.cache.writer import CacheWriter
 
 __all__ = [
     "CacheBackend",
@@ -10,4 +15,9 @@ __all__ = [
     "RedisCache",
     "SecureRedisCache",
     "InMemoryCache",
+    "TieredRedisCache",
+    "SecureTieredRedisCache",
+    "CacheWriter",
+    "AsyncCacheBackend",
+    "AsyncRedisCache",
 ]
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from typing import Optional
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None  # type: ignore
+
+from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.backend import CacheBackendConfig
+from github_proxy.cache.backend import Value
+from github_proxy.cache.inmemory import InMemoryCache
+from github_proxy.cache.redis import RedisCache
+from github_proxy.cache.serialization import deserialize_value
+from github_proxy.cache.serialization import serialize_value
+from github_proxy.telemetry import TelemetryCollector
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCacheBackend:
+    """
+    Asynchronous facade of a cache backend, used by the ``AsyncProxy``.
+
+    The operations of the backend are offloaded to a worker thread (see
+    ``offload``), so that blocking backends do not stall the event loop.
+    Backends with a native asyncio client (eg redis) override ``get`` and ``set``.
+
+    :param backend: The wrapped cache backend.
+    :param offload: Set to ``False`` for backends that never block (eg in-process
+                    caches), so that their operations run on the event loop.
+    """
+
+    def __init__(self, backend: CacheBackend, offload: bool = True) -> None:
+        self.backend = backend
+        self.offload = offload
+
+    async def get(
+        self, resource: str, filter_: Optional[str], representation: str
+    ) -> Optional[Value]:
+        if not self.offload:
+            return self.backend.get(resource, filter_, representation)
+
+        return await asyncio.to_thread(
+            self.backend.get, resource, filter_, representation
+        )
+
+    async def set(
+        self, resource: str, filter_: Optional[str], representation: str, value: Value
+    ) -> None:
+        if not self.offload:
+            return self.backend.set(resource, filter_, representation, value)
+
+        await asyncio.to_thread(
+            self.backend.set, resource, filter_, representation, value
+        )
+
+    def decompress(self, value: Value) -> Value:
+        return self.backend.decompress(value)
+
+    async def aclose(self) -> None:
+        """Release the resources of the backend"""
+
+    @classmethod
+    def factory(
+        cls,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ) -> "AsyncCacheBackend":
+        backend = CacheBackend.factory(config, tel_collector)
+
+        if isinstance(backend, InMemoryCache):
+            return cls(backend, offload=False)
+
+        if isinstance(backend, RedisCache):
+            if aioredis is not None:
+                return AsyncRedisCache(backend)
+
+            logger.warning(
+                "redis>=4.2 is required by the asyncio redis client. "
+                "Falling back to offloading cache operations to threads."
+            )
+
+        return cls(backend)
+
+
+class AsyncRedisCache(AsyncCacheBackend):
+    """
+    Redis cache backend on top of the asyncio redis client. Shares the keys and
+    the serialization of the entries of the ``RedisCache``.
+    """
+
+    def __init__(self, backend: RedisCache) -> None:
+        if aioredis is None:
+            raise RuntimeError(
+                "The redis>=4.2 package needs to be installed in order to "
+                "use the asyncio redis cache backend: pip install github-proxy[redis]"
+            )
+
+        super().__init__(backend)
+        self._client = aioredis.Redis.from_url(backend.config.cache_backend_url)
+
+    async def get(
+        self, resource: str, filter_: Optional[str], representation: str
+    ) -> Optional[Value]:
+        key = self.backend._make_key(resource, filter_, representation)
+        try:
+            serialized_value = await self._client.get(key)
+            if not serialized_value:
+                return None
+
+            return deserialize_value(serialized_value)
+        except Exception as e:
+            logger.error("Failed retrieving %s with error: %s", key, e)
+            return None
+
+    async def set(
+        self, resource: str, filter_: Optional[str], representation: str, value: Value
+    ) -> None:
+        key = self.backend._make_key(resource, filter_, representation)
+        try:
+            await self._client.setex(
+                name=key,
+                value=serialize_value(self.backend.compress(value)),
+                time=self.backend.config.cache_ttl,
+            )
+        except Exception as e:
+            logger.error("Failed setting %s with error: %s", key, e)
+
+    async def aclose(self) -> None:
+        await self._client.close()
@@ -1,21 +1,42 @@
 import logging
+import time
 from abc import ABC
 from abc import abstractmethod
+from contextlib import nullcontext
 from typing import ClassVar
+from typing import ContextManager
+from typing import List
+from typing import Mapping
 from typing import MutableMapping
 from typing import Optional
 from typing import Protocol
+from typing import Sequence
+from typing import Tuple
 from typing import Type
 from urllib.parse import urlparse
 
 import werkzeug
+from werkzeug.datastructures import Headers
+
+from github_proxy.cache.compression import Codec
+from github_proxy.telemetry import NoopTelemetryCollector
+from github_proxy.telemetry import TelemetryCollector
 
 logger = logging.getLogger(__name__)
 
 Value = werkzeug.Response
+# (resource, filter, representation)
+CacheKey = Tuple[str, Optional[str], str]
+
+# Defaults of the optional compression settings of CacheBackendConfig
+DEFAULT_COMPRESSION = "none"
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
 
 
 class CacheBackendConfig(Protocol):
+    # Optionally, configs may also set the compression of cached bodies, through
+    # cache_compression (str) and cache_compression_min_size (int). These are
+    # not part of the protocol, so that configs predating them still work.
     cache_backend_url: str
     cache_ttl: int
 
@@ -28,8 +49,15 @@ class CacheBackend(ABC):
         cls.scheme = scheme
         cls._registry[scheme] = cls
 
-    def __init__(self, config: CacheBackendConfig):
+    def __init__(
+        self,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ):
         self.config = config
+        self.tel_collector = tel_collector or NoopTelemetryCollector()
+        compression = getattr(config, "cache_compression", DEFAULT_COMPRESSION)
+        self.codec = None if compression == "none" else Codec.from_encoding(compression)
 
     @abstractmethod
     def _get(self, key: str) -> Optional[Value]:
@@ -39,6 +67,21 @@ class CacheBackend(ABC):
     def _set(self, key: str, value: Value) -> None:
         ...
 
+    def _get_many(self, keys: Sequence[str]) -> List[Optional[Value]]:
+        """
+        Batch version of ``_get``. Backends with a network round trip per
+        operation are encouraged to override it.
+        """
+        return [self._get(key) for key in keys]
+
+    def _set_many(self, items: Mapping[str, Value]) -> None:
+        """
+        Batch version of ``_set``. Backends with a network round trip per
+        operation are encouraged to override it.
+        """
+        for key, value in items.items():
+            self._set(key, value)
+
     @abstractmethod
     def _make_key(
         self, resource: str, filter_: Optional[str], representation: str
@@ -60,15 +103,122 @@ class CacheBackend(ABC):
     ) -> None:
         key = self._make_key(resource, filter_, representation)
         try:
-            self._set(key, value)
+            self._set(key, self.compress(value))
         except Exception as e:
             logger.error("Failed setting %s with error: %s", key, e)
 
+    def get_many(self, keys: Sequence[CacheKey]) -> List[Optional[Value]]:
+        """
+        Retrieve multiple values at once. The returned values are in the order
+        of ``keys``, with ``None`` in place of the missing values.
+        """
+        backend_keys = [self._make_key(*key) for key in keys]
+        try:
+            return self._get_many(backend_keys)
+        except Exception as e:
+            logger.error(
+                "Failed retrieving %d keys with error: %s", len(backend_keys), e
+            )
+            return [None] * len(backend_keys)
+
+    def set_many(self, items: Mapping[CacheKey, Value]) -> None:
+        """Store multiple values at once"""
+        backend_items = {
+            self._make_key(*key): self.compress(value) for key, value in items.items()
+        }
+        try:
+            self._set_many(backend_items)
+        except Exception as e:
+            logger.error("Failed setting %d keys with error: %s", len(backend_items), e)
+
+    def compress(self, value: Value) -> Value:
+        """
+        Compress the body of a value to be cached, if compression is enabled and
+        the body exceeds the size threshold. The content-coding of the compressed
+        body is recorded in the Content-Encoding header of the returned value.
+        """
+        if self.codec is None or "Content-Encoding" in value.headers:
+            return value
+
+        data = value.get_data()
+        min_size = getattr(
+            self.config, "cache_compression_min_size", DEFAULT_COMPRESSION_MIN_SIZE
+        )
+        if len(data) < min_size:
+            return value
+
+        start = time.perf_counter()
+        compressed_data = self.codec.compress(data)
+        self.tel_collector.collect_cache_compression_metrics(
+            self.codec.encoding,
+            "compress",
+            len(data),
+            len(compressed_data),
+            time.perf_counter() - start,
+        )
+        if len(compressed_data) >= len(data):
+            return value  # incompressible body
+
+        headers = Headers(value.headers)
+        headers["Content-Encoding"] = self.codec.encoding
+        headers.add("Vary", "Accept-Encoding")
+        return werkzeug.Response(
+            response=compressed_data, status=value.status, headers=headers
+        )
+
+    def decompress(self, value: Value) -> Value:
+        """
+        Inverse of ``compress``. Cached values are returned compressed by ``get``,
+        so that they can be passed through to clients accepting their
+        content-coding. This method inflates them for the rest of the clients.
+        """
+        encoding = value.headers.get("Content-Encoding")
+        if encoding is None:
+            return value
+
+        compressed_data = value.get_data()
+        start = time.perf_counter()
+        data = Codec.from_encoding(encoding).decompress(compressed_data)
+        self.tel_collector.collect_cache_compression_metrics(
+            encoding,
+            "decompress",
+            len(data),
+            len(compressed_data),
+            time.perf_counter() - start,
+        )
+
+        headers = Headers(value.headers)
+        del headers["Content-Encoding"]
+        return werkzeug.Response(response=data, status=value.status, headers=headers)
+
+    def lock(
+        self,
+        resource: str,
+        filter_: Optional[str],
+        representation: str,
+        timeout: float,
+        ttl: Optional[float] = None,
+    ) -> ContextManager[bool]:
+        """
+        Lock on a cache entry that is shared amongst all the processes using
+        the cache backend. The context manager yields whether the lock was
+        acquired within ``timeout`` seconds. The lock expires ``ttl`` seconds
+        (defaults to ``timeout``) after its acquisition, so that it does not
+        outlive a crashed process.
+
+        Backends that are not shared across processes do not need to implement it.
+        """
+        return nullcontext(False)
+
     @classmethod
-    def factory(cls, config: CacheBackendConfig) -> "CacheBackend":
+    def factory(
+        cls,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ) -> "CacheBackend":
         url_parse_result = urlparse(config.cache_backend_url)
 
         if url_parse_result.scheme not in cls._registry:
             raise RuntimeError(f"Cache backend {url_parse_result.scheme} not found")
 
-        return cls._registry[url_parse_result.scheme](config)
+        return cls._registry[url_parse_result.scheme](config, tel_collector)
@@ -0,0 +1,79 @@
+import zlib
+from abc import ABC
+from abc import abstractmethod
+from typing import ClassVar
+from typing import MutableMapping
+from typing import Type
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+
+class Codec(ABC):
+    """
+    Compression codec of cached response bodies. The encoding of the codec
+    must be a valid HTTP content-coding, so that compressed bodies can be
+    passed through to the clients as is.
+    """
+
+    encoding: ClassVar[str]
+    _registry: ClassVar[MutableMapping[str, Type["Codec"]]] = {}
+
+    def __init_subclass__(cls, encoding: str) -> None:
+        cls.encoding = encoding
+        cls._registry[encoding] = cls
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        ...
+
+    @classmethod
+    def from_encoding(cls, encoding: str) -> "Codec":
+        if encoding not in cls._registry:
+            raise RuntimeError(f"Compression codec {encoding} not found")
+
+        return cls._registry[encoding]()
+
+
+class GzipCodec(Codec, encoding="gzip"):
+    _WBITS = zlib.MAX_WBITS | 16  # gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(wbits=self._WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data, wbits=self._WBITS)
+
+
+class DeflateCodec(Codec, encoding="deflate"):
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec, encoding="zstd"):
+    def __init__(self) -> None:
+        if zstandard is None:
+            raise RuntimeError(
+                "The zstandard package needs to be installed in order to "
+                "use the zstd compression codec: pip install github-proxy[zstd]"
+            )
+
+        self._compressor = zstandard.ZstdCompressor()
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def decompress(self, data: bytes) -> bytes:
+        # Frames written by the compressor always embed the content size
+        return bytes(self._decompressor.decompress(data))
@@ -1,20 +1,98 @@
+import threading
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Sequence
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
 
 from cachetools import TTLCache
 
 from github_proxy.cache.backend import CacheBackend
 from github_proxy.cache.backend import CacheBackendConfig
 from github_proxy.cache.backend import Value
+from github_proxy.telemetry import TelemetryCollector
+
+
+def get_value_size(value: Value) -> int:
+    """Approximate memory footprint (in bytes) of a cached value"""
+    return len(value.get_data()) + sum(
+        len(name) + len(header_value) for name, header_value in value.headers
+    )
+
+
+class SizedTTLCache(TTLCache):  # type: ignore
+    """
+    TTL cache bounded both by the total size of its values (as weighed by
+    ``getsizeof``) and by its number of entries. The least recently used
+    entries are evicted first, once either bound is reached.
+
+    Keeps count of hits, misses and evictions. Values exceeding ``max_bytes``
+    are not cached at all.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int,
+        ttl: float,
+        getsizeof: Callable[[Any], int] = get_value_size,
+    ) -> None:
+        super().__init__(maxsize=max_bytes, ttl=ttl, getsizeof=getsizeof)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = super().get(key, default)
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key not in self:
+            self.expire()
+            while len(self) >= self.max_entries:
+                self.popitem()
+        super().__setitem__(key, value)
+
+    def popitem(self) -> Any:
+        # Only invoked upon evictions, expired entries are removed via ``expire``
+        item = super().popitem()
+        self.evictions += 1
+        return item
 
 
 class InMemoryCache(CacheBackend, scheme="inmemory"):
-    """Useful for testing purposes"""
+    """
+    Cache backend local to the process. Useful for testing purposes, or for
+    single process deployments.
+
+    Configured via the query parameters of the ``CACHE_BACKEND_URL``, eg
+    ``inmemory://?max_bytes=268435456&max_entries=65536``:
 
-    def __init__(self, config: CacheBackendConfig):
-        super().__init__(config)
-        self._store: TTLCache[str, Value] = TTLCache(
-            maxsize=1024, ttl=self.config.cache_ttl
+    * ``max_bytes``: Memory budget (in bytes) of the cached responses.
+    * ``max_entries``: Max number of cached responses.
+    """
+
+    def __init__(
+        self,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ):
+        super().__init__(config, tel_collector)
+        params = parse_qs(urlparse(self.config.cache_backend_url).query)
+        self._store = SizedTTLCache(
+            max_bytes=int(params.get("max_bytes", ["268435456"])[0]),
+            max_entries=int(params.get("max_entries", ["65536"])[0]),
+            ttl=self.config.cache_ttl,
         )
+        self._lock = threading.Lock()
 
     def _make_key(
         self, resource: str, filter_: Optional[str], representation: str
@@ -22,7 +100,41 @@ class InMemoryCache(CacheBackend, scheme="inmemory"):
         return f"{resource}/{filter_}/{representation}"
 
     def _get(self, key: str) -> Optional[Value]:
-        return self._store.get(key)
+        with self._lock:
+            value: Optional[Value] = self._store.get(key)
+        self.collect_stats()
+        return value
 
     def _set(self, key: str, value: Value) -> None:
-        self._store[key] = value
+        with self._lock:
+            try:
+                self._store[key] = value
+            except ValueError:
+                # The value exceeds the memory budget of the cache
+                self._store.pop(key, None)
+        self.collect_stats()
+
+    def _get_many(self, keys: Sequence[str]) -> List[Optional[Value]]:
+        with self._lock:
+            values: List[Optional[Value]] = [self._store.get(key) for key in keys]
+        self.collect_stats()
+        return values
+
+    def _set_many(self, items: Mapping[str, Value]) -> None:
+        with self._lock:
+            for key, value in items.items():
+                try:
+                    self._store[key] = value
+                except ValueError:
+                    self._store.pop(key, None)
+        self.collect_stats()
+
+    def collect_stats(self) -> None:
+        self.tel_collector.collect_cache_memory_metrics(
+            self.scheme,
+            entries=len(self._store),
+            size=int(self._store.currsize),
+            hits=self._store.hits,
+            misses=self._store.misses,
+            evictions=self._store.evictions,
+        )
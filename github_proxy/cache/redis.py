@@ -1,9 +1,10 @@
-import json
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+from typing import List
+from typing import Mapping
 from typing import Optional
 from typing import Sequence
-from typing import Tuple
-
-import werkzeug
 
 try:
     import redis
@@ -13,35 +14,31 @@ except ImportError:
 from github_proxy.cache.backend import CacheBackend
 from github_proxy.cache.backend import CacheBackendConfig
 from github_proxy.cache.backend import Value
+from github_proxy.cache.serialization import deserialize_value
+from github_proxy.cache.serialization import serialize_value
+from github_proxy.telemetry import TelemetryCollector
 
-SerializedValue = Tuple[str, int, Sequence[Tuple[str, str]]]
-
-
-def serialize_value(value: Value) -> SerializedValue:
-    return (value.data.decode(), value.status_code, value.headers.to_wsgi_list())
-
-
-def deserialize_value(value: SerializedValue) -> Value:
-    data, status_code, headers = value
-    return werkzeug.Response(
-        response=data,
-        status=status_code,
-        headers=headers,
-    )
+logger = logging.getLogger(__name__)
 
 
 class RedisCache(CacheBackend, scheme="redis"):
-    def __init__(self, config: CacheBackendConfig):
+    def __init__(
+        self,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ):
         if redis is None:
             raise RuntimeError(
                 "The redis package needs to be installed in order to "
                 "use the redis cache backend: pip install github-proxy[redis]"
             )
 
-        super().__init__(config)
-        self._client = redis.Redis.from_url(
-            config.cache_backend_url, decode_responses=True
-        )
+        super().__init__(config, tel_collector)
+        self._client = redis.Redis.from_url(config.cache_backend_url)
+
+    @property
+    def client(self) -> "redis.Redis[bytes]":
+        return self._client
 
     def _make_key(
         self, resource: str, filter_: Optional[str], representation: str
@@ -49,22 +46,67 @@ class RedisCache(CacheBackend, scheme="redis"):
         return f"cached:{resource}:{filter_}:{representation}"
 
     def _get(self, key: str) -> Optional[Value]:
-        json_serialized_value = self._client.get(key)
-        if not json_serialized_value:
+        serialized_value = self._client.get(key)
+        if not serialized_value:
             return None
 
-        serialized_value = json.loads(json_serialized_value)
         return deserialize_value(serialized_value)
 
     def _set(self, key: str, value: Value) -> None:
-        serialized_value = serialize_value(value)
-
         self._client.setex(
             name=key,
-            value=json.dumps(serialized_value),
+            value=serialize_value(value),
             time=self.config.cache_ttl,
         )
 
+    def _get_many(self, keys: Sequence[str]) -> List[Optional[Value]]:
+        if not keys:
+            return []
+
+        return [
+            deserialize_value(serialized_value) if serialized_value else None
+            for serialized_value in self._client.mget(keys)
+        ]
+
+    def _set_many(self, items: Mapping[str, Value]) -> None:
+        # A single round trip, without the atomicity of a MULTI/EXEC transaction
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.setex(
+                name=key,
+                value=serialize_value(value),
+                time=self.config.cache_ttl,
+            )
+        pipeline.execute()
+
+    @contextmanager
+    def lock(
+        self,
+        resource: str,
+        filter_: Optional[str],
+        representation: str,
+        timeout: float,
+        ttl: Optional[float] = None,
+    ) -> Iterator[bool]:
+        key = f"lock:{self._make_key(resource, filter_, representation)}"
+        lock = self._client.lock(
+            key, timeout=timeout if ttl is None else ttl, blocking_timeout=timeout
+        )
+        try:
+            acquired = bool(lock.acquire())
+        except redis.RedisError as e:
+            logger.error("Failed acquiring %s with error: %s", key, e)
+            acquired = False
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except redis.RedisError as e:
+                    logger.warning("Failed releasing %s with error: %s", key, e)
+
 
 class SecureRedisCache(RedisCache, scheme="rediss"):
     pass
@@ -0,0 +1,77 @@
+import json
+import struct
+from typing import List
+from typing import Tuple
+
+import werkzeug
+
+from github_proxy.cache.backend import Value
+
+MAGIC = b"GHP"
+VERSION = 1
+
+_PREAMBLE = struct.Struct(">3sBHH")
+_HEADER = struct.Struct(">HI")
+
+
+def serialize_value(value: Value) -> bytes:
+    """
+    Serialize a response into a binary envelope. Layout of the envelope
+    (version 1), with all integers in network byte order::
+
+        magic (3B) | version (1B) | status (2B) | header count (2B)
+        name length (2B) | value length (4B) | name | value  # for every header
+        body
+
+    The body is stored as raw bytes, hence the envelope is safe for non UTF-8
+    payloads (eg archives), and does not inflate payloads through text escaping.
+    """
+    headers = [
+        (name.encode(), header_value.encode())
+        for name, header_value in value.headers.to_wsgi_list()
+    ]
+    chunks = [_PREAMBLE.pack(MAGIC, VERSION, value.status_code, len(headers))]
+    for name, header_value in headers:
+        chunks.append(_HEADER.pack(len(name), len(header_value)))
+        chunks.append(name)
+        chunks.append(header_value)
+
+    chunks.append(value.get_data())
+    return b"".join(chunks)
+
+
+def deserialize_value(data: bytes) -> Value:
+    if not data.startswith(MAGIC):
+        return _deserialize_json_value(data)
+
+    _, version, status_code, header_count = _PREAMBLE.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported serialization version: {version}")
+
+    offset = _PREAMBLE.size
+    headers: List[Tuple[str, str]] = []
+    for _ in range(header_count):
+        name_length, value_length = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        name = data[offset : offset + name_length]
+        offset += name_length
+        header_value = data[offset : offset + value_length]
+        offset += value_length
+        headers.append((name.decode(), header_value.decode()))
+
+    return werkzeug.Response(
+        response=data[offset:],
+        status=status_code,
+        headers=headers,
+    )
+
+
+def _deserialize_json_value(data: bytes) -> Value:
+    # Entries written before the introduction of the binary envelope are
+    # JSON encoded (body, status, headers) tuples.
+    body, status_code, headers = json.loads(data)
+    return werkzeug.Response(
+        response=body,
+        status=status_code,
+        headers=headers,
+    )
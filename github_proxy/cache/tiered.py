@@ -0,0 +1,185 @@
+import copy
+import logging
+import threading
+import uuid
+from typing import Any
+from typing import ContextManager
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from urllib.parse import parse_qs
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:
+    redis = None  # type: ignore
+
+from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.backend import CacheBackendConfig
+from github_proxy.cache.backend import Value
+from github_proxy.cache.inmemory import SizedTTLCache
+from github_proxy.cache.redis import RedisCache
+from github_proxy.telemetry import TelemetryCollector
+
+logger = logging.getLogger(__name__)
+
+TIERED_SCHEME_PREFIX = "tiered+"
+INVALIDATION_CHANNEL = "github-proxy:invalidations"
+
+
+class TieredRedisCache(CacheBackend, scheme="tiered+redis"):
+    """
+    Two-tier cache backend. A bounded in-process L1 cache (LRU with TTL) sits in
+    front of a redis L2 cache, sparing the redis round trip and deserialization
+    of hot entries. Reads go through L1, and writes go through both tiers.
+
+    Configured via the query parameters of the ``CACHE_BACKEND_URL``, eg
+    ``tiered+redis://localhost:6379/0?l1_max_bytes=67108864&l1_ttl=60``:
+
+    * ``l1_max_bytes``: Memory budget (in bytes) of L1.
+    * ``l1_max_entries``: Max number of L1 entries.
+    * ``l1_ttl``: TTL (in seconds) of L1 entries.
+    * ``l1_invalidation``: Set to ``pubsub`` in order to evict L1 entries of all
+      the processes when an entry is written, using redis pub/sub.
+
+    The rest of the URL configures the redis L2 cache.
+    """
+
+    def __init__(
+        self,
+        config: CacheBackendConfig,
+        tel_collector: Optional[TelemetryCollector] = None,
+    ):
+        super().__init__(config, tel_collector)
+
+        url = urlparse(config.cache_backend_url)
+        params = parse_qs(url.query)
+        l1_max_bytes = int(_pop_param(params, "l1_max_bytes", "67108864"))
+        l1_max_entries = int(_pop_param(params, "l1_max_entries", "65536"))
+        l1_ttl = int(_pop_param(params, "l1_ttl", "60"))
+        l1_invalidation = _pop_param(params, "l1_invalidation", "none").lower()
+
+        l2_config = copy.copy(config)
+        l2_config.cache_backend_url = url._replace(
+            scheme=url.scheme[len(TIERED_SCHEME_PREFIX) :],
+            query=urlencode(params, doseq=True),
+        ).geturl()
+        self._l2 = RedisCache(l2_config, tel_collector)
+
+        self._l1 = SizedTTLCache(
+            max_bytes=l1_max_bytes, max_entries=l1_max_entries, ttl=l1_ttl
+        )
+        self._l1_lock = threading.Lock()
+
+        # Identifies the invalidation messages published by this process
+        self._id = uuid.uuid4().hex
+        self._pubsub_thread = None
+        if l1_invalidation == "pubsub":
+            pubsub = self._l2.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    @property
+    def client(self) -> "redis.Redis[bytes]":
+        return self._l2.client
+
+    def _make_key(
+        self, resource: str, filter_: Optional[str], representation: str
+    ) -> str:
+        return self._l2._make_key(resource, filter_, representation)
+
+    def _get(self, key: str) -> Optional[Value]:
+        with self._l1_lock:
+            value: Optional[Value] = self._l1.get(key)
+        self.collect_l1_stats()
+        if value is not None:
+            return value
+
+        value = self._l2._get(key)
+        if value is not None:
+            self._set_l1(key, value)
+        return value
+
+    def _set(self, key: str, value: Value) -> None:
+        self._l2._set(key, value)
+        self._set_l1(key, value)
+
+        if self._pubsub_thread is not None:
+            self._l2.client.publish(INVALIDATION_CHANNEL, f"{self._id}:{key}")
+
+    def _get_many(self, keys: Sequence[str]) -> List[Optional[Value]]:
+        with self._l1_lock:
+            values: List[Optional[Value]] = [self._l1.get(key) for key in keys]
+        self.collect_l1_stats()
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            l2_values = self._l2._get_many([keys[i] for i in missing])
+            for i, value in zip(missing, l2_values):
+                values[i] = value
+                if value is not None:
+                    self._set_l1(keys[i], value)
+        return values
+
+    def _set_many(self, items: Mapping[str, Value]) -> None:
+        self._l2._set_many(items)
+        for key, value in items.items():
+            self._set_l1(key, value)
+
+        if self._pubsub_thread is not None and items:
+            pipeline = self._l2.client.pipeline(transaction=False)
+            for key in items:
+                pipeline.publish(INVALIDATION_CHANNEL, f"{self._id}:{key}")
+            pipeline.execute()
+
+    def _set_l1(self, key: str, value: Value) -> None:
+        with self._l1_lock:
+            try:
+                self._l1[key] = value
+            except ValueError:
+                # The value exceeds the memory budget of L1
+                self._l1.pop(key, None)
+        self.collect_l1_stats()
+
+    def collect_l1_stats(self) -> None:
+        self.tel_collector.collect_cache_memory_metrics(
+            self.scheme,
+            entries=len(self._l1),
+            size=int(self._l1.currsize),
+            hits=self._l1.hits,
+            misses=self._l1.misses,
+            evictions=self._l1.evictions,
+        )
+
+    def _on_invalidation(self, message: Mapping[str, Any]) -> None:
+        data = message["data"]
+        if isinstance(data, bytes):
+            data = data.decode()
+
+        origin, _, key = data.partition(":")
+        if origin != self._id:
+            with self._l1_lock:
+                self._l1.pop(key, None)
+
+    def lock(
+        self,
+        resource: str,
+        filter_: Optional[str],
+        representation: str,
+        timeout: float,
+        ttl: Optional[float] = None,
+    ) -> ContextManager[bool]:
+        return self._l2.lock(resource, filter_, representation, timeout, ttl)
+
+
+class SecureTieredRedisCache(TieredRedisCache, scheme="tiered+rediss"):
+    pass
+
+
+def _pop_param(params: Dict[str, List[str]], name: str, default: str) -> str:
+    values = params.pop(name, None)
+    return values[0] if values else default
@@ -0,0 +1,65 @@
+import logging
+from functools import partial
+from typing import Optional
+
+from github_proxy.background import KeyedWorkQueue
+from github_proxy.background import OverflowPolicy
+from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.backend import Value
+from github_proxy.telemetry import TelemetryCollector
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWriter:
+    """
+    Write-behind layer on top of a cache backend. Writes are queued and persisted
+    by background worker threads, so that the latency of the cache backend does
+    not impact the response time of the proxy.
+
+    Queued writes of the same cache entry are coalesced, meaning that only the
+    most recent value of an entry is persisted.
+
+    :param cache: The cache backend that the values are written to.
+    :param tel_collector: Collector of the queue depth and dropped writes.
+    :param maxsize: Max number of queued writes.
+    :param workers: Number of worker threads persisting the queued writes.
+    :param overflow: Policy applied when the queue is full. Writes are either
+                     dropped or the caller blocks until the queue frees up.
+    """
+
+    def __init__(
+        self,
+        cache: CacheBackend,
+        tel_collector: TelemetryCollector,
+        maxsize: int = 1024,
+        workers: int = 2,
+        overflow: OverflowPolicy = OverflowPolicy.DROP,
+    ) -> None:
+        self.cache = cache
+        self.tel_collector = tel_collector
+        self._queue = KeyedWorkQueue(
+            "cache-writer", maxsize=maxsize, workers=workers, overflow=overflow
+        )
+
+    def set(
+        self, resource: str, filter_: Optional[str], representation: str, value: Value
+    ) -> None:
+        accepted = self._queue.submit(
+            (resource, filter_, representation),
+            partial(self.cache.set, resource, filter_, representation, value),
+        )
+        if not accepted:
+            logger.debug("Cache writer queue is full. Dropped write of %s", resource)
+
+        self.tel_collector.collect_cache_write_queue_metrics(
+            self._queue.depth, dropped=not accepted
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until all queued writes are persisted"""
+        return self._queue.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Persist all queued writes and stop the worker threads"""
+        return self._queue.close(timeout)
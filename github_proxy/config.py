@@ -15,11 +15,16 @@ from dacite.core import from_dict
 from jinja2 import Environment
 from jinja2 import FileSystemLoader
 
+from github_proxy.background import OverflowPolicy
 from github_proxy.cache.backend import CacheBackendConfig
 from github_proxy.github_tokens import GitHubAppConfig
 from github_proxy.github_tokens import GitHubTokenConfig
+from github_proxy.github_tokens import TokenSelection
+from github_proxy.proxy import CacheFreshnessRule
+from github_proxy.proxy import GraphQLCacheRule
 from github_proxy.proxy import ProxyClient
 from github_proxy.proxy import validate_clients
+from github_proxy.requester import RequesterConfig
 
 _DESERIALIZATION_CONFIG = DaciteConfig(type_hooks={re.Pattern: re.compile})
 
@@ -28,6 +33,8 @@ _DESERIALIZATION_CONFIG = DaciteConfig(type_hooks={re.Pattern: re.compile})
 class ClientRegistry:
     version: int = 1
     clients: Sequence[ProxyClient] = field(default_factory=list)
+    cache_freshness: Sequence[CacheFreshnessRule] = field(default_factory=list)
+    graphql_cache: Sequence[GraphQLCacheRule] = field(default_factory=list)
 
     def __post_init__(self) -> None:
         validate_clients(self.clients)
@@ -37,7 +44,7 @@ class ClientRegistry:
         return from_dict(cls, data, config=_DESERIALIZATION_CONFIG)
 
 
-class Config(GitHubTokenConfig, CacheBackendConfig):
+class Config(GitHubTokenConfig, CacheBackendConfig, RequesterConfig):
     def __init__(self, config_dict: Optional[Mapping[str, str]] = None):
         # NOTE: When adding new config items, do not forget to update the
         # Configuration table in the README docs.
@@ -49,9 +56,68 @@ class Config(GitHubTokenConfig, CacheBackendConfig):
             "GITHUB_API_URL", "https://api.github.com"
         )
 
+        # Configuring the connections to GitHub:
+        self.github_pool_maxsize = int(config_dict.get("GITHUB_POOL_MAXSIZE", "10"))
+        self.github_pool_block = Config._get_bool(config_dict, "GITHUB_POOL_BLOCK")
+        self.github_connect_timeout = Config._get_timeout(
+            config_dict, "GITHUB_CONNECT_TIMEOUT", "10"
+        )
+        self.github_read_timeout = Config._get_timeout(
+            config_dict, "GITHUB_READ_TIMEOUT", "60"
+        )
+        self.github_retries = int(config_dict.get("GITHUB_RETRIES", "0"))
+        self.github_retry_backoff_factor = float(
+            config_dict.get("GITHUB_RETRY_BACKOFF_FACTOR", "0.5")
+        )
+        self.github_http2 = Config._get_bool(config_dict, "GITHUB_HTTP2")
+
         # Configuring the cache that persists GitHub responses:
         self.cache_ttl = int(config_dict.get("CACHE_TTL", "3600"))
         self.cache_backend_url = config_dict.get("CACHE_BACKEND_URL", "inmemory://")
+        self.cache_compression = config_dict.get("CACHE_COMPRESSION", "none").lower()
+        self.cache_compression_min_size = int(
+            config_dict.get("CACHE_COMPRESSION_MIN_SIZE", "1024")
+        )
+
+        # Configuring the asynchronous (write-behind) population of the cache:
+        self.cache_write_behind = Config._get_bool(config_dict, "CACHE_WRITE_BEHIND")
+        self.cache_write_queue_maxsize = int(
+            config_dict.get("CACHE_WRITE_QUEUE_MAXSIZE", "1024")
+        )
+        self.cache_write_workers = int(config_dict.get("CACHE_WRITE_WORKERS", "2"))
+        self.cache_write_overflow = OverflowPolicy(
+            config_dict.get("CACHE_WRITE_OVERFLOW", "drop").lower()
+        )
+        self.cache_write_flush_timeout = float(
+            config_dict.get("CACHE_WRITE_FLUSH_TIMEOUT", "5")
+        )
+
+        # Configuring the background revalidation of stale cached responses:
+        self.cache_refresh_workers = int(config_dict.get("CACHE_REFRESH_WORKERS", "2"))
+        self.cache_refresh_queue_maxsize = int(
+            config_dict.get("CACHE_REFRESH_QUEUE_MAXSIZE", "256")
+        )
+
+        # Configuring the max age of cached responses served on GitHub errors:
+        self.cache_stale_if_error = int(config_dict.get("CACHE_STALE_IF_ERROR", "0"))
+
+        # Configuring the streaming of GitHub responses to the clients:
+        self.stream_responses = Config._get_bool(config_dict, "STREAM_RESPONSES")
+        self.cache_max_body_size = int(
+            config_dict.get("CACHE_MAX_BODY_SIZE", "10485760")
+        )
+
+        # Configuring the coalescing of concurrent requests for the same resource:
+        self.request_coalescing = Config._get_bool(config_dict, "REQUEST_COALESCING")
+        self.request_coalescing_timeout = float(
+            config_dict.get("REQUEST_COALESCING_TIMEOUT", "10")
+        )
+        self.request_coalescing_distributed = Config._get_bool(
+            config_dict, "REQUEST_COALESCING_DISTRIBUTED"
+        )
+        self.request_coalescing_lock_ttl = float(
+            config_dict.get("REQUEST_COALESCING_LOCK_TTL", "60")
+        )
 
         # Collecting GitHub creds:
         self.github_pats = Config._collect_github_pats(config_dict)
@@ -65,18 +131,83 @@ class Config(GitHubTokenConfig, CacheBackendConfig):
             config_dict.get("GITHUB_CREDS_CACHE_TTL_PADDING", "10")
         )
 
+        # Configuring the warm up of GitHub Apps upon startup:
+        self.github_app_warm_up = Config._get_bool(config_dict, "GITHUB_APP_WARM_UP")
+        self.github_app_warm_up_workers = int(
+            config_dict.get("GITHUB_APP_WARM_UP_WORKERS", "8")
+        )
+
+        # Configuring the background renewal of GitHub App installation tokens:
+        self.github_app_token_refresh_interval = float(
+            config_dict.get("GITHUB_APP_TOKEN_REFRESH_INTERVAL", "60")
+        )
+        self.github_app_token_sharing = Config._get_bool(
+            config_dict, "GITHUB_APP_TOKEN_SHARING"
+        )
+
+        # Configuring the discovery of GitHub App installations:
+        self.github_app_installations_refresh_interval = float(
+            config_dict.get("GITHUB_APP_INSTALLATIONS_REFRESH_INTERVAL", "3600")
+        )
+
+        # Configuring the store of GitHub creds rate limits, shared across
+        # processes when set to a redis URL:
+        self.rate_limit_store_url = config_dict.get(
+            "RATE_LIMIT_STORE_URL", "inmemory://"
+        )
+
+        # Configuring the throttling of the requests to GitHub upon secondary
+        # rate limits:
+        self.github_throttle_concurrency = int(
+            config_dict.get("GITHUB_THROTTLE_CONCURRENCY", "4")
+        )
+
+        # Configuring the selection of GitHub creds based on their rate limit budget:
+        self.github_token_selection = TokenSelection(
+            config_dict.get("GITHUB_TOKEN_SELECTION", "ordered").lower()
+        )
+        self.github_token_min_remaining = int(
+            config_dict.get("GITHUB_TOKEN_MIN_REMAINING", "0")
+        )
+
         # Collecting proxy client configuration
-        self.clients = Config._collect_clients(config_dict)
+        client_registry = Config._load_client_registry(config_dict)
+        self.clients = client_registry.clients
+        self.cache_freshness = client_registry.cache_freshness
+        self.graphql_cache = client_registry.graphql_cache
+        self.auth_cache_maxsize = int(config_dict.get("AUTH_CACHE_MAXSIZE", "1024"))
+
+        # Reporting the durations of the phases of every request to the clients:
+        self.server_timing = Config._get_bool(config_dict, "SERVER_TIMING")
 
         # Configuring the telemetry collector
         self.tel_collector_type = os.environ.get(
             "TELEMETRY_COLLECTOR_TYPE", "NOOP"
         ).lower()
 
+    @staticmethod
+    def _get_bool(
+        config_dict: Mapping[str, str], key: str, default: str = "false"
+    ) -> bool:
+        return config_dict.get(key, default).lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def _get_timeout(
+        config_dict: Mapping[str, str], key: str, default: str
+    ) -> Optional[float]:
+        value = config_dict.get(key, default)
+        return None if value.lower() == "none" else float(value)
+
     @staticmethod
     def _collect_clients(
         config_dict: Mapping[str, str], j2_env: Optional[Environment] = None
     ) -> Sequence[ProxyClient]:
+        return Config._load_client_registry(config_dict, j2_env).clients
+
+    @staticmethod
+    def _load_client_registry(
+        config_dict: Mapping[str, str], j2_env: Optional[Environment] = None
+    ) -> ClientRegistry:
         fp = Path(config_dict["CLIENT_REGISTRY_FILE_PATH"])
 
         def read_file_content(fp: Path, j2_env: Optional[Environment] = None) -> str:
@@ -90,11 +221,7 @@ class Config(GitHubTokenConfig, CacheBackendConfig):
             with fp.open() as f:
                 return f.read()
 
-        client_registry = ClientRegistry.deserialize(
-            yaml.safe_load(read_file_content(fp, j2_env))
-        )
-
-        return client_registry.clients
+        return ClientRegistry.deserialize(yaml.safe_load(read_file_content(fp, j2_env)))
 
     @staticmethod
     def _collect_github_pats(config_dict: Mapping[str, str]) -> Mapping[str, str]:
@@ -119,12 +246,18 @@ class Config(GitHubTokenConfig, CacheBackendConfig):
             name: GitHubAppConfig(
                 id_=config_dict[f"GITHUB_APP_{name.upper()}_ID"],
                 private_key=config_dict[f"GITHUB_APP_{name.upper()}_PEM"],
-                installation_id=int(
-                    config_dict[f"GITHUB_APP_{name.upper()}_INSTALLATION_ID"]
-                ),
+                installation_id=Config._get_installation_id(config_dict, name),
             )
             for name in app_names
         }
 
+    @staticmethod
+    def _get_installation_id(
+        config_dict: Mapping[str, str], name: str
+    ) -> Optional[int]:
+        # Apps without an installation id use all their installations
+        installation_id = config_dict.get(f"GITHUB_APP_{name.upper()}_INSTALLATION_ID")
+        return int(installation_id) if installation_id else None
+
     def __hash__(self) -> int:  # to satisfy mypy
         return super().__hash__()
@@ -1,17 +1,45 @@
+import atexit
 from datetime import datetime
 from datetime import timedelta
 from functools import lru_cache
 from functools import wraps
 from typing import Any
 from typing import Callable
+from typing import Optional
 from typing import TypeVar
+from urllib.parse import urlparse
 
 from cachetools import TLRUCache  # type: ignore
 
+try:
+    import redis
+except ImportError:
+    redis = None  # type: ignore
+
+from github_proxy.async_proxy import AsyncProxy
+from github_proxy.background import KeyedWorkQueue
+from github_proxy.background import OverflowPolicy
+from github_proxy.cache.async_backend import AsyncCacheBackend
 from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.redis import RedisCache
+from github_proxy.cache.tiered import TieredRedisCache
+from github_proxy.cache.writer import CacheWriter
 from github_proxy.config import Config
+from github_proxy.github_tokens import RateLimitBudgets
+from github_proxy.github_tokens import RateLimited
+from github_proxy.github_tokens import RateLimitKey
+from github_proxy.proxy import BaseProxy
 from github_proxy.proxy import Proxy
+from github_proxy.ratelimit import RateLimitBudget
+from github_proxy.ratelimit_store import redis_cooldowns
+from github_proxy.ratelimit_store import redis_rate_limit_budgets
+from github_proxy.ratelimit_store import redis_rate_limited
+from github_proxy.requester import build_async_requester
+from github_proxy.requester import build_requester
+from github_proxy.singleflight import SingleFlight
 from github_proxy.telemetry import TelemetryCollector
+from github_proxy.throttle import ConcurrencyThrottle
+from github_proxy.token_refresher import InstallationTokenRefresher
 
 
 @lru_cache
@@ -19,26 +47,247 @@ def get_config() -> Config:
     return Config()
 
 
-@lru_cache
-def get_proxy(config: Config) -> Proxy:
+def get_rate_limit_client(
+    config: Config, cache: Optional[CacheBackend] = None
+) -> Optional["redis.Redis[bytes]"]:
+    """
+    Redis client of the rate limit stores, or ``None`` if the rate limits are
+    stored in-process. The connection of the cache backend is reused when both
+    share the same URL.
+    """
+    url = config.rate_limit_store_url
+    if urlparse(url).scheme == "inmemory":
+        return None
+
+    if url == config.cache_backend_url and isinstance(
+        cache, (RedisCache, TieredRedisCache)
+    ):
+        return cache.client
+
+    if redis is None:
+        raise RuntimeError(
+            "The redis package needs to be installed in order to "
+            "use the redis rate limit store: pip install github-proxy[redis]"
+        )
+    return redis.Redis.from_url(url)
+
+
+def get_rate_limited(
+    config: Config, client: Optional["redis.Redis[bytes]"] = None
+) -> RateLimited:
+    padding = timedelta(minutes=config.github_creds_cache_ttl_padding)
+    if client is not None:
+        return redis_rate_limited(client, padding)
+
     def time_to_use(_key: str, value: datetime, now: datetime) -> datetime:
         # Derives the expiration time of the added value.
         # The padding addition below is a safeguard accounting for
         # potential clock drift between the GitHub server and the proxy.
-        return value + timedelta(minutes=config.github_creds_cache_ttl_padding)
+        return value + padding
+
+    rate_limited: RateLimited = TLRUCache(
+        maxsize=config.github_creds_cache_maxsize,
+        ttu=time_to_use,
+        timer=datetime.now,
+    )
+    return rate_limited
+
+
+def get_cooldowns(
+    config: Config, client: Optional["redis.Redis[bytes]"] = None
+) -> RateLimited:
+    if client is not None:
+        return redis_cooldowns(client)
+
+    def time_to_use(_key: RateLimitKey, value: datetime, now: datetime) -> datetime:
+        # Tokens cool down for the Retry-After period only. It is measured by
+        # the proxy clock, hence no padding is needed.
+        return value
+
+    cooldowns: RateLimited = TLRUCache(
+        maxsize=config.github_creds_cache_maxsize,
+        ttu=time_to_use,
+        timer=datetime.utcnow,
+    )
+    return cooldowns
+
+
+def get_rate_limit_budgets(
+    config: Config, client: Optional["redis.Redis[bytes]"] = None
+) -> RateLimitBudgets:
+    padding = timedelta(minutes=config.github_creds_cache_ttl_padding)
+    if client is not None:
+        return redis_rate_limit_budgets(client, padding)
+
+    def time_to_use(
+        _key: RateLimitKey, value: RateLimitBudget, now: datetime
+    ) -> datetime:
+        # Budgets are meaningless after their reset, as GitHub replenishes them
+        return value.reset + padding
+
+    budgets: RateLimitBudgets = TLRUCache(
+        maxsize=config.github_creds_cache_maxsize,
+        ttu=time_to_use,
+        timer=datetime.now,
+    )
+    return budgets
+
+
+def get_throttle(config: Config) -> Optional[ConcurrencyThrottle]:
+    if config.github_throttle_concurrency < 1:
+        return None
+    return ConcurrencyThrottle(config.github_throttle_concurrency)
+
+
+def get_token_sharing_client(
+    config: Config,
+    cache: CacheBackend,
+    rate_limit_client: Optional["redis.Redis[bytes]"] = None,
+) -> Optional["redis.Redis[bytes]"]:
+    """
+    Redis client through which GitHub App installation tokens are shared:
+    the one of the rate limit stores, or else the one of the cache backend.
+    """
+    if not config.github_app_token_sharing:
+        return None
+
+    if rate_limit_client is not None:
+        return rate_limit_client
+
+    if isinstance(cache, (RedisCache, TieredRedisCache)):
+        return cache.client
+
+    raise RuntimeError(
+        "GITHUB_APP_TOKEN_SHARING requires a redis rate limit store or cache backend"
+    )
+
+
+def start_token_refresher(
+    config: Config,
+    proxy: BaseProxy,
+    cache: CacheBackend,
+    rate_limit_client: Optional["redis.Redis[bytes]"] = None,
+) -> Optional[InstallationTokenRefresher]:
+    if (
+        config.github_app_token_refresh_interval <= 0
+        # Renewed tokens could not be cached
+        or config.github_creds_cache_maxsize <= 0
+        or not config.github_apps
+    ):
+        return None
+
+    discovery = any(
+        app_config.installation_id is None for app_config in config.github_apps.values()
+    )
+    refresher = InstallationTokenRefresher(
+        lambda: proxy.integrations,
+        interval=config.github_app_token_refresh_interval,
+        client=get_token_sharing_client(config, cache, rate_limit_client),
+        discover=proxy.refresh_installations if discovery else None,
+        discovery_interval=config.github_app_installations_refresh_interval,
+    )
+    refresher.start()
+    atexit.register(refresher.stop)
+    return refresher
+
+
+@lru_cache
+def get_proxy(config: Config) -> Proxy:
+    tel_collector = TelemetryCollector.from_type(config.tel_collector_type)
+    cache = CacheBackend.factory(config, tel_collector)
+    rate_limit_client = get_rate_limit_client(config, cache)
 
-    return Proxy(
+    cache_writer = None
+    if config.cache_write_behind:
+        cache_writer = CacheWriter(
+            cache,
+            tel_collector,
+            maxsize=config.cache_write_queue_maxsize,
+            workers=config.cache_write_workers,
+            overflow=config.cache_write_overflow,
+        )
+
+    coalescer = None
+    coalescing_lock_timeout = None
+    if config.request_coalescing:
+        coalescer = SingleFlight(timeout=config.request_coalescing_timeout)
+        if config.request_coalescing_distributed:
+            coalescing_lock_timeout = config.request_coalescing_timeout
+
+    refresher = None
+    if any(rule.stale_while_revalidate > 0 for rule in config.cache_freshness):
+        refresher = KeyedWorkQueue(
+            "cache-refresher",
+            maxsize=config.cache_refresh_queue_maxsize,
+            workers=config.cache_refresh_workers,
+            overflow=OverflowPolicy.DROP,
+            dedupe_in_flight=True,
+        )
+
+    proxy = Proxy(
+        github_api_url=config.github_api_url,
+        github_token_config=config,
+        cache=cache,
+        rate_limited=get_rate_limited(config, rate_limit_client),
+        clients=config.clients,
+        tel_collector=tel_collector,
+        cache_writer=cache_writer,
+        coalescer=coalescer,
+        coalescing_lock_timeout=coalescing_lock_timeout,
+        coalescing_lock_ttl=config.request_coalescing_lock_ttl,
+        cache_freshness=config.cache_freshness,
+        refresher=refresher,
+        stale_if_error=config.cache_stale_if_error,
+        stream_responses=config.stream_responses,
+        cache_max_body_size=config.cache_max_body_size,
+        requester=build_requester(config),
+        budgets=get_rate_limit_budgets(config, rate_limit_client),
+        cooldowns=get_cooldowns(config, rate_limit_client),
+        token_selection=config.github_token_selection,
+        token_min_remaining=config.github_token_min_remaining,
+        throttle=get_throttle(config),
+        auth_cache_maxsize=config.auth_cache_maxsize,
+        server_timing=config.server_timing,
+        graphql_cache=config.graphql_cache,
+    )
+
+    # Queued revalidations and cache writes are flushed when the process exits
+    atexit.register(proxy.close, config.cache_write_flush_timeout)
+
+    if config.github_app_warm_up:
+        proxy.warm_up(config.github_app_warm_up_workers)
+    start_token_refresher(config, proxy, cache, rate_limit_client)
+
+    return proxy
+
+
+@lru_cache
+def get_async_proxy(config: Config) -> AsyncProxy:
+    tel_collector = TelemetryCollector.from_type(config.tel_collector_type)
+    cache = AsyncCacheBackend.factory(config, tel_collector)
+    rate_limit_client = get_rate_limit_client(config, cache.backend)
+    proxy = AsyncProxy(
         github_api_url=config.github_api_url,
         github_token_config=config,
-        cache=CacheBackend.factory(config),
-        rate_limited=TLRUCache(
-            maxsize=config.github_creds_cache_maxsize,
-            ttu=time_to_use,
-            timer=datetime.now,
-        ),
+        cache=cache,
+        rate_limited=get_rate_limited(config, rate_limit_client),
         clients=config.clients,
-        tel_collector=TelemetryCollector.from_type(config.tel_collector_type),
+        tel_collector=tel_collector,
+        cache_freshness=config.cache_freshness,
+        stale_if_error=config.cache_stale_if_error,
+        http_client=build_async_requester(config),
+        budgets=get_rate_limit_budgets(config, rate_limit_client),
+        cooldowns=get_cooldowns(config, rate_limit_client),
+        token_selection=config.github_token_selection,
+        token_min_remaining=config.github_token_min_remaining,
+        throttle=get_throttle(config),
+        auth_cache_maxsize=config.auth_cache_maxsize,
+        server_timing=config.server_timing,
     )
+    if config.github_app_warm_up:
+        proxy.warm_up(config.github_app_warm_up_workers)
+    start_token_refresher(config, proxy, cache.backend, rate_limit_client)
+    return proxy
 
 
 T = TypeVar("T")
@@ -1,9 +1,14 @@
+import math
 import operator
+import re
+import threading
 from datetime import datetime
 from datetime import timedelta
 from enum import Enum
+from typing import Dict
 from typing import Hashable
 from typing import Iterator
+from typing import List
 from typing import Mapping
 from typing import MutableMapping
 from typing import NamedTuple
@@ -14,14 +19,19 @@ from typing import Union
 
 from cachetools import TLRUCache  # type: ignore
 from cachetools import cachedmethod
+from cachetools.keys import hashkey
 from github import GithubIntegration
 from github.InstallationAuthorization import InstallationAuthorization
 
+from github_proxy.ratelimit import DEFAULT_BUCKET
+from github_proxy.ratelimit import RateLimitBudget
+
 
 class GitHubAppConfig(NamedTuple):
     private_key: str
     id_: str
-    installation_id: int
+    # Apps without an installation id use all their installations
+    installation_id: Optional[int] = None
 
 
 class GitHubTokenConfig(Hashable, Protocol):
@@ -36,33 +46,90 @@ class GitHubTokenOrigin(Enum):
     GITHUB_APP = "GitHub App"
 
 
+class TokenSelection(Enum):
+    ORDERED = "ordered"
+    MAX_REMAINING = "max-remaining"
+
+
 class GitHubToken(NamedTuple):
     name: str
     origin: GitHubTokenOrigin
     value: str
 
 
-RateLimited = MutableMapping[Tuple[GitHubTokenOrigin, str], datetime]
+# Rate limits are tracked per token and per rate limit bucket (eg core, search)
+RateLimitKey = Tuple[GitHubTokenOrigin, str, str]
+
+RateLimited = MutableMapping[RateLimitKey, datetime]
+
+RateLimitBudgets = MutableMapping[RateLimitKey, RateLimitBudget]
 
 InstalledIntegration = Tuple[GithubIntegration, int]
 
+_RESOURCE_OWNER = re.compile(r"^/?(?:repos|orgs|users)/([^/]+)")
 
-def construct_installed_integration(
+
+def construct_app_integration(
     app_name: str, config: GitHubTokenConfig, base_url: str
-) -> InstalledIntegration:
+) -> "CachedGithubIntegration":
     app_config = config.github_apps[app_name]
-    return (
-        CachedGithubIntegration(
-            integration_id=app_config.id_,
-            private_key=app_config.private_key,
-            base_url=base_url,
-            cache_maxsize=config.github_creds_cache_maxsize,
-            cache_ttl_padding=config.github_creds_cache_ttl_padding,
-        ),
-        app_config.installation_id,
+    return CachedGithubIntegration(
+        integration_id=app_config.id_,
+        private_key=app_config.private_key,
+        base_url=base_url,
+        cache_maxsize=config.github_creds_cache_maxsize,
+        cache_ttl_padding=config.github_creds_cache_ttl_padding,
     )
 
 
+def construct_installed_integration(
+    app_name: str, config: GitHubTokenConfig, base_url: str
+) -> InstalledIntegration:
+    installation_id = config.github_apps[app_name].installation_id
+    if installation_id is None:
+        raise ValueError(f"GitHub App {app_name} has no configured installation")
+
+    return construct_app_integration(app_name, config, base_url), installation_id
+
+
+def construct_installed_integrations(
+    app_name: str, config: GitHubTokenConfig, ghi: "CachedGithubIntegration"
+) -> Dict[str, InstalledIntegration]:
+    """
+    Installed integrations of a GitHub App, by token name. Apps without a
+    configured installation fan out over all their installations, which are
+    discovered via the installations API. The tokens of these installations are
+    named after the account (owner) of the installation.
+    """
+    installation_id = config.github_apps[app_name].installation_id
+    if installation_id is not None:
+        return {app_name: (ghi, installation_id)}
+
+    return {
+        installation_token_name(app_name, installation.raw_data["account"]["login"]): (
+            ghi,
+            installation.id,
+        )
+        for installation in ghi.get_installations()
+    }
+
+
+def installation_token_name(app_name: str, owner: str) -> str:
+    return f"{app_name}/{owner.lower()}"
+
+
+def split_installation_token_name(name: str) -> Tuple[str, Optional[str]]:
+    """Split a token name into the app name, and the installation owner if any"""
+    app_name, _, owner = name.partition("/")
+    return app_name, owner or None
+
+
+def get_resource_owner(path: str) -> Optional[str]:
+    """Owner (user or organization) of the resource of a request path"""
+    match = _RESOURCE_OWNER.match(path)
+    return match.group(1).lower() if match else None
+
+
 class CachedGithubIntegration(GithubIntegration):
     """
     The GithubIntegration class is a utility of the PyGithub library
@@ -89,8 +156,11 @@ class CachedGithubIntegration(GithubIntegration):
         cache_ttl_padding: int,
     ) -> None:
         super().__init__(integration_id, private_key, base_url)
+        self.cache_ttl_padding = cache_ttl_padding
 
-        def ttu(_key: str, value: InstallationAuthorization, now: datetime) -> datetime:
+        def ttu(
+            _key: Hashable, value: InstallationAuthorization, now: datetime
+        ) -> datetime:
             # Derives the expiration time of the added value.
 
             # We are using timestamps returned from the GitHub servers
@@ -105,45 +175,130 @@ class CachedGithubIntegration(GithubIntegration):
             ttu=ttu,
             timer=datetime.utcnow,
         )
+        # The cache is shared by the request threads and the token refresher
+        self._cache_lock = threading.Lock()
 
-    @cachedmethod(operator.attrgetter("_cache"))
+    @cachedmethod(
+        operator.attrgetter("_cache"), lock=operator.attrgetter("_cache_lock")
+    )
     def get_access_token(
         self, installation_id: int, user_id: Optional[int] = None
     ) -> InstallationAuthorization:
         return super().get_access_token(installation_id, user_id)
 
+    def mint_access_token(self, installation_id: int) -> InstallationAuthorization:
+        """Obtain a new access token, bypassing the cache"""
+        return super().get_access_token(installation_id)
+
+    def cached_access_token(
+        self, installation_id: int
+    ) -> Optional[InstallationAuthorization]:
+        with self._cache_lock:
+            authz: Optional[InstallationAuthorization] = self._cache.get(
+                self._cache_key(installation_id)
+            )
+        return authz
+
+    def set_access_token(
+        self, installation_id: int, authz: InstallationAuthorization
+    ) -> None:
+        """Cache an access token, eg one renewed ahead of its expiration"""
+        with self._cache_lock:
+            self._cache[self._cache_key(installation_id)] = authz
+
+    def cache_expires_at(self, authz: InstallationAuthorization) -> datetime:
+        """Time at which an access token gets evicted from the cache"""
+        expires_at: datetime = authz.expires_at
+        return expires_at - timedelta(minutes=self.cache_ttl_padding)
+
+    @staticmethod
+    def _cache_key(installation_id: int) -> Hashable:
+        # Key of the get_access_token(installation_id=...) calls
+        return hashkey(installation_id=installation_id)
+
 
 def token_generator(
     integrations: Mapping[str, InstalledIntegration],
     pats: Mapping[str, str],
     rate_limited: RateLimited,
+    budgets: Optional[Mapping[RateLimitKey, RateLimitBudget]] = None,
+    selection: TokenSelection = TokenSelection.ORDERED,
+    min_remaining: int = 0,
+    bucket: str = DEFAULT_BUCKET,
+    owner: Optional[str] = None,
+    cooldowns: Optional[RateLimited] = None,
 ) -> Iterator[GitHubToken]:
     """
     Lazy generator of GitHub tokens. Generates both GitHub App
-    and user PAT tokens. Skips rate-limited ones.
+    and user PAT tokens. Skips rate-limited ones, the ones cooling down after
+    a secondary rate limit (see ``cooldowns``), as well as the ones
+    whose last known budget is down to ``min_remaining`` requests.
+    Rate limits are considered for the given rate limit ``bucket`` only.
+
+    GitHub Apps installed on multiple accounts are routed to the installation
+    of the resource ``owner``, if any, as the installations of other accounts
+    cannot access the private resources of the owner.
+
+    With the ``ORDERED`` selection, GitHub Apps take precedence over PATs.
+    With the ``MAX_REMAINING`` selection, tokens are ordered by their remaining
+    budget, so that the load is balanced across tokens. Tokens of unknown
+    budget come first.
     """
-    # GitHub apps take precedence
-    for app_name, (ghi, installation_id) in integrations.items():
-        if (GitHubTokenOrigin.GITHUB_APP, app_name) in rate_limited:
-            # rate-limited apps are skipped
-            continue
+    known_budgets: Mapping[RateLimitKey, RateLimitBudget] = (
+        {} if budgets is None else budgets
+    )
+    cooling_down: RateLimited = {} if cooldowns is None else cooldowns
+    if owner is not None:
+        owner = owner.lower()
 
-        installation_authz = ghi.get_access_token(installation_id=installation_id)
+    app_names = list(integrations)
+    if owner is not None and any(
+        split_installation_token_name(name)[1] == owner for name in app_names
+    ):
+        app_names = [
+            name
+            for name in app_names
+            if split_installation_token_name(name)[1] in (None, owner)
+        ]
 
-        yield GitHubToken(
-            name=app_name,
-            origin=GitHubTokenOrigin.GITHUB_APP,
-            value=installation_authz.token,
+    candidates: List[RateLimitKey] = [
+        *((GitHubTokenOrigin.GITHUB_APP, app_name, bucket) for app_name in app_names),
+        *((GitHubTokenOrigin.USER, pat_name, bucket) for pat_name in pats),
+    ]
+    if selection is TokenSelection.MAX_REMAINING:
+        # The sort is stable, hence GitHub Apps still take precedence over PATs
+        # of the same budget.
+        candidates.sort(
+            key=lambda key: _get_remaining(known_budgets.get(key)),
+            reverse=True,
         )
 
-    # Since there are no more apps, we can now yield GitHub user PATs
-    for pat_name, pat in pats.items():
-        if (GitHubTokenOrigin.USER, pat_name) in rate_limited:
-            # rate-limited pats are skipped
+    for key in candidates:
+        origin, name, _ = key
+        if key in rate_limited or key in cooling_down:
+            # rate-limited tokens are skipped
             continue
 
-        yield GitHubToken(
-            name=pat_name,
-            origin=GitHubTokenOrigin.USER,
-            value=pat,
-        )
+        if _is_exhausted(known_budgets.get(key), min_remaining):
+            # tokens that would get rate-limited are skipped
+            continue
+
+        if origin is GitHubTokenOrigin.GITHUB_APP:
+            ghi, installation_id = integrations[name]
+            value = ghi.get_access_token(installation_id=installation_id).token
+        else:
+            value = pats[name]
+
+        yield GitHubToken(name=name, origin=origin, value=value)
+
+
+def _get_remaining(budget: Optional[RateLimitBudget]) -> float:
+    return math.inf if budget is None else budget.remaining
+
+
+def _is_exhausted(budget: Optional[RateLimitBudget], min_remaining: int) -> bool:
+    return (
+        budget is not None
+        and budget.remaining <= min_remaining
+        and budget.reset > datetime.utcnow()
+    )
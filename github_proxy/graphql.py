@@ -0,0 +1,132 @@
+import hashlib
+import json
+import re
+from typing import Any
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+GRAPHQL_PATH = "graphql"
+
+# Lexical tokens of the GraphQL language, as per
+# https://spec.graphql.org/October2021/#sec-Language.Source-Text
+# Whitespace, commas and comments are insignificant.
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ignored>[\s,\ufeff]+|\#[^\n\r]*)
+    | (?P<block_string>\"\"\"(?:\\\"\"\"|(?!\"\"\")[\s\S])*\"\"\")
+    | (?P<string>"(?:\\.|[^"\\\n\r])*")
+    | (?P<punctuator>\.\.\.|[!$&()\[\]{}:=@|])
+    | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    """,
+    re.VERBOSE,
+)
+
+_NAME_RE = re.compile(r"[_A-Za-z][_0-9A-Za-z]*")
+_OPENING = {"{", "(", "["}
+_CLOSING = {"}", ")", "]"}
+OPERATION_TYPES = {"query", "mutation", "subscription"}
+
+
+class GraphQLOperation(NamedTuple):
+    type: str
+    name: Optional[str]
+
+
+class GraphQLQuery(NamedTuple):
+    """
+    A read-only GraphQL query.
+
+    :param operation_name: Name of the executed operation (empty if anonymous).
+    :param key: Digest of the normalized query document, its variables and
+                the executed operation, identifying the query in the cache.
+    """
+
+    operation_name: str
+    key: str
+
+
+def tokenize(document: str) -> List[str]:
+    """
+    Significant lexical tokens of a GraphQL document. Raises ``ValueError``
+    on characters that are not valid GraphQL.
+    """
+    tokens = []
+    pos = 0
+    while pos < len(document):
+        match = _TOKEN_RE.match(document, pos)
+        if match is None:
+            raise ValueError(f"Unexpected character at position {pos}")
+
+        if match.lastgroup != "ignored":
+            tokens.append(match.group())
+        pos = match.end()
+
+    return tokens
+
+
+def get_operations(tokens: List[str]) -> List[GraphQLOperation]:
+    """Operations defined by a tokenized GraphQL document"""
+    operations = []
+    depth = 0
+    definition_start = True
+    for i, token in enumerate(tokens):
+        if depth == 0 and definition_start:
+            definition_start = False
+            if token == "{":
+                # Query shorthand
+                operations.append(GraphQLOperation("query", None))
+            elif token in OPERATION_TYPES:
+                following = tokens[i + 1] if i + 1 < len(tokens) else None
+                name = (
+                    following if following and _NAME_RE.fullmatch(following) else None
+                )
+                operations.append(GraphQLOperation(token, name))
+
+        if token in _OPENING:
+            depth += 1
+        elif token in _CLOSING:
+            depth -= 1
+            # Definitions end with their top-level selection set
+            definition_start = depth == 0 and token == "}"
+
+    return operations
+
+
+def parse_query(body: bytes) -> Optional[GraphQLQuery]:
+    """
+    Parse the body of a GraphQL request. Return None if the executed operation
+    is not a query (eg a mutation), or if the request is malformed.
+
+    The query document is normalized to its significant tokens, so that queries
+    differing only in whitespace, commas or comments share the same key.
+    Variables are canonicalized by sorting their keys.
+    """
+    try:
+        payload: Any = json.loads(body)
+        document = payload["query"]
+        variables = payload.get("variables") or {}
+        operation_name = payload.get("operationName") or None
+        tokens = tokenize(document)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+    operations = get_operations(tokens)
+    operation: Optional[GraphQLOperation] = None
+    if operation_name is None:
+        if len(operations) == 1:
+            operation = operations[0]
+    else:
+        operation = next((o for o in operations if o.name == operation_name), None)
+
+    if operation is None or operation.type != "query":
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(" ".join(tokens).encode())
+    digest.update(b"\0")
+    digest.update(json.dumps(variables, sort_keys=True, separators=(",", ":")).encode())
+    digest.update(b"\0")
+    digest.update((operation.name or "").encode())
+    return GraphQLQuery(operation_name=operation.name or "", key=digest.hexdigest())
@@ -1,23 +1,73 @@
+import hashlib
+import hmac
+import itertools
 import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
-from functools import cached_property
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from functools import partial
+from typing import Callable
+from typing import ContextManager
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
 from typing import Mapping
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 
 import requests
 import werkzeug
+from cachetools import LRUCache
+from cachetools import TTLCache
+from werkzeug.datastructures import Headers
 
+from github_proxy.background import KeyedWorkQueue
 from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.backend import CacheKey
+from github_proxy.cache.writer import CacheWriter
+from github_proxy.github_tokens import CachedGithubIntegration
+from github_proxy.github_tokens import GitHubToken
 from github_proxy.github_tokens import GitHubTokenConfig
 from github_proxy.github_tokens import InstalledIntegration
+from github_proxy.github_tokens import RateLimitBudgets
 from github_proxy.github_tokens import RateLimited
-from github_proxy.github_tokens import construct_installed_integration
+from github_proxy.github_tokens import TokenSelection
+from github_proxy.github_tokens import construct_app_integration
+from github_proxy.github_tokens import construct_installed_integrations
+from github_proxy.github_tokens import get_resource_owner
+from github_proxy.github_tokens import split_installation_token_name
 from github_proxy.github_tokens import token_generator
+from github_proxy.graphql import GraphQLQuery
+from github_proxy.graphql import parse_query
+from github_proxy.ratelimit import HTTPResponse
+from github_proxy.ratelimit import get_ratelimit_bucket
+from github_proxy.ratelimit import get_ratelimit_budget
 from github_proxy.ratelimit import get_ratelimit_reset
+from github_proxy.ratelimit import get_ratelimit_resource
+from github_proxy.ratelimit import get_retry_after
 from github_proxy.ratelimit import is_rate_limited
+from github_proxy.ratelimit import is_secondary_rate_limited
+from github_proxy.requester import GitHubSession
+from github_proxy.singleflight import SingleFlight
 from github_proxy.telemetry import TelemetryCollector
+from github_proxy.throttle import ConcurrencyThrottle
+from github_proxy.timing import CACHE_GET_PHASE
+from github_proxy.timing import CACHE_SET_PHASE
+from github_proxy.timing import FILTER_HEADERS_PHASE
+from github_proxy.timing import SERVER_TIMING_HEADER
+from github_proxy.timing import TOKEN_PHASE
+from github_proxy.timing import UPSTREAM_PHASE
+from github_proxy.timing import RequestTiming
+from github_proxy.timing import request_timing
+from github_proxy.timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -44,8 +94,67 @@ REQUEST_FILTERED_HEADERS = {"Host", *HOP_BY_HOP_HEADERS}
 # Content-Length and Encoding headers are removed to prevent bad framing
 RESPONSE_FILTERED_HEADERS = {"Content-Length", "Content-Encoding", *HOP_BY_HOP_HEADERS}
 
+# Headers of 304 responses that do not apply to the cached response they
+# revalidate, as they describe its (possibly compressed) body.
+NOT_MODIFIED_SKIPPED_HEADERS = {
+    "Content-Length",
+    "Content-Encoding",
+    "Content-Type",
+    "Vary",
+}
+
 MATCH_ALL = re.compile(r".*")
 
+# Size (in bytes) of the chunks of streamed responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Max number, and lifetime (in seconds), of the cache entries known to be
+# uncacheable, whose misses skip the coalescing lock.
+UNCACHEABLE_MAXSIZE = 4096
+UNCACHEABLE_TTL = 300
+
+# Time (in seconds) before the installations of GitHub Apps whose discovery
+# failed are discovered again.
+DISCOVERY_RETRY_INTERVAL = 60
+
+# Methods whose client scopes are compiled upfront. Scopes of other methods are
+# compiled upon their first request.
+AUTH_METHODS = ("GET", "POST", "PATCH", "PUT", "DELETE")
+
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class TokensRateLimitedError(RuntimeError):
+    """Raised when all the available GitHub tokens are rate limited"""
+
+
+def copy_response(resp: werkzeug.Response) -> werkzeug.Response:
+    """
+    Shallow copy of a response, so that its headers can be modified without
+    affecting the original response. The body is shared.
+    """
+    return werkzeug.Response(
+        response=resp.response,
+        status=resp.status,
+        headers=Headers(resp.headers),
+    )
+
+
+def revalidated_response(
+    cached_response: werkzeug.Response, not_modified: werkzeug.Response
+) -> werkzeug.Response:
+    """
+    Copy of a cached response, updated with the headers of the 304 response
+    that revalidated it, as per RFC 9111 section 4.3.4. Its Date, hence its
+    age, is renewed.
+    """
+    resp = copy_response(cached_response)
+    for name in {name for name, _ in not_modified.headers}:
+        if name not in NOT_MODIFIED_SKIPPED_HEADERS:
+            resp.headers.setlist(name, not_modified.headers.getlist(name))
+    resp.date = not_modified.date or datetime.now(timezone.utc)
+    return resp
+
 
 @dataclass
 class ProxyClientScope:
@@ -72,6 +181,128 @@ class ProxyClient:
     scopes: Sequence[ProxyClientScope] = (ProxyClientScope(),)
 
 
+@dataclass
+class CacheFreshnessRule:
+    """
+    Freshness window of the cached responses of the resources matching ``path``.
+    Within that window, cached responses are served without being revalidated
+    against GitHub.
+
+    Once the freshness window has passed, cached responses can still be served
+    for ``stale_while_revalidate`` seconds, while they are revalidated in the
+    background. Past that limit, cached responses are revalidated synchronously.
+
+    :param path: Pattern matching the path of the resource.
+    :param max_age: Length (in seconds) of the freshness window.
+    :param stale_while_revalidate: Max time (in seconds) past the freshness window
+                                   during which stale responses can be served.
+    """
+
+    max_age: int
+    path: re.Pattern = MATCH_ALL  # type: ignore
+    stale_while_revalidate: int = 0
+
+
+@dataclass
+class GraphQLCacheRule:
+    """
+    Max age of the cached responses of the GraphQL queries whose operation name
+    matches ``operation``. Within that window, cached responses are served
+    without querying GitHub. Mutations are never cached.
+
+    :param max_age: Max age (in seconds) of the cached responses.
+    :param operation: Pattern matching the whole operation name of the query.
+                      Anonymous queries have an empty operation name.
+    """
+
+    max_age: int
+    operation: re.Pattern = MATCH_ALL  # type: ignore
+
+
+def stream_body(resp: requests.Response) -> Iterator[bytes]:
+    """
+    Body of a streamed response of the GitHub origin. The connection is released
+    back to the pool once the body is exhausted, or once the iterator is closed.
+    """
+    try:
+        yield from resp.iter_content(STREAM_CHUNK_SIZE)
+    finally:
+        resp.close()
+
+
+def tee_body(
+    chunks: Iterable[bytes], max_size: int, on_complete: Callable[[bytes], None]
+) -> Iterator[bytes]:
+    """
+    Pass through the chunks of a streamed body, while buffering up to
+    ``max_size`` bytes of it. Once the body is exhausted, ``on_complete`` is
+    called with the buffered body, unless the body exceeded ``max_size``.
+    """
+    buffer: List[bytes] = []
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size <= max_size:
+            buffer.append(chunk)
+        else:
+            buffer.clear()
+        yield chunk
+
+    if size <= max_size:
+        on_complete(b"".join(buffer))
+
+
+def buffer_body(resp: werkzeug.Response, max_size: int) -> bool:
+    """
+    Buffer the body of a streamed response in memory, unless it exceeds
+    ``max_size`` bytes, in which case the response is left streamed. Returns
+    whether the body was buffered.
+    """
+    upstream_close = getattr(resp.response, "close", None)
+    chunks = resp.iter_encoded()
+    buffer: List[bytes] = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size > max_size:
+            resp.response = itertools.chain(buffer, chunks)
+            if upstream_close is not None:
+                resp.call_on_close(upstream_close)
+            return False
+
+    resp.set_data(b"".join(buffer))
+    return True
+
+
+def detach_request(request: werkzeug.Request) -> werkzeug.Request:
+    """
+    Copy of a GET request that outlives the context of the incoming request,
+    so that it can be replayed in the background. The conditional headers of
+    the client are dropped.
+    """
+    return werkzeug.Request.from_values(
+        path=request.path,
+        method=request.method,
+        query_string=request.query_string,
+        headers=[
+            (k, v)
+            for k, v in request.headers.items()
+            if k not in ("If-None-Match", "If-Modified-Since")
+        ],
+    )
+
+
+def get_response_age(resp: werkzeug.Response, now: datetime) -> Optional[int]:
+    """
+    Age (in seconds) of a response, derived from its Date header.
+    """
+    if resp.date is None:
+        return None
+
+    return max(0, int((now - resp.date).total_seconds()))
+
+
 def validate_clients(clients: Sequence[ProxyClient]) -> None:
     taken_tokens = set()
     taken_names = set()
@@ -86,7 +317,471 @@ def validate_clients(clients: Sequence[ProxyClient]) -> None:
         taken_names.add(client.name)
 
 
-class Proxy:
+def combine_patterns(patterns: Sequence["re.Pattern[str]"]) -> List["re.Pattern[str]"]:
+    """
+    Combine patterns into a single alternation, matching whatever one of the
+    patterns matches. Patterns that cannot be safely combined (different flags,
+    or backreferences whose group numbers would shift) are kept as is.
+    """
+    if len(patterns) < 2:
+        return list(patterns)
+
+    flags = {pattern.flags for pattern in patterns}
+    if len(flags) > 1 or any(_BACKREFERENCE.search(p.pattern) for p in patterns):
+        return list(patterns)
+
+    try:
+        combined = re.compile(
+            "|".join(f"(?:{pattern.pattern})" for pattern in patterns), flags.pop()
+        )
+    except re.error:
+        # eg duplicate group names, or global flags in the middle of the pattern
+        return list(patterns)
+
+    return [combined]
+
+
+class _CompiledClient:
+    def __init__(self, client: ProxyClient) -> None:
+        self.name = client.name
+        self.token = client.token.encode()
+        self.scopes = client.scopes
+        self._paths: Dict[str, List["re.Pattern[str]"]] = {}
+        for method in AUTH_METHODS:
+            self.paths(method)
+
+    def paths(self, method: str) -> List["re.Pattern[str]"]:
+        """Patterns of the paths that the client can access with ``method``"""
+        paths = self._paths.get(method)
+        if paths is None:
+            paths = combine_patterns(
+                [
+                    scope.path
+                    for scope in self.scopes
+                    if scope.method.match(method.lower())
+                    or scope.method.match(method.upper())
+                ]
+            )
+            self._paths[method] = paths
+        return paths
+
+
+class ClientAuthorizer:
+    """
+    Authorizes the requests of the proxy clients. The scopes of every client
+    are compiled into a single path pattern per HTTP method, and the most
+    recent decisions are memoized.
+
+    Clients are looked up by the digest of their token, and tokens are then
+    compared in constant time, so that the timing of the lookup does not
+    reveal the tokens.
+
+    :param clients: Clients that are authorized to use the proxy.
+    :param maxsize: Max number of memoized decisions. Set to 0 to disable the
+                    memoization.
+    """
+
+    def __init__(self, clients: Sequence[ProxyClient], maxsize: int = 1024) -> None:
+        validate_clients(clients)
+        self._clients = {
+            _digest(client.token.encode()): _CompiledClient(client)
+            for client in clients
+        }
+        self._decisions: Optional[LRUCache[Tuple[bytes, str, str], bool]] = (
+            LRUCache(maxsize=maxsize) if maxsize > 0 else None
+        )
+        self._lock = threading.Lock()
+
+    def authorize(self, token: str, method: str, path: str) -> Optional[str]:
+        """
+        Name of the client owning ``token``, if the client is allowed to
+        request ``path`` with ``method``. None otherwise.
+        """
+        token_bytes = token.encode()
+        digest = _digest(token_bytes)
+        client = self._clients.get(digest)
+        if client is None or not hmac.compare_digest(client.token, token_bytes):
+            return None
+
+        if self._decisions is None:
+            return client.name if self._allows(client, method, path) else None
+
+        key = (digest, method, path)
+        with self._lock:
+            allowed = self._decisions.get(key)
+        if allowed is None:
+            allowed = self._allows(client, method, path)
+            with self._lock:
+                self._decisions[key] = allowed
+
+        return client.name if allowed else None
+
+    @staticmethod
+    def _allows(client: _CompiledClient, method: str, path: str) -> bool:
+        return any(pattern.match(path) for pattern in client.paths(method))
+
+
+def _digest(token: bytes) -> bytes:
+    return hashlib.sha256(token).digest()
+
+
+class BaseProxy:
+    """
+    Functionality shared by the synchronous and the asynchronous proxies.
+    See ``Proxy`` for the description of the parameters.
+    """
+
+    def __init__(
+        self,
+        github_api_url: str,
+        github_token_config: GitHubTokenConfig,
+        rate_limited: RateLimited,
+        tel_collector: TelemetryCollector,
+        clients: Sequence[ProxyClient] = (),
+        cache_freshness: Sequence[CacheFreshnessRule] = (),
+        stale_if_error: int = 0,
+        budgets: Optional[RateLimitBudgets] = None,
+        cooldowns: Optional[RateLimited] = None,
+        token_selection: TokenSelection = TokenSelection.ORDERED,
+        token_min_remaining: int = 0,
+        throttle: Optional[ConcurrencyThrottle] = None,
+        auth_cache_maxsize: int = 1024,
+        server_timing: bool = False,
+    ) -> None:
+        self.github_api_url = github_api_url
+        self.gh_token_config = github_token_config
+        self.authorizer = ClientAuthorizer(clients, maxsize=auth_cache_maxsize)
+        self.cache_freshness = cache_freshness
+        self.stale_if_error = stale_if_error
+        self.rate_limited = rate_limited
+        self.budgets: RateLimitBudgets = {} if budgets is None else budgets
+        self.cooldowns: RateLimited = {} if cooldowns is None else cooldowns
+        self.token_selection = token_selection
+        self.token_min_remaining = token_min_remaining
+        self.throttle = throttle
+        self.server_timing = server_timing
+        self.tel_collector = tel_collector
+        self._app_integrations: Dict[str, CachedGithubIntegration] = {}
+        self._integrations: Optional[Dict[str, InstalledIntegration]] = None
+        # Apps whose last discovery failed, to be discovered again
+        self._undiscovered_apps: List[str] = []
+        self._next_discovery = 0.0
+        self._integrations_lock = threading.Lock()
+
+    def auth(self, token: str, request: werkzeug.Request) -> Optional[str]:
+        """
+        Authorize an incoming proxy request
+
+        :param token: Authorization token of the client. See ``ProxyClient.token``.
+        :request: The request object received by the client.
+        """
+        request_path = request.path[len("/api/v3") :]
+        return self.authorizer.authorize(token, request.method.upper(), request_path)
+
+    @property
+    def integrations(self) -> Mapping[str, InstalledIntegration]:
+        """
+        Installed integrations of the GitHub Apps, by token name. They are
+        discovered upon the first access. Apps whose discovery fails are
+        discovered again upon an access after ``DISCOVERY_RETRY_INTERVAL``.
+        """
+        integrations = self._integrations
+        if integrations is None:
+            self._integrations_lock.acquire()
+        elif not self._is_discovery_due():
+            return integrations
+        elif not self._integrations_lock.acquire(blocking=False):
+            # Another thread is discovering them again
+            return integrations
+
+        try:
+            # Another thread may have discovered them while waiting for the lock
+            if self._integrations is None:
+                apps = list(self.gh_token_config.github_apps)
+                integrations = {}
+            elif self._is_discovery_due():
+                apps = self._undiscovered_apps
+                integrations = dict(self._integrations)
+            else:
+                return self._integrations
+
+            undiscovered = []
+            for app_name in apps:
+                try:
+                    integrations.update(self._installed_integrations(app_name))
+                except Exception:
+                    logger.exception(
+                        "Failed discovering the installations of %s", app_name
+                    )
+                    undiscovered.append(app_name)
+
+            self._integrations = integrations
+            self._set_undiscovered_apps(undiscovered)
+            return integrations
+        finally:
+            self._integrations_lock.release()
+
+    @integrations.setter
+    def integrations(self, integrations: Mapping[str, InstalledIntegration]) -> None:
+        self._integrations = dict(integrations)
+        self._undiscovered_apps = []
+
+    @property
+    def _integrations_resolved(self) -> bool:
+        """Whether accessing ``integrations`` spares a discovery"""
+        return self._integrations is not None and not self._is_discovery_due()
+
+    def _is_discovery_due(self) -> bool:
+        return bool(self._undiscovered_apps) and (
+            time.monotonic() >= self._next_discovery
+        )
+
+    def _set_undiscovered_apps(self, apps: List[str]) -> None:
+        self._undiscovered_apps = apps
+        if apps:
+            self._next_discovery = time.monotonic() + DISCOVERY_RETRY_INTERVAL
+
+    def refresh_installations(self) -> None:
+        """
+        Re-discover the installations of the GitHub Apps that are not configured
+        with an installation id. Apps whose discovery fails keep their known
+        installations.
+        """
+        integrations = dict(self.integrations)
+        discovered_apps = set()
+        for app_name, app_config in self.gh_token_config.github_apps.items():
+            if app_config.installation_id is not None:
+                continue
+
+            try:
+                discovered = self._installed_integrations(app_name)
+            except Exception:
+                logger.exception("Failed discovering the installations of %s", app_name)
+                continue
+
+            integrations = {
+                name: integration
+                for name, integration in integrations.items()
+                if split_installation_token_name(name)[0] != app_name
+            }
+            integrations.update(discovered)
+            discovered_apps.add(app_name)
+
+        with self._integrations_lock:
+            undiscovered = [
+                app_name
+                for app_name in self._undiscovered_apps
+                if app_name not in discovered_apps
+            ]
+            self.integrations = integrations
+            self._undiscovered_apps = undiscovered
+
+    def _installed_integrations(self, app_name: str) -> Dict[str, InstalledIntegration]:
+        # A single integration per app signs the JWTs of all its installations
+        ghi = self._app_integrations.get(app_name)
+        if ghi is None:
+            ghi = self._app_integrations[app_name] = construct_app_integration(
+                app_name, self.gh_token_config, self.github_api_url
+            )
+        return construct_installed_integrations(app_name, self.gh_token_config, ghi)
+
+    def warm_up(self, max_workers: Optional[int] = None) -> Mapping[str, float]:
+        """
+        Build the integrations of the GitHub Apps and mint their initial tokens
+        in parallel, instead of lazily upon the first requests. Returns the time
+        (in seconds) that every app took to warm up.
+        """
+        apps = list(self.gh_token_config.github_apps)
+        if not apps:
+            return {}
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or len(apps), thread_name_prefix="warm-up"
+        ) as executor:
+            results = dict(zip(apps, executor.map(self._warm_up_app, apps)))
+
+        integrations: Dict[str, InstalledIntegration] = {}
+        for app_integrations, _ in results.values():
+            integrations.update(app_integrations or {})
+        with self._integrations_lock:
+            self.integrations = integrations
+            # Apps whose discovery failed are discovered again later on
+            self._set_undiscovered_apps(
+                [
+                    app_name
+                    for app_name, (app_integrations, _) in results.items()
+                    if app_integrations is None
+                ]
+            )
+        return {app_name: duration for app_name, (_, duration) in results.items()}
+
+    def _warm_up_app(
+        self, app_name: str
+    ) -> Tuple[Optional[Dict[str, InstalledIntegration]], float]:
+        start = time.perf_counter()
+        integrations: Optional[Dict[str, InstalledIntegration]]
+        try:
+            integrations = self._installed_integrations(app_name)
+        except Exception:
+            logger.exception("Failed discovering the installations of %s", app_name)
+            integrations = None
+
+        for name, (ghi, installation_id) in (integrations or {}).items():
+            try:
+                ghi.get_access_token(installation_id=installation_id)
+            except Exception:
+                # The token is minted upon the first request instead
+                logger.exception("Failed minting the initial token of %s", name)
+
+        duration = time.perf_counter() - start
+        logger.info("Warmed up %s in %.3f seconds", app_name, duration)
+        self.tel_collector.collect_warm_up_metrics(app_name, duration)
+        return integrations, duration
+
+    def _tokens(self, bucket: str, owner: Optional[str]) -> Iterator[GitHubToken]:
+        return token_generator(
+            self.integrations,
+            self.gh_token_config.github_pats,
+            self.rate_limited,
+            budgets=self.budgets,
+            cooldowns=self.cooldowns,
+            selection=self.token_selection,
+            min_remaining=self.token_min_remaining,
+            bucket=bucket,
+            owner=owner,
+        )
+
+    def _record_rate_limit(
+        self, token: GitHubToken, resp: HTTPResponse, bucket: str
+    ) -> bool:
+        """
+        Record the rate limit budget that GitHub reports on every response,
+        in the rate limit bucket that GitHub reports, or else the predicted one.
+        Returns whether the token is rate limited, in which case the request
+        should be retried with another token.
+        """
+        key = (token.origin, token.name, get_ratelimit_resource(resp) or bucket)
+        budget = get_ratelimit_budget(resp)
+        if budget is not None:
+            self.budgets[key] = budget
+
+        if is_secondary_rate_limited(resp):
+            retry_after = get_retry_after(resp) or 0
+            # The token cools down, and all the requests to GitHub are throttled
+            self.cooldowns[key] = datetime.utcnow() + timedelta(seconds=retry_after)
+            if self.throttle is not None:
+                self.throttle.trip(retry_after)
+            logger.warning(
+                "%s %s hit a secondary rate limit. Retrying after %s seconds",
+                token.origin.value,
+                token.name,
+                retry_after,
+            )
+            return True
+
+        if not is_rate_limited(resp):
+            return False
+
+        reset = get_ratelimit_reset(resp)
+        if reset:
+            self.rate_limited[key] = reset
+            logger.warning(
+                "%s %s is rate limited on %s. Resetting at %s",
+                token.origin.value,
+                token.name,
+                key[2],
+                reset,
+            )
+        return True
+
+    def _throttle_slot(self) -> ContextManager[None]:
+        if self.throttle is None:
+            return nullcontext()
+        return self.throttle.slot()
+
+    def _collect_timing(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        resp: werkzeug.Response,
+        timing: RequestTiming,
+        cache_hit: Optional[bool] = None,
+    ) -> werkzeug.Response:
+        self.tel_collector.collect_phase_metrics(
+            client, request, timing, cache_hit=cache_hit
+        )
+        if self.server_timing:
+            if not resp.is_streamed:
+                # Buffered responses may be shared with the cache
+                resp = copy_response(resp)
+            resp.headers[SERVER_TIMING_HEADER] = timing.server_timing()
+
+        return resp
+
+    def _get_freshness_rule(self, path: str) -> Optional[CacheFreshnessRule]:
+        for rule in self.cache_freshness:
+            if rule.path.match(f"/{path}"):
+                return rule
+
+        return None
+
+    def _stale_if_error(
+        self,
+        cached_response: werkzeug.Response,
+        age: Optional[int],
+        request: werkzeug.Request,
+        reason: str,
+    ) -> Optional[werkzeug.Response]:
+        """
+        Stale response to be served in place of an error of the GitHub origin,
+        if stale-if-error is enabled and the cached response is recent enough.
+        """
+        if self.stale_if_error <= 0 or age is None or age > self.stale_if_error:
+            return None
+
+        logger.warning(
+            "Failed revalidating %s (%s). Serving stale response", request.path, reason
+        )
+        self.tel_collector.collect_stale_response_metrics(request, reason)
+
+        stale_response = copy_response(cached_response)
+        stale_response.headers["Age"] = str(age)
+        stale_response.headers["Warning"] = '111 - "Revalidation Failed"'
+        return stale_response
+
+    def _gh_request_headers(
+        self,
+        request: werkzeug.Request,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict[str, str]:
+        # Filter request headers
+        headers = {
+            k: v
+            for k, v in request.headers.items()
+            if k not in REQUEST_FILTERED_HEADERS
+        }
+
+        # Adding cache headers:
+        # Note that it is not necessary to send both cache headers.
+        # It is preferred to send only the If-Modified-Since header (if available),
+        # since it can be reused across different GitHub tokens.
+        # Etags on the other hand, are token specific.
+        # For example, if the token of a GitHub app is renewed,
+        # it cannot reuse the Etags of the previous expired token (whereas
+        # the Last-Modified timestamp would still work).
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        elif etag is not None:
+            headers["If-None-Match"] = etag
+
+        return headers
+
+    def _gh_url(self, path: str) -> str:
+        return f'{self.github_api_url.rstrip("/")}/{path}'
+
+
+class Proxy(BaseProxy):
     def __init__(
         self,
         github_api_url: str,
@@ -95,6 +790,24 @@ class Proxy:
         rate_limited: RateLimited,
         tel_collector: TelemetryCollector,
         clients: Sequence[ProxyClient] = (),
+        cache_writer: Optional[CacheWriter] = None,
+        coalescer: Optional[SingleFlight] = None,
+        coalescing_lock_timeout: Optional[float] = None,
+        coalescing_lock_ttl: float = 60,
+        cache_freshness: Sequence[CacheFreshnessRule] = (),
+        refresher: Optional[KeyedWorkQueue] = None,
+        stale_if_error: int = 0,
+        stream_responses: bool = False,
+        cache_max_body_size: int = 10 * 1024 * 1024,
+        requester: Optional[GitHubSession] = None,
+        budgets: Optional[RateLimitBudgets] = None,
+        cooldowns: Optional[RateLimited] = None,
+        token_selection: TokenSelection = TokenSelection.ORDERED,
+        token_min_remaining: int = 0,
+        throttle: Optional[ConcurrencyThrottle] = None,
+        graphql_cache: Sequence[GraphQLCacheRule] = (),
+        auth_cache_maxsize: int = 1024,
+        server_timing: bool = False,
     ) -> None:
         """
         :param github_api_url: Base url of the GitHub API server
@@ -114,16 +827,99 @@ class Proxy:
                               within the control flow.
         :param clients: Clients that are authorized to use the proxy. The list must not
                         contain duplicate client names or tokens.
+        :param cache_writer: Optional write-behind layer on top of the ``cache``.
+                             If provided, responses are written to the cache
+                             asynchronously, off the response path.
+        :param coalescer: If provided, concurrent ``cached_request`` calls for the
+                          same resource are coalesced into a single request
+                          to GitHub.
+        :param coalescing_lock_timeout: If provided, cache misses are also
+                                        coalesced across processes, using the lock
+                                        of the cache backend. Max time (in seconds)
+                                        a process waits for the lock.
+        :param coalescing_lock_ttl: Time (in seconds) after which the lock of
+                                    a cache miss expires, so that it does not
+                                    outlive a crashed process. Should exceed the
+                                    duration of a request to GitHub.
+        :param cache_freshness: Freshness windows of cached responses. The first
+                                rule matching the path of a resource applies.
+                                Resources matching no rule are always revalidated.
+        :param refresher: Queue of background revalidations of stale cached
+                          responses (see ``CacheFreshnessRule``). Without it,
+                          stale responses are always revalidated synchronously.
+        :param stale_if_error: Max age (in seconds) of cached responses that can
+                               be served when their revalidation fails, due to
+                               errors of the GitHub origin or rate-limited tokens.
+                               Set to 0 to disable serving stale responses on error.
+        :param stream_responses: If set, the bodies of the GitHub responses are
+                                 streamed to the clients chunk by chunk, instead
+                                 of being buffered in memory. Streamed responses
+                                 are cached once they are fully sent.
+        :param cache_max_body_size: Max body size (in bytes) of the streamed
+                                    responses that are cached. Larger responses
+                                    are streamed without being cached.
+        :param requester: The session used for requesting GitHub, configured with
+                          its connection pool size, timeouts, and retries
+                          (see ``build_requester``). Defaults to a session with
+                          the default settings of requests.
+        :param budgets: Dictionary to store the last known rate limit budget of
+                        every GitHub token. Should ideally be a TLRU cache that
+                        evicts budgets upon their reset, like ``rate_limited``.
+        :param cooldowns: Dictionary to store the GitHub tokens that cool down
+                          after a secondary rate limit, mapped to the end of
+                          their ``Retry-After`` period. Unlike ``rate_limited``,
+                          it should be a TLRU cache evicting tokens right at
+                          the end of the period, without any padding.
+        :param token_selection: Order in which GitHub tokens are used.
+                                See ``TokenSelection``.
+        :param token_min_remaining: GitHub tokens whose last known budget is down
+                                    to this number of requests are skipped until
+                                    their rate limit reset, so that they are not
+                                    rate-limited.
+        :param throttle: Caps the concurrent requests to GitHub once GitHub
+                         signals a secondary rate limit.
+        :param graphql_cache: Max age of the cached responses of GraphQL queries.
+                              The first rule matching the operation name of a
+                              query applies. Queries matching no rule, as well
+                              as mutations, are not cached.
+        :param auth_cache_maxsize: Max number of memoized authorization decisions
+                                   (see ``ClientAuthorizer``).
+        :param server_timing: If set, the durations of the phases of every request
+                              (see ``github_proxy.timing``) are reported to the
+                              clients through the ``Server-Timing`` header.
         """
-        self.github_api_url = github_api_url
-        self.gh_token_config = github_token_config
-        validate_clients(clients)
-        self.client_tokens = {
-            client.token: (client.name, client.scopes) for client in clients
-        }
+        super().__init__(
+            github_api_url,
+            github_token_config,
+            rate_limited,
+            tel_collector,
+            clients=clients,
+            cache_freshness=cache_freshness,
+            stale_if_error=stale_if_error,
+            budgets=budgets,
+            cooldowns=cooldowns,
+            token_selection=token_selection,
+            token_min_remaining=token_min_remaining,
+            throttle=throttle,
+            auth_cache_maxsize=auth_cache_maxsize,
+            server_timing=server_timing,
+        )
         self.cache = cache
-        self.rate_limited = rate_limited
-        self.tel_collector = tel_collector
+        self.cache_writer = cache_writer
+        self.coalescer = coalescer
+        self.coalescing_lock_timeout = coalescing_lock_timeout
+        self.coalescing_lock_ttl = coalescing_lock_ttl
+        # Cache entries whose last GitHub response was not cacheable. Their
+        # misses are not coalesced across processes, as waiting processes would
+        # not find them in the cache.
+        self._uncacheable: TTLCache[CacheKey, bool] = TTLCache(
+            maxsize=UNCACHEABLE_MAXSIZE, ttl=UNCACHEABLE_TTL
+        )
+        self._uncacheable_lock = threading.Lock()
+        self.refresher = refresher
+        self.stream_responses = stream_responses
+        self.cache_max_body_size = cache_max_body_size
+        self.graphql_cache = graphql_cache
 
         # Since all proxy transactions eventually hit the same GitHub host, it is
         # preferred to re-use TCP connections (connection pooling). The requests.Session
@@ -133,37 +929,7 @@ class Proxy:
         # As of today, the GitHub REST API does not make any use of cookies,
         # hence it is safe to use a single cookie persisting session across all clients.
         # If this changes in the future, we could switch to having a session per client.
-        self.requester = requests.Session()
-
-    def auth(self, token: str, request: werkzeug.Request) -> Optional[str]:
-        """
-        Authorize an incoming proxy request
-
-        :param token: Authorization token of the client. See ``ProxyClient.token``.
-        :request: The request object received by the client.
-        """
-        if token in self.client_tokens:
-            name, scopes = self.client_tokens[token]
-
-            request_path = request.path[len("/api/v3") :]
-
-            for scope in scopes:
-                method_match = scope.method.match(
-                    request.method.lower()
-                ) or scope.method.match(request.method.upper())
-                if method_match and scope.path.match(request_path):
-                    return name
-
-        return None
-
-    @cached_property
-    def integrations(self) -> Mapping[str, InstalledIntegration]:
-        return {
-            app_name: construct_installed_integration(
-                app_name, self.gh_token_config, self.github_api_url
-            )
-            for app_name in self.gh_token_config.github_apps
-        }
+        self.requester = requester or GitHubSession()
 
     def request(
         self, path: str, request: werkzeug.Request, client: str
@@ -179,7 +945,10 @@ class Proxy:
         """
         logger.info("%s client requesting %s %s", client, request.method, path)
         self.tel_collector.collect_proxy_request_metrics(client, request)
-        return self._send_gh_request(path, request)
+        with request_timing() as timing:
+            resp = self._send_gh_request(path, request)
+
+        return self._collect_timing(client, request, resp, timing)
 
     def cached_request(
         self, path: str, request: werkzeug.Request, client: str
@@ -206,26 +975,256 @@ class Proxy:
             request.headers.get("If-Modified-Since"),
         )
 
+        with request_timing() as timing:
+            if self.coalescer is None:
+                resp, cache_hit = self._cached_request(path, qs, media_type, request)
+            else:
+                resp, cache_hit = self._coalesced_request(path, qs, media_type, request)
+
+            resp = self._negotiate_encoding(resp, request)
+
+        self.tel_collector.collect_proxy_request_metrics(
+            client, request, cache_hit=cache_hit
+        )
+        return self._collect_timing(client, request, resp, timing, cache_hit)
+
+    def _coalesced_request(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+    ) -> Tuple[werkzeug.Response, Optional[bool]]:
+        assert self.coalescer is not None
+        # Concurrent requests for the same cache entry, carrying the same
+        # conditional headers, are served by a single request to GitHub.
+        key = (
+            path,
+            qs,
+            media_type,
+            request.headers.get("If-None-Match"),
+            request.headers.get("If-Modified-Since"),
+        )
+        (resp, cache_hit), shared = self.coalescer.do(
+            key, lambda: self._cached_request(path, qs, media_type, request)
+        )
+        if shared and resp.is_streamed:
+            # The body of a streamed response can only be consumed once
+            resp, cache_hit = self._cached_request(path, qs, media_type, request)
+        elif shared:
+            resp = copy_response(resp)
+
+        return resp, cache_hit
+
+    def graphql_request(
+        self, path: str, request: werkzeug.Request, client: str
+    ) -> werkzeug.Response:
+        """
+        Proxy a GraphQL request to the GitHub origin. Return a cached response
+        if the request is a query matching a ``GraphQLCacheRule``, and if its
+        cached response is recent enough. Mutations and queries matching no rule
+        are forwarded to GitHub without using the cache.
+
+        :path: Path of the GraphQL endpoint, without the potential /api/v3
+               prefix.
+        :request: The request object received by the client.
+        :client: The name of the client (see ``ProxyClient.name``).
+        """
+        if not self.graphql_cache:
+            return self.request(path, request, client)
+
+        query = parse_query(request.get_data())
+        rule = None if query is None else self._get_graphql_cache_rule(query)
+        if query is None or rule is None:
+            return self.request(path, request, client)
+
+        media_type = request.accept_mimetypes.best
+        logger.info(
+            "%s client requesting %s query %s %s",
+            client,
+            path,
+            query.operation_name or "<anonymous>",
+            media_type,
+        )
+
+        with request_timing() as timing:
+            resp, cache_hit = self._graphql_request(
+                path, query, rule, media_type, request
+            )
+            resp = self._negotiate_encoding(resp, request)
+
+        self.tel_collector.collect_proxy_request_metrics(
+            client, request, cache_hit=cache_hit
+        )
+        return self._collect_timing(client, request, resp, timing, cache_hit)
+
+    def _graphql_request(
+        self,
+        path: str,
+        query: GraphQLQuery,
+        rule: GraphQLCacheRule,
+        media_type: str,
+        request: werkzeug.Request,
+    ) -> Tuple[werkzeug.Response, Optional[bool]]:
+        # The query key takes the place of the query string of REST resources
+        with timed(CACHE_GET_PHASE):
+            cached_response = self.cache.get(path, query.key, media_type)
+        if cached_response is not None:
+            age = get_response_age(cached_response, datetime.now(timezone.utc))
+            if age is not None and age < rule.max_age:
+                fresh_response = copy_response(cached_response)
+                fresh_response.headers["Age"] = str(age)
+                return fresh_response, True
+
+        resp = self._send_gh_request(path, request)
+        if resp.status_code != 200:
+            return resp, None
+
+        # GraphQL errors (eg rate limits or timeouts) are reported with a 200
+        # status, hence the body of the response has to be checked. Streamed
+        # bodies that are too large to be cached are passed through unchecked.
+        if resp.is_streamed and not buffer_body(resp, self.cache_max_body_size):
+            return resp, None
+        if "errors" in (resp.get_json(force=True, silent=True) or {}):
+            return resp, None
+
+        self._cache_set(path, query.key, media_type, resp)
+        return resp, False
+
+    def _get_graphql_cache_rule(
+        self, query: GraphQLQuery
+    ) -> Optional[GraphQLCacheRule]:
+        for rule in self.graphql_cache:
+            if rule.operation.fullmatch(query.operation_name):
+                return rule
+
+        return None
+
+    def _negotiate_encoding(
+        self, resp: werkzeug.Response, request: werkzeug.Request
+    ) -> werkzeug.Response:
+        # Compressed cached responses are passed through to the clients that
+        # accept their content-coding.
+        encoding = resp.headers.get("Content-Encoding")
+        if encoding is not None and not request.accept_encodings[encoding]:
+            return self.cache.decompress(resp)
+
+        return resp
+
+    def _cached_request(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+    ) -> Tuple[werkzeug.Response, Optional[bool]]:
         # The requested media type MUST be combined with the path and the
         # query string when indexing cached resources. The GitHub API may return
         # a completely different response based on the requested MIME type.
         # See more: https://docs.github.com/en/rest/overview/media-types
-        cached_response = self.cache.get(path, qs, media_type)
+        with timed(CACHE_GET_PHASE):
+            cached_response = self.cache.get(path, qs, media_type)
 
         if cached_response is None:  # cache miss
-            resp = self._send_gh_request(path, request)
-            etag_value, _ = resp.get_etag()
-            cache_hit = None
+            key = (path, qs, media_type)
+            if self.coalescing_lock_timeout is None or self._is_uncacheable(key):
+                return self._uncached_request(path, qs, media_type, request)
 
-            if etag_value or resp.last_modified:
-                # TODO: Writing to cache should happen asyncronously
-                self.cache.set(path, qs, media_type, resp)
-                # cache miss can only happen if resource is cacheable:
-                cache_hit = False
+            # Coalescing requests across processes
+            with self.cache.lock(
+                path,
+                qs,
+                media_type,
+                self.coalescing_lock_timeout,
+                ttl=self.coalescing_lock_ttl,
+            ) as acquired:
+                if acquired:
+                    # The lock might have been held by another process that
+                    # has just populated the cache.
+                    with timed(CACHE_GET_PHASE):
+                        cached_response = self.cache.get(path, qs, media_type)
+                    if cached_response is not None:
+                        return cached_response, True
+
+                # Waiting processes must find the response in the cache once the
+                # lock is released, hence the cache is written synchronously,
+                # and streamed bodies are buffered while holding the lock.
+                resp, cache_hit = self._uncached_request(
+                    path, qs, media_type, request, write_through=acquired
+                )
+                if cache_hit is None:
+                    with self._uncacheable_lock:
+                        self._uncacheable[key] = True
+                return resp, cache_hit
 
-            self.tel_collector.collect_proxy_request_metrics(client, request, cache_hit)
-            return resp
+        now = datetime.now(timezone.utc)
+        rule = self._get_freshness_rule(path)
+        age = get_response_age(cached_response, now)
+        if rule is not None and age is not None:
+            if age < rule.max_age:
+                # fresh cache hit
+                fresh_response = copy_response(cached_response)
+                fresh_response.headers["Age"] = str(age)
+                return fresh_response, True
+
+            if (
+                self.refresher is not None
+                and age < rule.max_age + rule.stale_while_revalidate
+            ):
+                # stale cache hit, while revalidating in the background
+                self.refresher.submit(
+                    (path, qs, media_type),
+                    partial(
+                        self._refresh,
+                        path,
+                        qs,
+                        media_type,
+                        detach_request(request),
+                        cached_response,
+                    ),
+                )
+                stale_response = copy_response(cached_response)
+                stale_response.headers["Age"] = str(age)
+                stale_response.headers["Warning"] = '110 - "Response is Stale"'
+                return stale_response, True
+
+        try:
+            resp, cache_hit = self._revalidate(
+                path, qs, media_type, request, cached_response
+            )
+        except (TokensRateLimitedError, requests.RequestException) as e:
+            reason = (
+                "rate_limited"
+                if isinstance(e, TokensRateLimitedError)
+                else type(e).__name__
+            )
+            fallback = self._stale_if_error(cached_response, age, request, reason)
+            if fallback is None:
+                raise
+            return fallback, True
 
+        if resp.status_code >= 500:
+            fallback = self._stale_if_error(
+                cached_response, age, request, str(resp.status_code)
+            )
+            if fallback is not None:
+                resp.close()  # releases the upstream connection of streamed errors
+                return fallback, True
+
+        return resp, cache_hit
+
+    def _is_uncacheable(self, key: CacheKey) -> bool:
+        with self._uncacheable_lock:
+            return key in self._uncacheable
+
+    def _revalidate(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+        cached_response: werkzeug.Response,
+    ) -> Tuple[werkzeug.Response, bool]:
         # conditional request
         resp = self._send_gh_request(
             path,
@@ -233,17 +1232,99 @@ class Proxy:
             etag=cached_response.headers.get("Etag"),
             last_modified=cached_response.headers.get("Last-Modified"),
         )
+        if resp.status_code >= 500:
+            # Server errors must not replace the cached response
+            return resp, False
+
         if resp.status_code != 304:
-            self.cache.set(path, qs, media_type, resp)
-            self.tel_collector.collect_proxy_request_metrics(
-                client, request, cache_hit=False
+            self._cache_set(path, qs, media_type, resp)
+            return resp, False
+
+        # The cached response was revalidated, hence its age (which freshness
+        # windows and stale-if-error are based on) is renewed.
+        cached_response = revalidated_response(cached_response, resp)
+        self._cache_set(path, qs, media_type, cached_response)
+        return cached_response, True  # cache hit
+
+    def _refresh(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+        cached_response: werkzeug.Response,
+    ) -> None:
+        resp, _ = self._revalidate(path, qs, media_type, request, cached_response)
+        # Streamed responses are cached once their body is consumed
+        resp.get_data()
+        resp.close()
+
+    def _uncached_request(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        request: werkzeug.Request,
+        write_through: bool = False,
+    ) -> Tuple[werkzeug.Response, Optional[bool]]:
+        resp = self._send_gh_request(path, request)
+        etag_value, _ = resp.get_etag()
+
+        if not (etag_value or resp.last_modified):
+            return resp, None
+
+        self._cache_set(path, qs, media_type, resp, write_through=write_through)
+
+        # cache miss can only happen if resource is cacheable:
+        return resp, False
+
+    def _cache_set(
+        self,
+        path: str,
+        qs: Optional[str],
+        media_type: str,
+        resp: werkzeug.Response,
+        write_through: bool = False,
+    ) -> None:
+        if resp.date is None:
+            # The Date header marks the age of the cached response
+            resp.date = datetime.now(timezone.utc)
+
+        if (
+            resp.is_streamed
+            and write_through
+            and not buffer_body(resp, self.cache_max_body_size)
+        ):
+            return  # too large to be cached
+
+        if resp.is_streamed:
+            # The response is cached once streamed to the client, as long as
+            # its body fits in the size limit.
+            status, headers = resp.status, Headers(resp.headers)
+
+            def on_complete(body: bytes) -> None:
+                self._cache_set(
+                    path,
+                    qs,
+                    media_type,
+                    werkzeug.Response(response=body, status=status, headers=headers),
+                    write_through=write_through,
+                )
+
+            upstream_close = getattr(resp.response, "close", None)
+            resp.response = tee_body(
+                resp.iter_encoded(), self.cache_max_body_size, on_complete
             )
-            return resp
+            if upstream_close is not None:
+                # Releases the upstream connection if the client disconnects
+                resp.call_on_close(upstream_close)
+            return
 
-        self.tel_collector.collect_proxy_request_metrics(
-            client, request, cache_hit=True
-        )
-        return cached_response  # cache hit
+        with timed(CACHE_SET_PHASE):
+            if self.cache_writer is not None and not write_through:
+                self.cache_writer.set(path, qs, media_type, resp)
+            else:
+                self.cache.set(path, qs, media_type, resp)
 
     def _send_gh_request(
         self,
@@ -252,64 +1333,62 @@ class Proxy:
         etag: Optional[str] = None,
         last_modified: Optional[str] = None,
     ) -> werkzeug.Response:
-        # Filter request headers
-        headers = {
-            k: v
-            for k, v in request.headers.items()
-            if k not in REQUEST_FILTERED_HEADERS
-        }
+        headers = self._gh_request_headers(request, etag, last_modified)
 
-        # Adding cache headers:
-        # Note that it is not necessary to send both cache headers.
-        # It is preferred to send only the If-Modified-Since header (if available),
-        # since it can be reused across different GitHub tokens.
-        # Etags on the other hand, are token specific.
-        # For example, if the token of a GitHub app is renewed,
-        # it cannot reuse the Etags of the previous expired token (whereas
-        # the Last-Modified timestamp would still work).
-        if last_modified is not None:
-            headers["If-Modified-Since"] = last_modified
-        elif etag is not None:
-            headers["If-None-Match"] = etag
+        bucket = get_ratelimit_bucket(path)
+        tokens = self._tokens(bucket, get_resource_owner(path))
+        while True:
+            # Generating the token of a GitHub App may require a request to GitHub
+            with timed(TOKEN_PHASE):
+                token = next(tokens, None)
+            if token is None:
+                break
 
-        for token in token_generator(
-            self.integrations, self.gh_token_config.github_pats, self.rate_limited
-        ):
             logger.info("Using %s %s token", token.origin.value, token.name)
             # Adding auth
             headers["Authorization"] = f"token {token.value}"
 
-            resp = self.requester.request(
-                method=request.method.lower(),
-                url=f'{self.github_api_url.rstrip("/")}/{path}',
-                data=request.data,
-                headers=headers,
-                params=request.args.to_dict(),
-            )
+            with timed(UPSTREAM_PHASE), self._throttle_slot():
+                resp = self.requester.request(
+                    method=request.method.lower(),
+                    url=self._gh_url(path),
+                    data=request.data,
+                    headers=headers,
+                    params=request.args.to_dict(),
+                    stream=self.stream_responses,
+                )
             self.tel_collector.collect_gh_response_metrics(token, resp)
+            self.tel_collector.collect_connection_reuse_metrics(
+                *self.requester.connection_stats()
+            )
 
-            if is_rate_limited(resp):
-                reset = get_ratelimit_reset(resp)
-                if reset:
-                    self.rate_limited[(token.origin, token.name)] = reset
-                    logger.warning(
-                        "%s %s is rate limited. Resetting at %s",
-                        token.origin.value,
-                        token.name,
-                        reset,
-                    )
-            else:
+            if self._record_rate_limit(token, resp, bucket):
+                resp.close()
+                continue
+
+            with timed(FILTER_HEADERS_PHASE):
                 # Filter response headers
                 for h in RESPONSE_FILTERED_HEADERS:
                     resp.headers.pop(h, None)
 
+                if self.stream_responses:
+                    streamed = werkzeug.Response(
+                        response=stream_body(resp),
+                        status=resp.status_code,
+                        headers=resp.headers.items(),
+                    )
+                    # Releases the upstream connection even if the body is
+                    # never iterated, eg when the client disconnects early.
+                    streamed.call_on_close(resp.close)
+                    return streamed
+
                 return werkzeug.Response(
                     response=resp.content,
                     status=resp.status_code,
                     headers=resp.headers.items(),
                 )
 
-        raise RuntimeError("All available GitHub tokens are rate limited")
+        raise TokensRateLimitedError("All available GitHub tokens are rate limited")
 
     def health(self) -> bool:
         """
@@ -317,3 +1396,14 @@ class Proxy:
         """
         resp = self.cached_request("zen", werkzeug.Request.from_values(), "healthcheck")
         return resp.status_code == 200
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Release the resources of the proxy. Pending background revalidations
+        and cache writes are flushed.
+        """
+        if self.refresher is not None:
+            self.refresher.close(timeout)
+
+        if self.cache_writer is not None:
+            self.cache_writer.close(timeout)
@@ -1,39 +1,132 @@
+import re
 from datetime import datetime
+from datetime import timezone
 from typing import Callable
+from typing import Mapping
+from typing import NamedTuple
 from typing import Optional
+from typing import Protocol
 from typing import TypeVar
 
-import requests
+from werkzeug.http import parse_date
 
 REMAINING_RATELIMIT_HEADER = "x-ratelimit-remaining"
 RESET_RATELIMIT_HEADER = "x-ratelimit-reset"
 LIMIT_RATELIMIT_HEADER = "x-ratelimit-limit"
+RESOURCE_RATELIMIT_HEADER = "x-ratelimit-resource"
+RETRY_AFTER_HEADER = "retry-after"
 
+RATE_LIMITED_STATUSES = (403, 429)
 
-def is_rate_limited(resp: requests.Response) -> bool:
+# GitHub tracks separate rate limit budgets (buckets) per resource
+DEFAULT_BUCKET = "core"
+_PATH_BUCKETS = (
+    (re.compile(r"^/?graphql(/|$)"), "graphql"),
+    (re.compile(r"^/?search/code(/|$)"), "code_search"),
+    (re.compile(r"^/?search(/|$)"), "search"),
+)
+
+
+class HTTPResponse(Protocol):
+    """Response of the GitHub origin, be it a requests or an httpx response"""
+
+    @property
+    def status_code(self) -> int:
+        ...
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        ...
+
+
+class RateLimitBudget(NamedTuple):
+    """Rate limit budget of a GitHub token, as last reported by GitHub"""
+
+    remaining: int
+    reset: datetime
+    limit: Optional[int] = None
+
+
+def is_rate_limited(resp: HTTPResponse) -> bool:
     remaining = get_ratelimit_remaining(resp)
-    return resp.status_code == 403 and remaining is not None and remaining == 0
+    return (
+        resp.status_code in RATE_LIMITED_STATUSES
+        and remaining is not None
+        and remaining == 0
+    )
+
+
+def is_secondary_rate_limited(resp: HTTPResponse) -> bool:
+    """
+    Secondary rate limits (eg too many concurrent requests) are signaled
+    with a ``Retry-After`` header, while the primary budget is not exhausted.
+    """
+    return (
+        resp.status_code in RATE_LIMITED_STATUSES
+        and not is_rate_limited(resp)
+        and get_retry_after(resp) is not None
+    )
+
 
+def get_retry_after(resp: HTTPResponse) -> Optional[float]:
+    """Seconds to wait before retrying, as per the ``Retry-After`` header"""
+    return _get_optional_header(resp, RETRY_AFTER_HEADER, _parse_retry_after)
 
-def get_ratelimit_remaining(resp: requests.Response) -> Optional[int]:
+
+def get_ratelimit_remaining(resp: HTTPResponse) -> Optional[int]:
     return _get_optional_header(resp, REMAINING_RATELIMIT_HEADER, int)
 
 
-def get_ratelimit_limit(resp: requests.Response) -> Optional[int]:
+def get_ratelimit_limit(resp: HTTPResponse) -> Optional[int]:
     return _get_optional_header(resp, LIMIT_RATELIMIT_HEADER, int)
 
 
-def get_ratelimit_reset(resp: requests.Response) -> Optional[datetime]:
+def get_ratelimit_reset(resp: HTTPResponse) -> Optional[datetime]:
     return _get_optional_header(
         resp, RESET_RATELIMIT_HEADER, lambda s: datetime.utcfromtimestamp(float(s))
     )
 
 
+def get_ratelimit_resource(resp: HTTPResponse) -> Optional[str]:
+    return _get_optional_header(resp, RESOURCE_RATELIMIT_HEADER, str)
+
+
+def get_ratelimit_bucket(path: str) -> str:
+    """
+    Predict the rate limit bucket of a request to GitHub from its path.
+    GitHub reports the actual bucket via the ``x-ratelimit-resource`` header.
+    """
+    for pattern, bucket in _PATH_BUCKETS:
+        if pattern.match(path):
+            return bucket
+    return DEFAULT_BUCKET
+
+
+def get_ratelimit_budget(resp: HTTPResponse) -> Optional[RateLimitBudget]:
+    remaining = get_ratelimit_remaining(resp)
+    reset = get_ratelimit_reset(resp)
+    if remaining is None or reset is None:
+        return None
+
+    return RateLimitBudget(remaining, reset, get_ratelimit_limit(resp))
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    # Either delay seconds or an HTTP date
+    if value.isdigit():
+        return float(value)
+
+    retry_at = parse_date(value)
+    if retry_at is None:
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
 T = TypeVar("T")
 
 
 def _get_optional_header(
-    resp: requests.Response, key: str, type_: Callable[[str], T]
+    resp: HTTPResponse, key: str, type_: Callable[[str], T]
 ) -> Optional[T]:
     serialized = resp.headers.get(key)
     if serialized is None:
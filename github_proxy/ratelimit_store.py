@@ -0,0 +1,182 @@
+import json
+import logging
+import math
+import threading
+from datetime import datetime
+from datetime import timedelta
+from typing import Callable
+from typing import Generic
+from typing import Iterator
+from typing import MutableMapping
+from typing import TypeVar
+from typing import cast
+
+from cachetools import TTLCache
+
+try:
+    import redis
+except ImportError:
+    redis = None  # type: ignore
+
+from github_proxy.github_tokens import GitHubTokenOrigin
+from github_proxy.github_tokens import RateLimitKey
+from github_proxy.ratelimit import RateLimitBudget
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+RATE_LIMITED_PREFIX = "ratelimited"
+BUDGETS_PREFIX = "ratelimit-budget"
+COOLDOWNS_PREFIX = "ratelimit-cooldown"
+
+_MISSING = object()
+
+
+class RedisTokenStore(MutableMapping[RateLimitKey, V], Generic[V]):
+    """
+    Mapping of GitHub tokens (and rate limit buckets) to their rate limit state,
+    shared by all the proxy processes through redis. Every entry expires (via
+    the redis key TTL) upon the rate limit reset of the token, plus a padding
+    accounting for potential clock drift between the GitHub servers and the proxy.
+
+    Lookups are cached in-process for ``local_ttl`` seconds, sparing a redis
+    round trip for every token considered by every proxied request. Redis errors
+    are logged, and the tokens are then considered not rate limited.
+
+    :param client: Redis client.
+    :param prefix: Prefix of the redis keys of the store.
+    :param dumps: Serializes a value into a string.
+    :param loads: Deserializes a string into a value.
+    :param reset: Returns the rate limit reset (naive UTC datetime) of a value.
+    :param padding: Padding added to the TTL of the entries.
+    :param local_ttl: TTL (in seconds) of the in-process cache of lookups.
+    """
+
+    def __init__(
+        self,
+        client: "redis.Redis[bytes]",
+        prefix: str,
+        dumps: Callable[[V], str],
+        loads: Callable[[str], V],
+        reset: Callable[[V], datetime],
+        padding: timedelta = timedelta(0),
+        local_ttl: float = 1,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.padding = padding
+        self._dumps = dumps
+        self._loads = loads
+        self._reset = reset
+        self._local: MutableMapping[RateLimitKey, object] = TTLCache(
+            maxsize=1024, ttl=local_ttl
+        )
+        self._local_lock = threading.Lock()
+
+    def _make_key(self, key: RateLimitKey) -> str:
+        origin, name, bucket = key
+        return f"{self.prefix}:{origin.name}:{bucket}:{name}"
+
+    def _parse_key(self, redis_key: bytes) -> RateLimitKey:
+        _, origin, bucket, name = redis_key.decode().split(":", 3)
+        return GitHubTokenOrigin[origin], name, bucket
+
+    def __getitem__(self, key: RateLimitKey) -> V:
+        with self._local_lock:
+            cached = self._local.get(key, _MISSING)
+        if cached is _MISSING:
+            try:
+                data = self.client.get(self._make_key(key))
+            except redis.RedisError as e:
+                logger.error("Failed reading rate limit state with error: %s", e)
+                data = None
+            cached = self._loads(data.decode()) if data else None
+            with self._local_lock:
+                self._local[key] = cached
+
+        if cached is None:
+            raise KeyError(key)
+        return cast(V, cached)
+
+    def __setitem__(self, key: RateLimitKey, value: V) -> None:
+        ttl = self._reset(value) + self.padding - datetime.utcnow()
+        with self._local_lock:
+            self._local[key] = value
+        try:
+            if ttl > timedelta(0):
+                self.client.set(
+                    self._make_key(key),
+                    self._dumps(value),
+                    ex=math.ceil(ttl.total_seconds()),
+                )
+            else:
+                # The value is already outdated
+                self.client.delete(self._make_key(key))
+        except redis.RedisError as e:
+            logger.error("Failed writing rate limit state with error: %s", e)
+
+    def __delitem__(self, key: RateLimitKey) -> None:
+        with self._local_lock:
+            self._local.pop(key, None)
+        if not self.client.delete(self._make_key(key)):
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[RateLimitKey]:
+        for redis_key in self.client.scan_iter(match=f"{self.prefix}:*"):
+            yield self._parse_key(redis_key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def redis_rate_limited(
+    client: "redis.Redis[bytes]", padding: timedelta
+) -> RedisTokenStore[datetime]:
+    """Shared store of rate-limited tokens, mapped to their rate limit reset"""
+    return RedisTokenStore(
+        client,
+        prefix=RATE_LIMITED_PREFIX,
+        dumps=datetime.isoformat,
+        loads=datetime.fromisoformat,
+        reset=lambda reset: reset,
+        padding=padding,
+    )
+
+
+def redis_cooldowns(client: "redis.Redis[bytes]") -> RedisTokenStore[datetime]:
+    """
+    Shared store of the tokens cooling down after a secondary rate limit, mapped
+    to the end of their ``Retry-After`` period. The period is measured by the
+    proxy clock, hence its entries are not padded.
+    """
+    return RedisTokenStore(
+        client,
+        prefix=COOLDOWNS_PREFIX,
+        dumps=datetime.isoformat,
+        loads=datetime.fromisoformat,
+        reset=lambda until: until,
+    )
+
+
+def redis_rate_limit_budgets(
+    client: "redis.Redis[bytes]", padding: timedelta
+) -> RedisTokenStore[RateLimitBudget]:
+    """Shared store of the last known rate limit budgets of tokens"""
+    return RedisTokenStore(
+        client,
+        prefix=BUDGETS_PREFIX,
+        dumps=_dump_budget,
+        loads=_load_budget,
+        reset=lambda budget: budget.reset,
+        padding=padding,
+    )
+
+
+def _dump_budget(budget: RateLimitBudget) -> str:
+    return json.dumps([budget.remaining, budget.reset.isoformat(), budget.limit])
+
+
+def _load_budget(data: str) -> RateLimitBudget:
+    remaining, reset, limit = json.loads(data)
+    return RateLimitBudget(remaining, datetime.fromisoformat(reset), limit)
@@ -0,0 +1,272 @@
+import threading
+import time
+from datetime import timedelta
+from typing import Any
+from typing import Iterator
+from typing import Mapping
+from typing import Optional
+from typing import Protocol
+from typing import Tuple
+from typing import Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # type: ignore
+
+# Transient statuses of the GitHub origin that idempotent requests are retried on
+RETRY_STATUSES = (502, 503, 504)
+
+# (connect, read) timeout in seconds
+Timeout = Tuple[Optional[float], Optional[float]]
+
+
+class RequesterConfig(Protocol):
+    github_pool_maxsize: int
+    github_pool_block: bool
+    github_connect_timeout: Optional[float]
+    github_read_timeout: Optional[float]
+    github_retries: int
+    github_retry_backoff_factor: float
+    github_http2: bool
+
+
+class ConnectionStats:
+    """
+    Running totals of the connections opened, and the requests sent, to GitHub.
+    The connection reuse ratio is ``1 - connections / requests``.
+
+    Connections are counted via the ``trace`` extension of httpx (see ``trace``
+    and ``atrace`` for the sync and async clients respectively).
+    """
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def trace(self, event_name: str, info: Mapping[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+
+    async def atrace(self, event_name: str, info: Mapping[str, Any]) -> None:
+        self.trace(event_name, info)
+
+    def add_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+
+class GitHubSession(requests.Session):
+    """
+    requests session with a default timeout, that reports the reuse of its
+    pooled connections.
+
+    :param timeout: Default (connect, read) timeout of the requests.
+    """
+
+    def __init__(self, timeout: Optional[Timeout] = None) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def request(  # type: ignore[override]
+        self, method: str, url: str, **kwargs: Any
+    ) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+    def connection_stats(self) -> Tuple[int, int]:
+        """
+        Number of connections opened, and number of requests sent, by the
+        connection pools of the session.
+        """
+        connections = sent_requests = 0
+        for adapter in self.adapters.values():
+            if not isinstance(adapter, HTTPAdapter):
+                continue
+
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    sent_requests += pool.num_requests
+
+        return connections, sent_requests
+
+
+class HTTP2Session(GitHubSession):
+    """
+    Shim of a requests session, sending requests over HTTP/2 via httpx. Requests
+    to the same host are multiplexed over a few connections. The responses and
+    the errors of httpx are translated to their requests counterparts.
+
+    :param timeout: Default (connect, read) timeout of the requests.
+    :param pool_maxsize: Max number of connections.
+    :param retries: Number of retries of failed connection attempts.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[Timeout] = None,
+        pool_maxsize: int = 10,
+        retries: int = 0,
+    ) -> None:
+        if httpx is None:
+            raise RuntimeError(
+                "The httpx package needs to be installed in order to "
+                "use the HTTP/2 transport: pip install github-proxy[http2]"
+            )
+
+        super().__init__(timeout)
+        try:
+            transport = httpx.HTTPTransport(
+                http2=True,
+                retries=retries,
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize,
+                ),
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                "The h2 package needs to be installed in order to "
+                "use the HTTP/2 transport: pip install github-proxy[http2]"
+            ) from e
+
+        self._client = httpx.Client(transport=transport)
+        self._stats = ConnectionStats()
+
+    def request(  # type: ignore[override]
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, str]] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[Timeout] = None,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> requests.Response:
+        connect_timeout, read_timeout = timeout or self.timeout or (None, None)
+        request = self._client.build_request(
+            method.upper(),
+            url,
+            params=params,
+            content=data,
+            headers=headers,
+            timeout=httpx.Timeout(None, connect=connect_timeout, read=read_timeout),
+            extensions={"trace": self._stats.trace},
+        )
+        start = time.perf_counter()
+        try:
+            # Redirects (eg of renamed repos) are followed, like by requests
+            resp = self._client.send(request, stream=True, follow_redirects=True)
+        except httpx.HTTPError as e:
+            raise translate_error(e) from e
+        self._stats.add_request()
+
+        response = requests.Response()
+        # Like requests, the time elapsed until the response headers are parsed
+        response.elapsed = timedelta(seconds=time.perf_counter() - start)
+        response.status_code = resp.status_code
+        response.headers = CaseInsensitiveDict(resp.headers.items())
+        response.url = str(resp.url)
+        response.reason = resp.reason_phrase
+        response.raw = _StreamedBody(resp)
+        if not stream:
+            response.content  # consumes the body and releases the connection
+        return response
+
+    def connection_stats(self) -> Tuple[int, int]:
+        return self._stats.connections, self._stats.requests
+
+    def close(self) -> None:
+        self._client.close()
+        super().close()
+
+
+class _StreamedBody:
+    """Body of an httpx response, as read by a requests response"""
+
+    def __init__(self, resp: "httpx.Response") -> None:
+        self._resp = resp
+
+    def stream(self, chunk_size: int, decode_content: bool = True) -> Iterator[bytes]:
+        try:
+            yield from self._resp.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise translate_error(e) from e
+        finally:
+            self._resp.close()
+
+    def close(self) -> None:
+        self._resp.close()
+
+
+def translate_error(
+    error: "httpx.HTTPError",
+) -> Union[requests.Timeout, requests.ConnectionError]:
+    if isinstance(error, httpx.TimeoutException):
+        return requests.Timeout(str(error))
+    return requests.ConnectionError(str(error))
+
+
+def build_requester(config: RequesterConfig) -> GitHubSession:
+    """
+    Requester of the ``Proxy``, with pooled connections to the GitHub host.
+    Idempotent requests are retried on connection errors and transient
+    server errors.
+    """
+    timeout = (config.github_connect_timeout, config.github_read_timeout)
+    if config.github_http2:
+        return HTTP2Session(
+            timeout,
+            pool_maxsize=config.github_pool_maxsize,
+            retries=config.github_retries,
+        )
+
+    session = GitHubSession(timeout)
+    adapter = HTTPAdapter(
+        pool_maxsize=config.github_pool_maxsize,
+        pool_block=config.github_pool_block,
+        max_retries=Retry(
+            total=config.github_retries,
+            backoff_factor=config.github_retry_backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_async_requester(config: RequesterConfig) -> "httpx.AsyncClient":
+    """
+    Requester of the ``AsyncProxy``. Only connection attempts are retried.
+    Redirects are followed.
+    """
+    limits = httpx.Limits(
+        max_connections=config.github_pool_maxsize,
+        max_keepalive_connections=config.github_pool_maxsize,
+    )
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            http2=config.github_http2, retries=config.github_retries, limits=limits
+        ),
+        timeout=httpx.Timeout(
+            None,
+            connect=config.github_connect_timeout,
+            read=config.github_read_timeout,
+        ),
+        # Redirects (eg of renamed repos) are followed, like by the ``Proxy``
+        follow_redirects=True,
+    )
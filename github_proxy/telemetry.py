@@ -1,14 +1,67 @@
+import os
+import threading
 from abc import ABC
 from abc import abstractmethod
+from typing import Any
 from typing import ClassVar
+from typing import Dict
 from typing import MutableMapping
 from typing import Optional
+from typing import Tuple
 from typing import Type
 
-import requests
 import werkzeug
 
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None  # type: ignore
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace.propagation.tracecontext import (
+        TraceContextTextMapPropagator,
+    )
+except ImportError:
+    trace = None  # type: ignore
+
 from github_proxy.github_tokens import GitHubToken
+from github_proxy.ratelimit import HTTPResponse
+from github_proxy.ratelimit import get_ratelimit_remaining
+from github_proxy.ratelimit import get_ratelimit_resource
+from github_proxy.timing import RequestTiming
+
+# Directory shared by the processes of multi-process servers (eg gunicorn workers),
+# through which their Prometheus metrics are aggregated.
+PROMETHEUS_MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Buckets (in seconds) of the latency of the GitHub responses
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Buckets (in seconds) of the durations of the phases of the proxied requests,
+# and of the compression of cached responses
+PHASE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Buckets of the ratio of the compressed size to the original size of bodies
+COMPRESSION_RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+_CACHE_HIT_LABELS = {None: "uncacheable", True: "hit", False: "miss"}
 
 
 class TelemetryCollector(ABC):
@@ -21,7 +74,7 @@ class TelemetryCollector(ABC):
 
     @abstractmethod
     def collect_gh_response_metrics(
-        self, token: GitHubToken, response: requests.Response
+        self, token: GitHubToken, response: HTTPResponse
     ) -> None:
         ...
 
@@ -34,6 +87,77 @@ class TelemetryCollector(ABC):
     ) -> None:
         ...
 
+    def collect_cache_write_queue_metrics(
+        self, queue_depth: int, dropped: bool = False
+    ) -> None:
+        """
+        Collect the state of the asynchronous cache writer queue upon every
+        submitted write. Optional to implement.
+        """
+
+    def collect_stale_response_metrics(
+        self, request: werkzeug.Request, reason: str
+    ) -> None:
+        """
+        Collect the serving of a stale cached response, in place of an error of
+        the GitHub origin. Optional to implement.
+        """
+
+    def collect_cache_compression_metrics(
+        self,
+        encoding: str,
+        operation: str,
+        original_size: int,
+        compressed_size: int,
+        duration: float,
+    ) -> None:
+        """
+        Collect the compression ratio and CPU cost (in seconds) of compressing
+        or decompressing (see ``operation``) a cached response body.
+        Optional to implement.
+        """
+
+    def collect_cache_memory_metrics(
+        self,
+        cache: str,
+        entries: int,
+        size: int,
+        hits: int,
+        misses: int,
+        evictions: int,
+    ) -> None:
+        """
+        Collect the state of an in-process cache of responses upon every lookup
+        and write: its number of entries, its size in bytes, and the running
+        totals of hits, misses and evictions. Optional to implement.
+        """
+
+    def collect_connection_reuse_metrics(self, connections: int, requests: int) -> None:
+        """
+        Collect the running totals of the connections opened, and the requests
+        sent, to GitHub upon every response of GitHub. The connection reuse
+        ratio is ``1 - connections / requests``. Optional to implement.
+        """
+
+    def collect_warm_up_metrics(self, app: str, duration: float) -> None:
+        """
+        Collect the time (in seconds) that a GitHub App took to warm up, ie
+        to build its integration and mint its initial token. Optional to implement.
+        """
+
+    def collect_phase_metrics(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        timing: RequestTiming,
+        cache_hit: Optional[bool] = None,
+    ) -> None:
+        """
+        Collect the durations of the phases of a proxied request (cache lookup,
+        token generation, request to GitHub, header filtering, cache write), once
+        its response is ready. See ``github_proxy.timing``. Optional to implement.
+        """
+
     @classmethod
     def from_type(cls, type_: str) -> "TelemetryCollector":
         if type_ not in cls._registry:
@@ -44,7 +168,7 @@ class TelemetryCollector(ABC):
 
 class NoopTelemetryCollector(TelemetryCollector, type_="noop"):
     def collect_gh_response_metrics(
-        self, token: GitHubToken, response: requests.Response
+        self, token: GitHubToken, response: HTTPResponse
     ) -> None:
         ...
 
@@ -55,3 +179,350 @@ class NoopTelemetryCollector(TelemetryCollector, type_="noop"):
         cache_hit: Optional[bool] = None,
     ) -> None:
         ...
+
+
+class PrometheusTelemetryCollector(TelemetryCollector, type_="prometheus"):
+    """
+    Collects the telemetry of the proxy as Prometheus metrics, exposed through
+    ``render_metrics`` (see ``github_proxy.views.metrics_blueprint``).
+
+    Under multi-process servers (eg gunicorn with multiple workers), the
+    ``PROMETHEUS_MULTIPROC_DIR`` env var must point to an empty directory shared
+    by the processes, and the metrics of all the processes are aggregated upon
+    exposition. See https://prometheus.github.io/client_python/multiprocess/
+
+    :param registry: Registry of the metrics. Defaults to a registry dedicated
+                     to the collector.
+    """
+
+    def __init__(
+        self, registry: Optional["prometheus_client.CollectorRegistry"] = None
+    ) -> None:
+        if prometheus_client is None:
+            raise RuntimeError(
+                "The prometheus-client package needs to be installed in order to "
+                "use the prometheus telemetry collector: "
+                "pip install github-proxy[prometheus]"
+            )
+
+        self.registry = registry or prometheus_client.CollectorRegistry()
+        self.proxy_requests = prometheus_client.Counter(
+            "github_proxy_requests",
+            "Requests of the proxy clients, by client, method and cache hit",
+            ["client", "method", "cache_hit"],
+            registry=self.registry,
+        )
+        self.gh_responses = prometheus_client.Counter(
+            "github_proxy_github_responses",
+            "Responses of GitHub, by token and status code",
+            ["token_origin", "token", "status"],
+            registry=self.registry,
+        )
+        self.gh_latency = prometheus_client.Histogram(
+            "github_proxy_github_response_seconds",
+            "Time until the headers of the GitHub responses are received",
+            ["token_origin"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.ratelimit_remaining = prometheus_client.Gauge(
+            "github_proxy_github_ratelimit_remaining",
+            "Remaining rate limit budget of the GitHub tokens, as last reported",
+            ["token_origin", "token", "resource"],
+            multiprocess_mode="mostrecent",
+            registry=self.registry,
+        )
+        self.stale_responses = prometheus_client.Counter(
+            "github_proxy_stale_responses",
+            "Stale cached responses served in place of GitHub errors, by reason",
+            ["reason"],
+            registry=self.registry,
+        )
+        self.cache_write_queue_depth = prometheus_client.Gauge(
+            "github_proxy_cache_write_queue_depth",
+            "Pending writes of the asynchronous cache writer",
+            multiprocess_mode="livesum",
+            registry=self.registry,
+        )
+        self.cache_write_drops = prometheus_client.Counter(
+            "github_proxy_cache_write_drops",
+            "Cache writes dropped as the queue of the cache writer was full",
+            registry=self.registry,
+        )
+        self.compression_ratio = prometheus_client.Histogram(
+            "github_proxy_cache_compression_ratio",
+            "Ratio of the compressed size to the original size of cached bodies",
+            ["encoding", "operation"],
+            buckets=COMPRESSION_RATIO_BUCKETS,
+            registry=self.registry,
+        )
+        self.compression_duration = prometheus_client.Histogram(
+            "github_proxy_cache_compression_seconds",
+            "Time spent compressing and decompressing cached bodies",
+            ["encoding", "operation"],
+            buckets=PHASE_BUCKETS,
+            registry=self.registry,
+        )
+        self.memory_cache_entries = prometheus_client.Gauge(
+            "github_proxy_memory_cache_entries",
+            "Entries of the in-process caches of responses",
+            ["cache"],
+            multiprocess_mode="livesum",
+            registry=self.registry,
+        )
+        self.memory_cache_size = prometheus_client.Gauge(
+            "github_proxy_memory_cache_bytes",
+            "Size of the in-process caches of responses",
+            ["cache"],
+            multiprocess_mode="livesum",
+            registry=self.registry,
+        )
+        self.memory_cache_lookups = prometheus_client.Counter(
+            "github_proxy_memory_cache_lookups",
+            "Lookups of the in-process caches of responses, by result",
+            ["cache", "result"],
+            registry=self.registry,
+        )
+        self.memory_cache_evictions = prometheus_client.Counter(
+            "github_proxy_memory_cache_evictions",
+            "Entries evicted from the in-process caches of responses",
+            ["cache"],
+            registry=self.registry,
+        )
+        self.gh_connections = prometheus_client.Counter(
+            "github_proxy_github_connections",
+            "Connections opened to GitHub",
+            registry=self.registry,
+        )
+        self.gh_connection_requests = prometheus_client.Counter(
+            "github_proxy_github_connection_requests",
+            "Requests sent to GitHub over the connections of the proxy",
+            registry=self.registry,
+        )
+        self.warm_up_duration = prometheus_client.Gauge(
+            "github_proxy_github_app_warm_up_seconds",
+            "Time that the GitHub Apps took to warm up",
+            ["app"],
+            multiprocess_mode="mostrecent",
+            registry=self.registry,
+        )
+        self.phase_duration = prometheus_client.Histogram(
+            "github_proxy_request_phase_seconds",
+            "Durations of the phases of the proxied requests, and of the requests "
+            "as a whole (the total phase)",
+            ["phase", "cache_hit"],
+            buckets=PHASE_BUCKETS,
+            registry=self.registry,
+        )
+        # Labelled metrics, by metric name and label values. Spares the label
+        # resolution of prometheus_client (a few microseconds) on every call.
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        # Last running totals reported to the collector, by metric name and
+        # label values, from which the counters are incremented.
+        self._totals: Dict[Tuple[str, ...], int] = {}
+        self._totals_lock = threading.Lock()
+
+    def collect_gh_response_metrics(
+        self, token: GitHubToken, response: HTTPResponse
+    ) -> None:
+        origin = token.origin.value
+        status = str(response.status_code)
+        self._labels(self.gh_responses, origin, token.name, status).inc()
+
+        elapsed = _get_elapsed(response)
+        if elapsed is not None:
+            self._labels(self.gh_latency, origin).observe(elapsed)
+
+        remaining = get_ratelimit_remaining(response)
+        if remaining is not None:
+            resource = get_ratelimit_resource(response) or "core"
+            self._labels(self.ratelimit_remaining, origin, token.name, resource).set(
+                remaining
+            )
+
+    def collect_proxy_request_metrics(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        cache_hit: Optional[bool] = None,
+    ) -> None:
+        self._labels(
+            self.proxy_requests, client, request.method, _CACHE_HIT_LABELS[cache_hit]
+        ).inc()
+
+    def collect_stale_response_metrics(
+        self, request: werkzeug.Request, reason: str
+    ) -> None:
+        self._labels(self.stale_responses, reason).inc()
+
+    def collect_cache_write_queue_metrics(
+        self, queue_depth: int, dropped: bool = False
+    ) -> None:
+        self.cache_write_queue_depth.set(queue_depth)
+        if dropped:
+            self.cache_write_drops.inc()
+
+    def collect_cache_compression_metrics(
+        self,
+        encoding: str,
+        operation: str,
+        original_size: int,
+        compressed_size: int,
+        duration: float,
+    ) -> None:
+        if original_size > 0:
+            self._labels(self.compression_ratio, encoding, operation).observe(
+                compressed_size / original_size
+            )
+        self._labels(self.compression_duration, encoding, operation).observe(duration)
+
+    def collect_cache_memory_metrics(
+        self,
+        cache: str,
+        entries: int,
+        size: int,
+        hits: int,
+        misses: int,
+        evictions: int,
+    ) -> None:
+        self._labels(self.memory_cache_entries, cache).set(entries)
+        self._labels(self.memory_cache_size, cache).set(size)
+        self._inc_total(self.memory_cache_lookups, hits, cache, "hit")
+        self._inc_total(self.memory_cache_lookups, misses, cache, "miss")
+        self._inc_total(self.memory_cache_evictions, evictions, cache)
+
+    def collect_connection_reuse_metrics(self, connections: int, requests: int) -> None:
+        self._inc_total(self.gh_connections, connections)
+        self._inc_total(self.gh_connection_requests, requests)
+
+    def collect_warm_up_metrics(self, app: str, duration: float) -> None:
+        self._labels(self.warm_up_duration, app).set(duration)
+
+    def collect_phase_metrics(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        timing: RequestTiming,
+        cache_hit: Optional[bool] = None,
+    ) -> None:
+        cache_hit_label = _CACHE_HIT_LABELS[cache_hit]
+        for phase in timing.phases:
+            self._labels(self.phase_duration, phase.name, cache_hit_label).observe(
+                phase.duration
+            )
+        if timing.duration is not None:
+            self._labels(self.phase_duration, "total", cache_hit_label).observe(
+                timing.duration
+            )
+
+    def _inc_total(self, counter: Any, total: int, *values: str) -> None:
+        """Increment a counter up to a running total reported by the proxy"""
+        key = (counter._name, *values)
+        with self._totals_lock:
+            last = self._totals.get(key, 0)
+            self._totals[key] = total
+        # A lower total means that the running total was reset, eg by a new cache
+        increment = total - last if total >= last else total
+        if increment > 0:
+            metric = self._labels(counter, *values) if values else counter
+            metric.inc(increment)
+
+    def _labels(self, metric: Any, *values: str) -> Any:
+        key = (metric._name, *values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*values)
+        return child
+
+    def render_metrics(self) -> Tuple[bytes, str]:
+        """Metrics in the Prometheus text format, and their content type"""
+        registry = self.registry
+        if os.environ.get(PROMETHEUS_MULTIPROC_DIR_ENV):
+            # The metrics of the current process are also read from the directory
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)  # type: ignore
+
+        return (
+            prometheus_client.generate_latest(registry),
+            prometheus_client.CONTENT_TYPE_LATEST,
+        )
+
+
+def _get_elapsed(response: HTTPResponse) -> Optional[float]:
+    try:
+        elapsed = getattr(response, "elapsed", None)
+    except RuntimeError:
+        # The elapsed time of httpx responses is only known once they are closed
+        return None
+
+    return None if elapsed is None else float(elapsed.total_seconds())
+
+
+class OpenTelemetryTelemetryCollector(TelemetryCollector, type_="opentelemetry"):
+    """
+    Emits an OpenTelemetry span for every proxied request, with a child span
+    for each of its phases (see ``github_proxy.timing``). Request spans are
+    parented to the trace context of the incoming ``traceparent`` header.
+
+    Spans are emitted through the globally configured tracer provider, eg by
+    the OpenTelemetry SDK or ``opentelemetry-instrument``.
+
+    :param tracer_provider: Provider of the tracer. Defaults to the global one.
+    """
+
+    def __init__(
+        self, tracer_provider: Optional["trace.TracerProvider"] = None
+    ) -> None:
+        if trace is None:
+            raise RuntimeError(
+                "The opentelemetry-api package needs to be installed in order to "
+                "use the opentelemetry telemetry collector: "
+                "pip install github-proxy[opentelemetry]"
+            )
+
+        self.tracer = trace.get_tracer("github_proxy", tracer_provider=tracer_provider)
+        self.propagator = TraceContextTextMapPropagator()
+
+    def collect_gh_response_metrics(
+        self, token: GitHubToken, response: HTTPResponse
+    ) -> None:
+        ...
+
+    def collect_proxy_request_metrics(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        cache_hit: Optional[bool] = None,
+    ) -> None:
+        ...
+
+    def collect_phase_metrics(
+        self,
+        client: str,
+        request: werkzeug.Request,
+        timing: RequestTiming,
+        cache_hit: Optional[bool] = None,
+    ) -> None:
+        span = self.tracer.start_span(
+            f"{request.method} {request.path}",
+            context=self.propagator.extract(request.headers),
+            kind=trace.SpanKind.SERVER,
+            start_time=_ns(timing.start),
+            attributes={
+                "http.request.method": request.method,
+                "url.path": request.path,
+                "github_proxy.client": client,
+                "github_proxy.cache_hit": _CACHE_HIT_LABELS[cache_hit],
+            },
+        )
+        context = trace.set_span_in_context(span)
+        for phase in timing.phases:
+            self.tracer.start_span(
+                phase.name, context=context, start_time=_ns(phase.start)
+            ).end(end_time=_ns(phase.start + phase.duration))
+
+        span.end(end_time=_ns(timing.start + (timing.duration or 0)))
+
+
+def _ns(timestamp: float) -> int:
+    return int(timestamp * 1e9)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from typing import AsyncIterator
+from typing import Iterator
+from typing import Optional
+
+
+class ConcurrencyThrottle:
+    """
+    Caps the number of concurrent requests to GitHub for a while, once GitHub
+    signals that the proxy is making too many concurrent requests (secondary
+    rate limits). Requests are not throttled otherwise.
+
+    :param max_concurrency: Max number of concurrent requests while throttled.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be positive")
+
+        self.max_concurrency = max_concurrency
+        self._until = 0.0
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # Created lazily, so that it is bound to the running event loop
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def throttled(self) -> bool:
+        return time.monotonic() < self._until
+
+    def trip(self, duration: float) -> None:
+        """Throttle the requests for the next ``duration`` seconds"""
+        self._until = max(self._until, time.monotonic() + duration)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Wait for a request slot, if throttled"""
+        if not self.throttled:
+            yield
+            return
+
+        with self._semaphore:
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """Wait for a request slot, if throttled"""
+        if not self.throttled:
+            yield
+            return
+
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._async_semaphore:
+            yield
@@ -0,0 +1,95 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+# Phases of the handling of a proxied request
+CACHE_GET_PHASE = "cache_get"
+TOKEN_PHASE = "token"
+UPSTREAM_PHASE = "upstream"
+FILTER_HEADERS_PHASE = "filter_headers"
+CACHE_SET_PHASE = "cache_set"
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+class Phase(NamedTuple):
+    """
+    :param name: Name of the phase, eg ``upstream``.
+    :param start: Start of the phase, as a timestamp (in seconds).
+    :param duration: Duration (in seconds) of the phase.
+    """
+
+    name: str
+    start: float
+    duration: float
+
+
+class RequestTiming:
+    """
+    Phases of the handling of a proxied request, in order of completion.
+    Phases that run multiple times (eg ``upstream``, when tokens are
+    rate-limited) are recorded once per run.
+    """
+
+    def __init__(self) -> None:
+        # Durations are measured with the monotonic clock, and anchored to the
+        # wall clock at the start of the request.
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        self.phases: List[Phase] = []
+        self.duration: Optional[float] = None
+
+    def timestamp(self, perf_counter: float) -> float:
+        return self.start + perf_counter - self._perf_start
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self._perf_start
+
+    def server_timing(self) -> str:
+        """Value of the ``Server-Timing`` header (durations in milliseconds)"""
+        metrics = [
+            f"{phase.name};dur={phase.duration * 1000:.3f}" for phase in self.phases
+        ]
+        if self.duration is not None:
+            metrics.append(f"total;dur={self.duration * 1000:.3f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "github_proxy_request_timing", default=None
+)
+
+
+@contextmanager
+def request_timing() -> Iterator[RequestTiming]:
+    """Time the phases of the request handled within the context"""
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        timing.end()
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Time a phase of the current request. No-op outside of ``request_timing``,
+    eg in the background revalidations of cached responses.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        timing.phases.append(Phase(name, timing.timestamp(start), end - start))
@@ -0,0 +1,208 @@
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from datetime import timedelta
+from typing import Callable
+from typing import Mapping
+from typing import Optional
+
+from github.InstallationAuthorization import InstallationAuthorization
+
+try:
+    import redis
+except ImportError:
+    redis = None  # type: ignore
+
+from github_proxy.github_tokens import CachedGithubIntegration
+from github_proxy.github_tokens import InstalledIntegration
+
+logger = logging.getLogger(__name__)
+
+TOKENS_PREFIX = "installation-token"
+EXPIRES_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class InstallationTokenRefresher:
+    """
+    Renews the installation access tokens of GitHub Apps in a background daemon
+    thread, ahead of their expiration, so that proxied requests do not block on
+    the JWT signing and the request to the installations API.
+
+    Optionally, the tokens are shared with the rest of the proxy processes
+    through redis, so that a single process mints every token. Shared tokens
+    are stored under keys of their own, until their expiration.
+
+    :param integrations: Returns the GitHub App integrations whose tokens are
+                         renewed, by token name.
+    :param interval: Time (in seconds) between refresh rounds. Tokens expiring
+                     within two intervals are renewed.
+    :param client: Redis client through which tokens are shared. Tokens are not
+                   shared if unset.
+    :param lock_timeout: Max time (in seconds) that a process waits for another
+                         process to mint a shared token.
+    :param discover: Re-discovers the installations of the GitHub Apps.
+    :param discovery_interval: Time (in seconds) between discoveries.
+    """
+
+    def __init__(
+        self,
+        integrations: Callable[[], Mapping[str, InstalledIntegration]],
+        interval: float,
+        client: Optional["redis.Redis[bytes]"] = None,
+        lock_timeout: float = 10,
+        discover: Optional[Callable[[], None]] = None,
+        discovery_interval: float = 3600,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self.integrations = integrations
+        self.interval = interval
+        self.client = client
+        self.lock_timeout = lock_timeout
+        self.discover = discover
+        self.discovery_interval = discovery_interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._work, name="installation-token-refresher", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def refresh(self) -> None:
+        """Renew the tokens that are about to expire"""
+        for app_name, (ghi, installation_id) in self.integrations().items():
+            if not isinstance(ghi, CachedGithubIntegration):
+                continue
+
+            try:
+                self._refresh(app_name, ghi, installation_id)
+            except Exception:
+                logger.exception("Failed refreshing the token of %s", app_name)
+
+    def _work(self) -> None:
+        next_discovery = time.monotonic() + self.discovery_interval
+        while not self._stopped.is_set():
+            if self.discover is not None and time.monotonic() >= next_discovery:
+                next_discovery = time.monotonic() + self.discovery_interval
+                try:
+                    self.discover()
+                except Exception:
+                    logger.exception("Failed discovering the installations")
+
+            self.refresh()
+            self._stopped.wait(self.interval)
+
+    def _is_expiring(
+        self, ghi: CachedGithubIntegration, authz: Optional[InstallationAuthorization]
+    ) -> bool:
+        if authz is None:
+            return True
+
+        horizon = datetime.utcnow() + timedelta(seconds=2 * self.interval)
+        return ghi.cache_expires_at(authz) <= horizon
+
+    def _refresh(
+        self, app_name: str, ghi: CachedGithubIntegration, installation_id: int
+    ) -> None:
+        if not self._is_expiring(ghi, ghi.cached_access_token(installation_id)):
+            return
+
+        if self.client is None:
+            authz = self._mint(app_name, ghi, installation_id)
+        else:
+            key = f"{TOKENS_PREFIX}:{app_name}:{installation_id}"
+            shared = self._get_shared(self.client, key)
+            if shared is None or self._is_expiring(ghi, shared):
+                authz = self._mint_shared(
+                    self.client, key, app_name, ghi, installation_id
+                )
+            else:
+                authz = shared
+
+        ghi.set_access_token(installation_id, authz)
+
+    def _mint(
+        self, app_name: str, ghi: CachedGithubIntegration, installation_id: int
+    ) -> InstallationAuthorization:
+        authz = ghi.mint_access_token(installation_id)
+        logger.info("Renewed the token of %s", app_name)
+        return authz
+
+    def _mint_shared(
+        self,
+        client: "redis.Redis[bytes]",
+        key: str,
+        app_name: str,
+        ghi: CachedGithubIntegration,
+        installation_id: int,
+    ) -> InstallationAuthorization:
+        lock = client.lock(
+            f"lock:{key}", timeout=self.lock_timeout, blocking_timeout=self.lock_timeout
+        )
+        try:
+            locked = bool(lock.acquire())
+        except redis.RedisError as e:
+            logger.error("Failed acquiring the lock of %s with error: %s", key, e)
+            locked = False
+
+        try:
+            # Another process may have renewed the token while waiting for the lock
+            authz = self._get_shared(client, key) if locked else None
+            if authz is None or self._is_expiring(ghi, authz):
+                authz = self._mint(app_name, ghi, installation_id)
+                self._set_shared(client, key, authz)
+            return authz
+        finally:
+            if locked:
+                try:
+                    lock.release()
+                except redis.RedisError as e:
+                    logger.warning(
+                        "Failed releasing the lock of %s with error: %s", key, e
+                    )
+
+    @staticmethod
+    def _get_shared(
+        client: "redis.Redis[bytes]", key: str
+    ) -> Optional[InstallationAuthorization]:
+        try:
+            value = client.get(key)
+        except redis.RedisError as e:
+            logger.error("Failed reading %s with error: %s", key, e)
+            return None
+        if value is None:
+            return None
+
+        return InstallationAuthorization(
+            requester=None,  # type: ignore
+            headers={},
+            attributes=json.loads(value),
+            completed=True,
+        )
+
+    @staticmethod
+    def _set_shared(
+        client: "redis.Redis[bytes]", key: str, authz: InstallationAuthorization
+    ) -> None:
+        attributes = {
+            "token": authz.token,
+            "expires_at": authz.expires_at.strftime(EXPIRES_AT_FORMAT),
+        }
+        # The token is shared until its expiration
+        ttl = authz.expires_at - datetime.utcnow()
+        if ttl <= timedelta(0):
+            return
+        try:
+            client.set(key, json.dumps(attributes), ex=math.ceil(ttl.total_seconds()))
+        except redis.RedisError as e:
+            logger.error("Failed writing %s with error: %s", key, e)
@@ -6,9 +6,14 @@ from flask import request
 from flask_httpauth import HTTPTokenAuth  # type: ignore
 
 from github_proxy.dependencies import inject_proxy
+from github_proxy.graphql import GRAPHQL_PATH
 from github_proxy.proxy import Proxy
+from github_proxy.telemetry import PrometheusTelemetryCollector
 
 blueprint = Blueprint("github_proxy", __name__)
+# Exposes the metrics of the prometheus telemetry collector. Meant to be mounted
+# under a separate prefix, so that it does not shadow any GitHub API path.
+metrics_blueprint = Blueprint("github_proxy_metrics", __name__)
 auth = HTTPTokenAuth(scheme="token")
 
 
@@ -35,4 +40,16 @@ def proxy(
     path: str,
     proxy: Proxy,
 ) -> werkzeug.Response:
+    if request.method == "POST" and path == GRAPHQL_PATH:
+        return proxy.graphql_request(path, request, auth.current_user())
     return proxy.request(path, request, auth.current_user())
+
+
+@metrics_blueprint.route("/metrics", methods=["GET"])
+@inject_proxy
+def metrics(proxy: Proxy) -> werkzeug.Response:
+    if not isinstance(proxy.tel_collector, PrometheusTelemetryCollector):
+        return werkzeug.Response("Not Found", status=404)
+
+    data, content_type = proxy.tel_collector.render_metrics()
+    return werkzeug.Response(data, content_type=content_type)
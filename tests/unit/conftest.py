@@ -1,14 +1,25 @@
+import asyncio
+import fnmatch
 import socket
+import threading
 from datetime import datetime
 from datetime import timedelta
 from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
 from typing import Tuple
 from unittest.mock import Mock
+from unittest.mock import patch
 
+import httpx
 import pytest
 from faker import Faker
 from github.InstallationAuthorization import InstallationAuthorization
 
+from github_proxy.async_proxy import AsyncProxy
+from github_proxy.cache import AsyncCacheBackend
 from github_proxy.cache import InMemoryCache
 from github_proxy.cache.backend import CacheBackend
 from github_proxy.config import Config
@@ -43,6 +54,16 @@ def socket_disabled():
     enable_socket()
 
 
+@pytest.fixture
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # The self-pipe of the event loop is a local socket pair
+    enable_socket()
+    loop = asyncio.new_event_loop()
+    disable_socket()
+    yield loop
+    loop.close()
+
+
 @pytest.fixture
 def github_app_config_factory(faker: Faker) -> Callable[..., GitHubAppConfig]:
     def factory(
@@ -79,7 +100,10 @@ def config_factory(
             github_api_url=faker.url(),
             github_creds_cache_ttl_padding=0,
             github_creds_cache_maxsize=512,
+            cache_backend_url="inmemory://",
             cache_ttl=3600,
+            cache_compression="none",
+            cache_compression_min_size=1024,
         )
 
     return factory
@@ -122,3 +146,97 @@ def proxy(config: Config, cache_backend: CacheBackend) -> Proxy:
         rate_limited={},
         tel_collector=Mock(),
     )
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in of the redis client"""
+
+    def __init__(self) -> None:
+        self.store: Dict[str, bytes] = {}
+        self.published: List[Tuple[str, str]] = []
+        self.ttls: Dict[str, int] = {}
+        self.locks: Dict[str, threading.Lock] = {}
+        self.round_trips = 0
+
+    def get(self, name: str) -> Optional[bytes]:
+        self.round_trips += 1
+        return self.store.get(name)
+
+    def setex(self, name: str, time: int, value: bytes) -> None:
+        self.round_trips += 1
+        self.store[name] = value
+
+    def set(self, name: str, value: str, ex: Optional[int] = None) -> None:
+        self.round_trips += 1
+        self.store[name] = value.encode()
+        if ex is not None:
+            self.ttls[name] = ex
+
+    def delete(self, name: str) -> int:
+        self.round_trips += 1
+        return int(self.store.pop(name, None) is not None)
+
+    def scan_iter(self, match: str) -> Iterator[bytes]:
+        self.round_trips += 1
+        for name in list(self.store):
+            if fnmatch.fnmatchcase(name, match):
+                yield name.encode()
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedisPipeline":
+        return FakeRedisPipeline(self)
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        blocking_timeout: Optional[float] = None,
+    ) -> threading.Lock:
+        return self.locks.setdefault(name, threading.Lock())
+
+
+class FakeRedisPipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.commands: List[Callable[[], None]] = []
+
+    def setex(self, name: str, time: int, value: bytes) -> None:
+        self.commands.append(lambda: self.client.store.__setitem__(name, value))
+
+    def publish(self, channel: str, message: str) -> None:
+        self.commands.append(lambda: self.client.published.append((channel, message)))
+
+    def execute(self) -> None:
+        self.client.round_trips += 1
+        for command in self.commands:
+            command()
+
+
+@pytest.fixture
+def fake_redis() -> Iterator[FakeRedis]:
+    client = FakeRedis()
+    with patch("redis.Redis.from_url", return_value=client):
+        yield client
+
+
+@pytest.fixture
+def async_proxy_factory(
+    config: Config, cache_backend: CacheBackend
+) -> Callable[..., AsyncProxy]:
+    def factory(handler: Callable[[httpx.Request], httpx.Response]) -> AsyncProxy:
+        return AsyncProxy(
+            github_api_url=config.github_api_url,
+            github_token_config=config,
+            cache=AsyncCacheBackend(cache_backend, offload=False),
+            rate_limited={},
+            tel_collector=Mock(),
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+    return factory
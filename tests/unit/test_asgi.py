@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import MutableMapping
+from typing import Tuple
+from unittest import mock
+
+import pytest
+import werkzeug
+
+from github_proxy.asgi import ProxyApp
+from github_proxy.async_proxy import AsyncProxy
+
+
+def call_app(
+    event_loop: asyncio.AbstractEventLoop,
+    app: ProxyApp,
+    method: str,
+    path: str,
+    headers: List[Tuple[bytes, bytes]],
+) -> List[Dict[str, Any]]:
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": headers,
+    }
+    sent: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        sent.append(dict(message))
+
+    event_loop.run_until_complete(app(scope, receive, send))
+    return sent
+
+
+@pytest.mark.parametrize(
+    "method, path, proxy_method, proxied_path",
+    [
+        ("GET", "/repos/foo/bar", "cached_request", "repos/foo/bar"),
+        ("GET", "/api/v3/repos/foo/bar", "cached_request", "repos/foo/bar"),
+        ("POST", "/repos/foo/bar/issues", "request", "repos/foo/bar/issues"),
+    ],
+)
+def test_proxy_app_routes_authorized_requests(
+    event_loop: asyncio.AbstractEventLoop,
+    method: str,
+    path: str,
+    proxy_method: str,
+    proxied_path: str,
+):
+    proxy = mock.Mock(spec=AsyncProxy)
+    proxy.auth.return_value = "foo-client"
+    getattr(proxy, proxy_method).return_value = werkzeug.Response(
+        "bar", headers={"Etag": '"baz"'}
+    )
+    app = ProxyApp(proxy, url_prefixes=("/api/v3", ""))
+
+    start, body = call_app(
+        event_loop, app, method, path, [(b"authorization", b"token secret")]
+    )
+
+    assert start["status"] == 200
+    assert (b"etag", b'"baz"') in start["headers"]
+    assert body["body"] == b"bar"
+    token, request = proxy.auth.call_args.args
+    assert token == "secret"
+    assert request.path == path
+    getattr(proxy, proxy_method).assert_called_once_with(
+        proxied_path, request, "foo-client"
+    )
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [[], [(b"authorization", b"token unknown")], [(b"authorization", b"Basic foo")]],
+)
+def test_proxy_app_rejects_unauthorized_requests(
+    event_loop: asyncio.AbstractEventLoop, headers: List[Tuple[bytes, bytes]]
+):
+    proxy = mock.Mock(spec=AsyncProxy)
+    proxy.auth.return_value = None
+    app = ProxyApp(proxy)
+
+    start, _ = call_app(event_loop, app, "GET", "/zen", headers)
+
+    assert start["status"] == 401
+    proxy.cached_request.assert_not_called()
+
+
+def test_proxy_app_builds_proxy_off_the_event_loop_on_startup(
+    event_loop: asyncio.AbstractEventLoop,
+):
+    proxy = mock.Mock(spec=AsyncProxy)
+    build_threads: List[threading.Thread] = []
+
+    def get_async_proxy(config: Any) -> AsyncProxy:
+        build_threads.append(threading.current_thread())
+        return proxy
+
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return next(messages)
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        sent.append(dict(message))
+
+    app = ProxyApp()
+    with mock.patch("github_proxy.asgi.get_config"), mock.patch(
+        "github_proxy.asgi.get_async_proxy", side_effect=get_async_proxy
+    ):
+        event_loop.run_until_complete(app({"type": "lifespan"}, receive, send))
+
+    assert [message["type"] for message in sent] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+    assert app.proxy is proxy
+    assert threading.main_thread() not in build_threads
+    proxy.aclose.assert_awaited_once()
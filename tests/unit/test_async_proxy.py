@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from typing import Callable
+from typing import Dict
+from typing import List
+from unittest import mock
+
+import httpx
+import pytest
+from faker import Faker
+from github import GithubIntegration
+from github.InstallationAuthorization import InstallationAuthorization
+from werkzeug import Request
+
+from github_proxy.async_proxy import AsyncProxy
+from github_proxy.github_tokens import InstalledIntegration
+from github_proxy.proxy import CacheFreshnessRule
+from github_proxy.proxy import TokensRateLimitedError
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_async_proxy_cached_request_revalidates_cached_response(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    async_proxy_factory: Callable[..., AsyncProxy],
+    event_loop: asyncio.AbstractEventLoop,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    token = faker.pystr()
+    get_access_token_mock.return_value = installation_authz_factory(token)
+    path = faker.uri_path()
+    etag = f'"{faker.pystr()}"'
+    upstream_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(request)
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            content=b"foo",
+            headers={"Etag": etag, "Content-Length": "3", "Connection": "close"},
+        )
+
+    proxy = async_proxy_factory(handler)
+    request = Request.from_values(headers=[("Accept", "application/json")])
+
+    async def send_twice() -> None:
+        miss = await proxy.cached_request(path, request, faker.word())
+        assert miss.data == b"foo"
+        assert "Connection" not in miss.headers
+
+        hit = await proxy.cached_request(path, request, faker.word())
+        assert hit.data == b"foo"
+        await proxy.aclose()
+
+    event_loop.run_until_complete(send_twice())
+
+    assert len(upstream_requests) == 2
+    assert upstream_requests[0].headers["Authorization"] == f"token {token}"
+    assert upstream_requests[1].headers["If-None-Match"] == etag
+    proxy.tel_collector.collect_proxy_request_metrics.assert_called_with(  # type: ignore # noqa: E501
+        mock.ANY, request, cache_hit=True
+    )
+
+
+def test_async_proxy_cached_request_serves_fresh_cache_entry(
+    faker: Faker,
+    async_proxy_factory: Callable[..., AsyncProxy],
+    event_loop: asyncio.AbstractEventLoop,
+):
+    path = faker.uri_path()
+    proxy = async_proxy_factory(
+        lambda _: httpx.Response(200, content=b"foo", headers={"Etag": '"foo"'})
+    )
+    proxy.cache_freshness = [CacheFreshnessRule(max_age=60)]
+    proxy.integrations = {}
+    proxy.gh_token_config.github_pats = {"foo": faker.pystr()}
+    request = Request.from_values(headers=[("Accept", "application/json")])
+
+    async def send_twice() -> None:
+        await proxy.cached_request(path, request, faker.word())
+        proxy.requester = mock.Mock()  # GitHub is not requested anymore
+        resp = await proxy.cached_request(path, request, faker.word())
+
+        assert resp.data == b"foo"
+        assert resp.headers["Age"] == "0"
+
+    event_loop.run_until_complete(send_twice())
+
+
+def test_async_proxy_request_fails_when_all_tokens_are_rate_limited(
+    faker: Faker,
+    async_proxy_factory: Callable[..., AsyncProxy],
+    event_loop: asyncio.AbstractEventLoop,
+):
+    proxy = async_proxy_factory(
+        lambda _: httpx.Response(
+            403,
+            headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1651485600"},
+        )
+    )
+    proxy.integrations = {}
+    proxy.gh_token_config.github_pats = {"foo": faker.pystr()}
+
+    with pytest.raises(TokensRateLimitedError):
+        event_loop.run_until_complete(
+            proxy.request(
+                f"repos/{faker.uri_path()}", Request.from_values(), faker.word()
+            )
+        )
+
+    assert list(proxy.rate_limited) == [(mock.ANY, "foo", "core")]
+
+
+def test_async_proxy_discovers_installations_off_the_event_loop(
+    faker: Faker,
+    async_proxy_factory: Callable[..., AsyncProxy],
+    event_loop: asyncio.AbstractEventLoop,
+):
+    proxy = async_proxy_factory(lambda _: httpx.Response(200, content=b"foo"))
+    proxy.gh_token_config.github_pats = {"foo": faker.pystr()}
+    discovery_threads: List[threading.Thread] = []
+
+    def installed_integrations(app_name: str) -> Dict[str, InstalledIntegration]:
+        discovery_threads.append(threading.current_thread())
+        return {}
+
+    with mock.patch.object(
+        proxy, "_installed_integrations", side_effect=installed_integrations
+    ):
+        resp = event_loop.run_until_complete(
+            proxy.request(faker.uri_path(), Request.from_values(), faker.word())
+        )
+
+    assert resp.data == b"foo"
+    assert discovery_threads
+    assert threading.main_thread() not in discovery_threads
@@ -0,0 +1,109 @@
+import threading
+from typing import List
+from unittest import mock
+
+import werkzeug
+from faker import Faker
+
+from github_proxy.background import KeyedWorkQueue
+from github_proxy.background import OverflowPolicy
+from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.writer import CacheWriter
+
+
+def submit_blocker(queue: KeyedWorkQueue, gate: threading.Event) -> None:
+    """Occupy the worker of the queue until the gate is opened"""
+    started = threading.Event()
+
+    def blocker() -> None:
+        started.set()
+        gate.wait()
+
+    queue.submit("blocker", blocker)
+    started.wait(timeout=5)
+
+
+def test_keyed_work_queue_coalesces_pending_tasks_of_same_key():
+    gate = threading.Event()
+    executed: List[str] = []
+    queue = KeyedWorkQueue("test", maxsize=10, workers=1)
+
+    submit_blocker(queue, gate)
+    queue.submit("foo", lambda: executed.append("first"))
+    queue.submit("foo", lambda: executed.append("second"))
+    assert queue.depth == 1
+
+    gate.set()
+    assert queue.close(timeout=5)
+    assert executed == ["second"]
+
+
+def test_keyed_work_queue_drops_tasks_when_full():
+    gate = threading.Event()
+    queue = KeyedWorkQueue("test", maxsize=1, workers=1, overflow=OverflowPolicy.DROP)
+
+    submit_blocker(queue, gate)
+    assert queue.submit("foo", lambda: None)
+    assert not queue.submit("bar", lambda: None)
+    assert queue.dropped == 1
+
+    gate.set()
+    assert queue.close(timeout=5)
+
+
+def test_keyed_work_queue_blocks_when_full():
+    gate = threading.Event()
+    executed: List[str] = []
+    queue = KeyedWorkQueue("test", maxsize=1, workers=1, overflow=OverflowPolicy.BLOCK)
+    submit_blocker(queue, gate)
+    queue.submit("foo", lambda: executed.append("foo"))
+
+    submitter = threading.Thread(
+        target=queue.submit, args=("bar", lambda: executed.append("bar"))
+    )
+    submitter.start()
+    submitter.join(timeout=0.1)
+    assert submitter.is_alive()  # blocked by the full queue
+
+    gate.set()
+    submitter.join(timeout=5)
+    assert queue.close(timeout=5)
+    assert executed == ["foo", "bar"]
+    assert queue.dropped == 0
+
+
+def test_keyed_work_queue_discards_tasks_after_close():
+    queue = KeyedWorkQueue("test", maxsize=1, workers=1)
+    assert queue.close(timeout=5)
+    assert not queue.submit("foo", lambda: None)
+
+
+def test_keyed_work_queue_survives_failing_tasks():
+    executed: List[str] = []
+    queue = KeyedWorkQueue("test", maxsize=10, workers=1)
+
+    def fail() -> None:
+        raise ValueError()
+
+    queue.submit("foo", fail)
+    queue.submit("bar", lambda: executed.append("bar"))
+    assert queue.close(timeout=5)
+    assert executed == ["bar"]
+
+
+def test_cache_writer_persists_writes_asynchronously(
+    faker: Faker, cache_backend: CacheBackend
+):
+    tel_collector = mock.Mock()
+    writer = CacheWriter(cache_backend, tel_collector, maxsize=10, workers=2)
+    path, qs, media_type = faker.uri_path(), faker.pystr(), faker.mime_type()
+    value = werkzeug.Response()
+
+    writer.set(path, qs, media_type, value)
+    assert writer.flush(timeout=5)
+
+    assert cache_backend.get(path, qs, media_type) is value
+    tel_collector.collect_cache_write_queue_metrics.assert_called_once_with(
+        mock.ANY, dropped=False
+    )
+    assert writer.close(timeout=5)
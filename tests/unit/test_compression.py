@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from typing import Callable
+from unittest import mock
+
+import pytest
+import werkzeug
+from faker import Faker
+
+from github_proxy.cache import InMemoryCache
+from github_proxy.cache.compression import Codec
+from github_proxy.config import Config
+
+
+@pytest.mark.parametrize(argnames="encoding", argvalues=["gzip", "deflate"])
+def test_codec_roundtrip(encoding: str, faker: Faker):
+    codec = Codec.from_encoding(encoding)
+    data = faker.text().encode() * 100
+
+    compressed_data = codec.compress(data)
+    assert len(compressed_data) < len(data)
+    assert codec.decompress(compressed_data) == data
+
+
+def test_codec_not_found(faker: Faker):
+    with pytest.raises(RuntimeError):
+        Codec.from_encoding(faker.pystr())
+
+
+def test_cache_backend_compresses_values_exceeding_min_size(
+    faker: Faker, config_factory: Callable[..., Config]
+):
+    config = config_factory()
+    config.cache_compression = "gzip"
+    config.cache_compression_min_size = 1024
+    tel_collector = mock.Mock()
+    cache = InMemoryCache(config, tel_collector)
+
+    path, media_type, etag = faker.uri_path(), faker.mime_type(), faker.pystr()
+    body = faker.text().encode() * 100
+    cache.set(path, None, media_type, werkzeug.Response(body, headers={"Etag": etag}))
+
+    cached_value = cache.get(path, None, media_type)
+    assert cached_value is not None
+    assert cached_value.headers["Content-Encoding"] == "gzip"
+    assert cached_value.headers["Etag"] == etag
+    assert len(cached_value.data) < len(body)
+    tel_collector.collect_cache_compression_metrics.assert_called_once_with(
+        "gzip", "compress", len(body), len(cached_value.data), mock.ANY
+    )
+
+    decompressed_value = cache.decompress(cached_value)
+    assert decompressed_value.data == body
+    assert "Content-Encoding" not in decompressed_value.headers
+    assert decompressed_value.headers["Etag"] == etag
+
+
+def test_cache_backend_does_not_compress_small_values(
+    faker: Faker, config_factory: Callable[..., Config]
+):
+    config = config_factory()
+    config.cache_compression = "gzip"
+    config.cache_compression_min_size = 1024
+    cache = InMemoryCache(config)
+
+    path, media_type = faker.uri_path(), faker.mime_type()
+    value = werkzeug.Response(b"foo")
+    cache.set(path, None, media_type, value)
+
+    assert cache.get(path, None, media_type) is value
+    assert cache.decompress(value) is value
+
+
+def test_cache_backend_does_not_compress_values_of_configs_without_compression(
+    faker: Faker,
+):
+    # Configs predating the compression settings
+    config = SimpleNamespace(cache_backend_url="inmemory://", cache_ttl=60)
+    cache = InMemoryCache(config)
+
+    path, media_type = faker.uri_path(), faker.mime_type()
+    body = faker.text().encode() * 100
+    cache.set(path, None, media_type, werkzeug.Response(body))
+
+    value = cache.get(path, None, media_type)
+    assert value is not None
+    assert value.data == body
+    assert "Content-Encoding" not in value.headers
@@ -9,6 +9,8 @@ from jinja2 import DictLoader
 from jinja2 import Environment
 
 from github_proxy.config import Config
+from github_proxy.proxy import CacheFreshnessRule
+from github_proxy.proxy import GraphQLCacheRule
 from github_proxy.proxy import ProxyClientScope
 
 
@@ -45,6 +47,17 @@ def test_config_collect_github_apps(faker: Faker):
     assert apps[app_name_2].private_key == app_pem_2
 
 
+def test_config_collect_github_apps_without_installation_id(faker: Faker):
+    config_dict = {
+        "GITHUB_APP_FOO_ID": str(faker.pyint()),
+        "GITHUB_APP_FOO_PEM": faker.text(),
+    }
+
+    apps = Config._collect_github_apps(config_dict)
+
+    assert apps["foo"].installation_id is None
+
+
 def test_config_collect_github_pats():
     pat_name_1 = "foo"
     pat_1 = "one"
@@ -157,3 +170,55 @@ clients:
             ]
         else:
             assert False
+
+
+def test_config_load_client_registry_with_cache_freshness_rules(faker: Faker):
+    client_registry_file_content = """---
+version: 1
+clients:
+- name: one
+  token: foo
+cache_freshness:
+- path: /repos/.*/pulls
+  max_age: 5
+  stale_while_revalidate: 30
+- max_age: 60
+...
+    """
+    config_dict = {
+        "CLIENT_REGISTRY_FILE_PATH": faker.uri_path(),
+    }
+    with patch.object(Path, "open", mock_open(read_data=client_registry_file_content)):
+        client_registry = Config._load_client_registry(config_dict)
+
+    assert len(client_registry.clients) == 1
+    assert list(client_registry.cache_freshness) == [
+        CacheFreshnessRule(
+            path=re.compile("/repos/.*/pulls"), max_age=5, stale_while_revalidate=30
+        ),
+        CacheFreshnessRule(max_age=60),
+    ]
+
+
+def test_config_load_client_registry_with_graphql_cache_rules(faker: Faker):
+    client_registry_file_content = """---
+version: 1
+clients:
+- name: one
+  token: foo
+graphql_cache:
+- operation: Dashboard.*
+  max_age: 30
+- max_age: 5
+...
+    """
+    config_dict = {
+        "CLIENT_REGISTRY_FILE_PATH": faker.uri_path(),
+    }
+    with patch.object(Path, "open", mock_open(read_data=client_registry_file_content)):
+        client_registry = Config._load_client_registry(config_dict)
+
+    assert list(client_registry.graphql_cache) == [
+        GraphQLCacheRule(operation=re.compile("Dashboard.*"), max_age=30),
+        GraphQLCacheRule(max_age=5),
+    ]
@@ -1,6 +1,9 @@
+import threading
 from datetime import datetime
 from datetime import timedelta
 from typing import Callable
+from typing import Optional
+from typing import Sequence
 from unittest import mock
 
 import pytest
@@ -10,9 +13,15 @@ from github import GithubIntegration
 from github.InstallationAuthorization import InstallationAuthorization
 
 from github_proxy.config import Config
+from github_proxy.config import GitHubAppConfig
 from github_proxy.github_tokens import GitHubTokenOrigin
+from github_proxy.github_tokens import TokenSelection
+from github_proxy.github_tokens import construct_app_integration
 from github_proxy.github_tokens import construct_installed_integration
+from github_proxy.github_tokens import construct_installed_integrations
+from github_proxy.github_tokens import get_resource_owner
 from github_proxy.github_tokens import token_generator
+from github_proxy.ratelimit import RateLimitBudget
 
 
 @pytest.fixture
@@ -120,7 +129,7 @@ def test_token_generator_skips_rate_limited_apps(
     tokens = token_generator(
         integrations,
         config.github_pats,
-        {(GitHubTokenOrigin.GITHUB_APP, github_app): mock.ANY},
+        {(GitHubTokenOrigin.GITHUB_APP, github_app, "core"): mock.ANY},
     )
 
     token = next(tokens)
@@ -153,7 +162,7 @@ def test_token_generator_skips_rate_limited_pats(
     tokens = token_generator(
         integrations,
         config.github_pats,
-        {(GitHubTokenOrigin.USER, github_pat): mock.ANY},
+        {(GitHubTokenOrigin.USER, github_pat, "core"): mock.ANY},
     )
 
     token = next(tokens)
@@ -164,3 +173,170 @@ def test_token_generator_skips_rate_limited_pats(
     # generator should now be empty
     with pytest.raises(StopIteration):
         next(tokens)
+
+
+def test_token_generator_skips_cooling_down_tokens(config: Config):
+    github_pat, *_ = config.github_pats.keys()
+
+    tokens = token_generator(
+        {},
+        config.github_pats,
+        {},
+        cooldowns={(GitHubTokenOrigin.USER, github_pat, "core"): mock.ANY},
+    )
+
+    assert [token.name for token in tokens] == [
+        name for name in config.github_pats if name != github_pat
+    ]
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_token_generator_selects_token_with_max_remaining_budget(
+    create_token_mock: mock.Mock,
+    config: Config,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    create_token_mock.return_value = installation_authz_factory(faker.pystr())
+    github_app, *_ = config.github_apps.keys()
+    github_pat, *_ = config.github_pats.keys()
+    integrations = {
+        github_app: construct_installed_integration(
+            github_app, config, config.github_api_url
+        )
+    }
+    reset = datetime.utcnow() + timedelta(minutes=30)
+    budgets = {
+        (GitHubTokenOrigin.GITHUB_APP, github_app, "core"): RateLimitBudget(10, reset),
+        (GitHubTokenOrigin.USER, github_pat, "core"): RateLimitBudget(4000, reset),
+    }
+
+    tokens = token_generator(
+        integrations,
+        config.github_pats,
+        {},
+        budgets=budgets,
+        selection=TokenSelection.MAX_REMAINING,
+    )
+
+    # PAT has the largest budget, hence it precedes the app
+    assert [token.origin for token in tokens] == [
+        GitHubTokenOrigin.USER,
+        GitHubTokenOrigin.GITHUB_APP,
+    ]
+
+
+@pytest.mark.parametrize(
+    argnames=["reset_delta", "expected_origins"],
+    argvalues=[
+        (timedelta(minutes=30), [GitHubTokenOrigin.USER]),
+        (
+            timedelta(minutes=-1),
+            [GitHubTokenOrigin.GITHUB_APP, GitHubTokenOrigin.USER],
+        ),
+    ],
+    ids=["budget_exhausted", "budget_reset"],
+)
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_token_generator_skips_tokens_with_exhausted_budget(
+    create_token_mock: mock.Mock,
+    reset_delta: timedelta,
+    expected_origins: Sequence[GitHubTokenOrigin],
+    config: Config,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    create_token_mock.return_value = installation_authz_factory(faker.pystr())
+    github_app, *_ = config.github_apps.keys()
+    integrations = {
+        github_app: construct_installed_integration(
+            github_app, config, config.github_api_url
+        )
+    }
+    budgets = {
+        (GitHubTokenOrigin.GITHUB_APP, github_app, "core"): RateLimitBudget(
+            5, datetime.utcnow() + reset_delta
+        ),
+    }
+
+    tokens = token_generator(
+        integrations, config.github_pats, {}, budgets=budgets, min_remaining=5
+    )
+
+    assert [token.origin for token in tokens] == expected_origins
+
+
+def test_cached_github_integration_guards_its_cache_with_a_lock(
+    config: Config,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    app_name, *_ = config.github_apps.keys()
+    ghi, installation_id = construct_installed_integration(
+        app_name, config, config.github_api_url
+    )
+    authz = installation_authz_factory(faker.pystr())
+
+    with ghi._cache_lock:  # type: ignore
+        # A request thread reads the cache while the refresher renews a token
+        setter = threading.Thread(
+            target=ghi.set_access_token, args=(installation_id, authz)  # type: ignore
+        )
+        setter.start()
+        setter.join(timeout=0.1)
+        assert setter.is_alive()
+
+    setter.join(timeout=5)
+    assert ghi.cached_access_token(installation_id) is authz  # type: ignore
+
+
+def test_construct_installed_integrations_discovers_installations(
+    config_factory: Callable[..., Config],
+    github_app_config_factory: Callable[..., GitHubAppConfig],
+):
+    config = config_factory(
+        app_name="app", app_config=github_app_config_factory(installation_id=None)
+    )
+    ghi = construct_app_integration("app", config, config.github_api_url)
+    installations = [
+        mock.Mock(id=1, raw_data={"account": {"login": "Foo"}}),
+        mock.Mock(id=2, raw_data={"account": {"login": "bar"}}),
+    ]
+
+    with mock.patch.object(ghi, "get_installations", return_value=installations):
+        integrations = construct_installed_integrations("app", config, ghi)
+
+    assert integrations == {"app/foo": (ghi, 1), "app/bar": (ghi, 2)}
+
+
+@pytest.mark.parametrize(
+    argnames=["owner", "expected_tokens"],
+    argvalues=[
+        ("Foo", ["app/foo", "single"]),
+        ("baz", ["app/foo", "app/bar", "single"]),
+        (None, ["app/foo", "app/bar", "single"]),
+    ],
+    ids=["owner_installation", "no_owner_installation", "no_owner"],
+)
+def test_token_generator_routes_to_installation_of_owner(
+    owner: Optional[str], expected_tokens: Sequence[str]
+):
+    ghi = mock.Mock()
+    integrations = {"app/foo": (ghi, 1), "app/bar": (ghi, 2), "single": (ghi, 3)}
+
+    tokens = token_generator(integrations, {}, {}, owner=owner)
+
+    assert [token.name for token in tokens] == expected_tokens
+
+
+@pytest.mark.parametrize(
+    argnames=["path", "expected_owner"],
+    argvalues=[
+        ("repos/Foo/bar/pulls", "foo"),
+        ("/orgs/foo/members", "foo"),
+        ("users/foo", "foo"),
+        ("search/issues", None),
+    ],
+)
+def test_get_resource_owner(path: str, expected_owner: Optional[str]):
+    assert get_resource_owner(path) == expected_owner
@@ -0,0 +1,102 @@
+import json
+from typing import Any
+from typing import Optional
+
+import pytest
+
+from github_proxy.graphql import GraphQLOperation
+from github_proxy.graphql import get_operations
+from github_proxy.graphql import parse_query
+from github_proxy.graphql import tokenize
+
+
+def _body(
+    query: str, variables: Any = None, operation_name: Optional[str] = None
+) -> bytes:
+    return json.dumps(
+        {"query": query, "variables": variables, "operationName": operation_name}
+    ).encode()
+
+
+def test_tokenize_drops_whitespace_commas_and_comments():
+    document = """
+    # Fetching the viewer
+    query Viewer($first: Int = 10) {
+      viewer { login, name }  # inline comment
+      search(query: "a, b # c", first: $first) { ... on Repository { name } }
+    }
+    """
+
+    assert tokenize(document) == [
+        *("query", "Viewer", "(", "$", "first", ":", "Int", "=", "10", ")", "{"),
+        *("viewer", "{", "login", "name", "}"),
+        *("search", "(", "query", ":", '"a, b # c"', "first", ":", "$", "first"),
+        *(")", "{", "...", "on", "Repository", "{", "name", "}", "}", "}"),
+    ]
+
+
+def test_tokenize_rejects_invalid_characters():
+    with pytest.raises(ValueError):
+        tokenize("{ viewer { login } } ;")
+
+
+def test_get_operations():
+    document = """
+    { viewer { login } }
+    query Repo($name: String = "query") { repository(name: $name) { id } }
+    fragment mutation on User { login }
+    mutation AddStar { addStar(input: {starrableId: "1"}) { clientMutationId } }
+    """
+
+    assert get_operations(tokenize(document)) == [
+        GraphQLOperation("query", None),
+        GraphQLOperation("query", "Repo"),
+        GraphQLOperation("mutation", "AddStar"),
+    ]
+
+
+def test_parse_query_normalizes_query_and_variables():
+    query = parse_query(
+        _body("query Viewer($a: Int, $b: Int) { viewer { login } }", {"a": 1, "b": 2})
+    )
+    equivalent_query = parse_query(
+        _body(
+            "# comment\nquery Viewer($a: Int $b: Int) {\n  viewer {\n    login\n  }\n}",
+            {"b": 2, "a": 1},
+        )
+    )
+
+    assert query is not None
+    assert query.operation_name == "Viewer"
+    assert query == equivalent_query
+
+
+def test_parse_query_keys_on_variables_and_operation():
+    document = "query A { viewer { login } } query B { viewer { name } }"
+
+    keys = {
+        parse_query(_body(document, {"a": 1}, "A")).key,  # type: ignore
+        parse_query(_body(document, {"a": 2}, "A")).key,  # type: ignore
+        parse_query(_body(document, {"a": 1}, "B")).key,  # type: ignore
+    }
+
+    assert len(keys) == 3
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        _body("mutation { addStar(input: {}) { clientMutationId } }"),
+        _body("subscription { events { id } }"),
+        _body("query A { viewer { login } } mutation B { x }", operation_name="B"),
+        # The executed operation is ambiguous
+        _body("query A { viewer { login } } mutation B { x }"),
+        _body("query A { viewer { login } }", operation_name="B"),
+        _body("{ viewer { login } } ;"),
+        b"not json",
+        b'{"variables": {}}',
+        b"[]",
+    ],
+)
+def test_parse_query_returns_none_if_not_a_query(body: bytes):
+    assert parse_query(body) is None
@@ -0,0 +1,105 @@
+from typing import Callable
+from unittest.mock import Mock
+
+import werkzeug
+from faker import Faker
+
+from github_proxy.cache import InMemoryCache
+from github_proxy.cache.inmemory import SizedTTLCache
+from github_proxy.cache.inmemory import get_value_size
+from github_proxy.config import Config
+from github_proxy.telemetry import TelemetryCollector
+
+
+def test_sized_ttl_cache_evicts_least_recently_used_entries_by_size():
+    cache = SizedTTLCache(max_bytes=10, max_entries=10, ttl=60, getsizeof=len)
+
+    cache["foo"] = "aaaa"
+    cache["bar"] = "bbbb"
+    assert cache.get("foo") == "aaaa"
+    cache["baz"] = "cccc"
+
+    assert "bar" not in cache
+    assert set(cache) == {"foo", "baz"}
+    assert cache.currsize == 8
+    assert cache.evictions == 1
+
+
+def test_sized_ttl_cache_evicts_entries_by_count():
+    cache = SizedTTLCache(max_bytes=100, max_entries=2, ttl=60, getsizeof=len)
+
+    cache["foo"] = "a"
+    cache["bar"] = "b"
+    cache["bar"] = "bb"  # overwrites do not evict
+    assert cache.evictions == 0
+
+    cache["baz"] = "c"
+    assert set(cache) == {"bar", "baz"}
+    assert cache.evictions == 1
+
+
+def test_sized_ttl_cache_counts_hits_and_misses():
+    cache = SizedTTLCache(max_bytes=100, max_entries=2, ttl=60, getsizeof=len)
+    cache["foo"] = "a"
+
+    cache.get("foo")
+    cache.get("bar")
+    cache.get("baz")
+
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_inmemory_cache_is_bounded_by_url_params(
+    faker: Faker, config_factory: Callable[..., Config]
+):
+    value = werkzeug.Response("foo" * 100)
+    config = config_factory()
+    config.cache_backend_url = (
+        f"inmemory://?max_bytes={2 * get_value_size(value)}&max_entries=10"
+    )
+    tel_collector = Mock(spec=TelemetryCollector)
+    cache = InMemoryCache(config, tel_collector)
+    paths = [f"{faker.uri_path()}/{i}" for i in range(3)]
+
+    for path in paths:
+        cache.set(path, None, "application/json", value)
+
+    assert cache.get(paths[0], None, "application/json") is None
+    assert cache.get(paths[2], None, "application/json") is not None
+    tel_collector.collect_cache_memory_metrics.assert_called_with(
+        "inmemory",
+        entries=2,
+        size=2 * get_value_size(value),
+        hits=1,
+        misses=1,
+        evictions=1,
+    )
+
+
+def test_inmemory_cache_skips_values_exceeding_its_budget(
+    faker: Faker, config_factory: Callable[..., Config]
+):
+    config = config_factory()
+    config.cache_backend_url = "inmemory://?max_bytes=64"
+    cache = InMemoryCache(config)
+    path = faker.uri_path()
+
+    cache.set(path, None, "application/json", werkzeug.Response("foo" * 100))
+
+    assert cache.get(path, None, "application/json") is None
+
+
+def test_inmemory_cache_set_many_and_get_many(
+    faker: Faker, config_factory: Callable[..., Config]
+):
+    cache = InMemoryCache(config_factory())
+    keys = [(f"{faker.uri_path()}/{i}", None, "application/json") for i in range(3)]
+
+    cache.set_many({key: werkzeug.Response(key[0]) for key in keys[:2]})
+    values = cache.get_many(keys)
+
+    assert [value.data.decode() for value in values[:2]] == [  # type: ignore
+        key[0] for key in keys[:2]
+    ]
+    assert values[2] is None
@@ -1,6 +1,17 @@
+import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
 from typing import Callable
+from typing import Iterator
+from typing import Mapping
+from typing import Optional
 from typing import Sequence
 from unittest import mock
 
@@ -13,11 +24,29 @@ from github import GithubIntegration
 from github.InstallationAuthorization import InstallationAuthorization
 from requests.structures import CaseInsensitiveDict
 from werkzeug import Request
-
+from werkzeug.http import http_date
+
+from github_proxy.background import KeyedWorkQueue
+from github_proxy.cache import InMemoryCache
+from github_proxy.cache.backend import CacheBackend
+from github_proxy.cache.compression import Codec
+from github_proxy.config import Config
+from github_proxy.config import GitHubAppConfig
 from github_proxy.github_tokens import GitHubToken
 from github_proxy.github_tokens import GitHubTokenOrigin
+from github_proxy.proxy import DISCOVERY_RETRY_INTERVAL
+from github_proxy.proxy import MATCH_ALL
+from github_proxy.proxy import CacheFreshnessRule
+from github_proxy.proxy import ClientAuthorizer
+from github_proxy.proxy import GraphQLCacheRule
 from github_proxy.proxy import Proxy
+from github_proxy.proxy import ProxyClient
 from github_proxy.proxy import ProxyClientScope
+from github_proxy.proxy import TokensRateLimitedError
+from github_proxy.proxy import combine_patterns
+from github_proxy.ratelimit import RateLimitBudget
+from github_proxy.singleflight import SingleFlight
+from github_proxy.throttle import ConcurrencyThrottle
 
 
 @mock.patch.object(GithubIntegration, "get_access_token")
@@ -51,7 +80,8 @@ def test_proxy_cached_request_cache_hit(
         client=client,
     )
 
-    assert resp == cached_response
+    assert resp.status_code == cached_response.status_code
+    assert resp.data == cached_response.data
     proxy.tel_collector.collect_proxy_request_metrics.assert_called_once_with(
         client, request, cache_hit=True
     )
@@ -102,7 +132,7 @@ def test_proxy_cached_request_cache_miss_when_using_different_qs(
     assert proxy.cache.get(path, modified_qs, media_type) != cached_response
     assert resp == proxy.cache.get(path, modified_qs, media_type)
     proxy.tel_collector.collect_proxy_request_metrics.assert_called_once_with(
-        client, request, False
+        client, request, cache_hit=False
     )
 
 
@@ -178,7 +208,7 @@ def test_proxy_cached_request_cache_miss_if_no_entry_for_cacheable_resource(
 
     assert resp == proxy.cache.get(path, qs, media_type)
     proxy.tel_collector.collect_proxy_request_metrics.assert_called_once_with(
-        client, request, False
+        client, request, cache_hit=False
     )
 
 
@@ -216,9 +246,659 @@ def test_proxy_cached_request_does_not_cache_responses_without_cache_headers(
     proxy.tel_collector.collect_proxy_request_metrics.assert_called_once_with(
         client,
         request,
-        None,
+        cache_hit=None,
+    )
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_coalesces_concurrent_requests(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.coalescer = SingleFlight(timeout=5)
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    in_flight = threading.Event()
+    release = threading.Event()
+
+    def slow_response(request: Any, context: Any) -> str:
+        in_flight.set()
+        release.wait(timeout=5)
+        return "foo"
+
+    upstream = requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=200,
+        headers={"Etag": faker.pystr()},
+        text=slow_response,
+    )
+
+    def send() -> werkzeug.Response:
+        request = Request.from_values(headers=[("Accept", media_type)])
+        return proxy.cached_request(path=path, request=request, client=faker.word())
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(send)
+        in_flight.wait(timeout=5)
+        follower = executor.submit(send)
+        time.sleep(0.1)  # the follower is now waiting for the leader
+        release.set()
+
+    assert upstream.call_count == 1
+    assert leader.result().data == follower.result().data == b"foo"
+    assert leader.result() is not follower.result()
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_with_coalescing_lock_uses_concurrently_cached_response(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+):
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response()
+    proxy.coalescing_lock_timeout = 5
+
+    @contextmanager
+    def lock(*args: Any, **kwargs: Any) -> Iterator[bool]:
+        # another process populates the cache while holding the lock
+        proxy.cache.set(path, None, media_type, cached_response)
+        yield True
+
+    upstream = requests_mock.get(proxy.github_api_url + path, status_code=200)
+
+    with mock.patch.object(proxy.cache, "lock", lock):
+        resp = proxy.cached_request(
+            path=path,
+            request=Request.from_values(headers=[("Accept", media_type)]),
+            client=faker.word(),
+        )
+
+    assert resp is cached_response
+    assert not upstream.called
+    get_access_token_mock.assert_not_called()
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_skips_coalescing_lock_of_uncacheable_resources(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    proxy.coalescing_lock_timeout = 5
+    proxy.coalescing_lock_ttl = 30
+    lock = mock.MagicMock()
+    lock.return_value.__enter__.return_value = True
+    # no ETag nor Last-Modified
+    upstream = requests_mock.get(proxy.github_api_url + path, status_code=200)
+
+    with mock.patch.object(proxy.cache, "lock", lock):
+        for _ in range(2):
+            resp = proxy.cached_request(
+                path=path,
+                request=Request.from_values(headers=[("Accept", media_type)]),
+                client=faker.word(),
+            )
+            assert resp.status_code == 200
+
+    assert upstream.call_count == 2
+    lock.assert_called_once_with(path, None, media_type, 5, ttl=30)
+
+
+def test_proxy_cached_request_serves_fresh_cache_entry_without_revalidation(
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+):
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - timedelta(seconds=3)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.cache_freshness = [
+        CacheFreshnessRule(path=re.compile(r"/foo"), max_age=3600),
+        CacheFreshnessRule(path=re.compile(f"/{path}"), max_age=60),
+    ]
+    upstream = requests_mock.get(proxy.github_api_url + path, status_code=304)
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    client = faker.word()
+    proxy.tel_collector = mock.Mock()
+
+    resp = proxy.cached_request(path=path, request=request, client=client)
+
+    assert not upstream.called
+    assert resp.data == b"foo"
+    assert 3 <= int(resp.headers["Age"]) < 60
+    assert "Age" not in cached_response.headers
+    proxy.tel_collector.collect_proxy_request_metrics.assert_called_once_with(
+        client, request, cache_hit=True
+    )
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_revalidation_renews_freshness_of_cache_entry(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - timedelta(minutes=10)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.cache_freshness = [CacheFreshnessRule(path=MATCH_ALL, max_age=60)]
+
+    revalidated_at = datetime.now(timezone.utc).replace(microsecond=0)
+    upstream = requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=304,
+        headers={"Date": http_date(revalidated_at)},
+    )
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert upstream.call_count == 1
+    assert resp.data == b"foo"
+    renewed_response = proxy.cache.get(path, None, media_type)
+    assert renewed_response is not None
+    assert renewed_response.date == revalidated_at
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_serves_stale_cache_entry_while_revalidating(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - timedelta(minutes=10)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.cache_freshness = [
+        CacheFreshnessRule(max_age=60, stale_while_revalidate=3600)
+    ]
+    proxy.refresher = KeyedWorkQueue("test", maxsize=1, workers=1)
+
+    upstream = requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=200,
+        headers={"Etag": faker.pystr()},
+        text="bar",
     )
 
+    request = Request.from_values(headers=[("Accept", media_type)])
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert resp.data == b"foo"
+    assert int(resp.headers["Age"]) >= 600
+    assert "Warning" in resp.headers
+
+    assert proxy.refresher.close(timeout=5)
+    assert upstream.call_count == 1
+    refreshed_response = proxy.cache.get(path, None, media_type)
+    assert refreshed_response is not None
+    assert refreshed_response.data == b"bar"
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_revalidates_synchronously_beyond_max_stale(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - timedelta(hours=2)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.cache_freshness = [
+        CacheFreshnessRule(max_age=60, stale_while_revalidate=3600)
+    ]
+    proxy.refresher = mock.Mock()
+
+    requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=200,
+        headers={"Etag": faker.pystr()},
+        text="bar",
+    )
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert resp.data == b"bar"
+    proxy.refresher.submit.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    argnames="upstream_response",
+    argvalues=[
+        {"status_code": 502},
+        {"exc": requests.exceptions.ConnectTimeout},
+        {
+            "status_code": 403,
+            "headers": {
+                "x-ratelimit-reset": "1646414677",
+                "x-ratelimit-remaining": "0",
+            },
+        },
+    ],
+    ids=["server_error", "timeout", "rate_limited"],
+)
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_serves_stale_cache_entry_on_error(
+    get_access_token_mock: mock.Mock,
+    upstream_response: Mapping[str, Any],
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - timedelta(minutes=10)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.stale_if_error = 3600
+    proxy.tel_collector = mock.Mock()
+
+    requests_mock.get(proxy.github_api_url + path, **upstream_response)
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert resp.status_code == 200
+    assert resp.data == b"foo"
+    assert resp.headers["Warning"].startswith("111")
+    assert proxy.cache.get(path, None, media_type) is cached_response
+    proxy.tel_collector.collect_stale_response_metrics.assert_called_once_with(
+        request, mock.ANY
+    )
+
+
+@pytest.mark.parametrize(
+    "age, stale_if_error",
+    [(timedelta(hours=2), 3600), (timedelta(0), 0)],
+    ids=["too_stale", "disabled"],
+)
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_does_not_serve_too_stale_cache_entry_on_error(
+    get_access_token_mock: mock.Mock,
+    age: timedelta,
+    stale_if_error: int,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    cached_response = werkzeug.Response(response="foo")
+    cached_response.date = datetime.now(timezone.utc) - age
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.stale_if_error = stale_if_error
+
+    requests_mock.get(
+        proxy.github_api_url + path, exc=requests.exceptions.ConnectionError
+    )
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        proxy.cached_request(
+            path=path,
+            request=Request.from_values(headers=[("Accept", media_type)]),
+            client=faker.word(),
+        )
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_renews_age_of_revalidated_cache_entry(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    etag = f'"{faker.pystr()}"'
+    cached_response = werkzeug.Response(response="foo", headers={"ETag": etag})
+    cached_response.date = datetime.now(timezone.utc) - timedelta(hours=2)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.stale_if_error = 3600  # with no freshness rule for the path
+
+    requests_mock.get(
+        proxy.github_api_url + path,
+        [
+            {"status_code": 304, "headers": {"ETag": etag, "X-Foo": "bar"}},
+            {"status_code": 502},
+        ],
+    )
+
+    for _ in range(2):  # 304, then 502
+        resp = proxy.cached_request(
+            path=path,
+            request=Request.from_values(headers=[("Accept", media_type)]),
+            client=faker.word(),
+        )
+        assert resp.status_code == 200
+        assert resp.data == b"foo"
+        assert resp.headers["X-Foo"] == "bar"
+
+    # The 502 was answered with the cached response revalidated by the 304
+    assert resp.headers["Warning"].startswith("111")
+
+
+@pytest.mark.parametrize(
+    argnames=["accept_encoding", "content_encoding"],
+    argvalues=[("gzip, deflate", "gzip"), ("identity", None)],
+    ids=["client_accepts_encoding", "client_does_not_accept_encoding"],
+)
+def test_proxy_cached_request_passes_through_compressed_cache_entries(
+    accept_encoding: str,
+    content_encoding: Optional[str],
+    config: Config,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+):
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    body = faker.text().encode() * 100
+    cached_response = werkzeug.Response(response=body)
+    cached_response.date = datetime.now(timezone.utc)
+    config.cache_compression = "gzip"
+    config.cache_compression_min_size = 0
+    proxy.cache = InMemoryCache(config)
+    proxy.cache.set(path, None, media_type, cached_response)
+    proxy.cache_freshness = [CacheFreshnessRule(max_age=60)]
+
+    request = Request.from_values(
+        headers=[("Accept", media_type), ("Accept-Encoding", accept_encoding)]
+    )
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert resp.headers.get("Content-Encoding") == content_encoding
+    if content_encoding is None:
+        assert resp.data == body
+    else:
+        assert Codec.from_encoding(content_encoding).decompress(resp.data) == body
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_graphql_request_caches_queries(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.graphql_cache = [
+        GraphQLCacheRule(operation=re.compile("Mutable.*"), max_age=0),
+        GraphQLCacheRule(max_age=60),
+    ]
+    proxy.tel_collector = mock.Mock()
+    upstream = requests_mock.post(
+        proxy.github_api_url + "graphql", json={"data": {"viewer": {"login": "foo"}}}
+    )
+
+    client = faker.word()
+    responses = []
+    for query in ("query Viewer { viewer { login } }", "query Viewer{viewer{login}}"):
+        request = Request.from_values(
+            method="POST", json={"query": query, "variables": {}}
+        )
+        responses.append(proxy.graphql_request("graphql", request, client))
+
+    assert upstream.call_count == 1
+    assert [json.loads(resp.data) for resp in responses] == [
+        {"data": {"viewer": {"login": "foo"}}}
+    ] * 2
+    assert "Age" in responses[1].headers
+    assert [
+        call.kwargs["cache_hit"]
+        for call in proxy.tel_collector.collect_proxy_request_metrics.call_args_list
+    ] == [False, True]
+
+
+@pytest.mark.parametrize(
+    "query, response",
+    [
+        (
+            "mutation { addStar(input: {}) { clientMutationId } }",
+            {"data": {"addStar": {}}},
+        ),
+        ("query { viewer { login } }", {"errors": [{"type": "RATE_LIMITED"}]}),
+        ("query MutableState { viewer { login } }", {"data": {"viewer": {}}}),
+        ("query Unmatched { viewer { login } }", {"data": {"viewer": {}}}),
+    ],
+    ids=["mutation", "errors", "expired", "unmatched"],
+)
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_graphql_request_does_not_serve_cached_responses(
+    get_access_token_mock: mock.Mock,
+    query: str,
+    response: Any,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.graphql_cache = [
+        GraphQLCacheRule(operation=re.compile("Mutable.*"), max_age=0),
+        GraphQLCacheRule(operation=re.compile("|Viewer"), max_age=60),
+    ]
+    upstream = requests_mock.post(proxy.github_api_url + "graphql", json=response)
+
+    for _ in range(2):
+        request = Request.from_values(method="POST", json={"query": query})
+        resp = proxy.graphql_request("graphql", request, faker.word())
+        assert json.loads(resp.data) == response
+
+    assert upstream.call_count == 2
+
+
+@pytest.mark.parametrize("size_margin, cached", [(0, True), (-1, False)])
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_graphql_request_caches_streamed_responses_within_size_limit(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+    size_margin: int,
+    cached: bool,
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    body = json.dumps({"data": {"viewer": {"login": faker.pystr()}}}).encode()
+    proxy.graphql_cache = [GraphQLCacheRule(max_age=60)]
+    proxy.stream_responses = True
+    proxy.cache_max_body_size = len(body) + size_margin
+    upstream = requests_mock.post(proxy.github_api_url + "graphql", content=body)
+
+    for _ in range(2):
+        request = Request.from_values(
+            method="POST", json={"query": "query { viewer { login } }"}
+        )
+        resp = proxy.graphql_request("graphql", request, faker.word())
+        assert b"".join(resp.iter_encoded()) == body
+        resp.close()
+
+    assert upstream.call_count == (1 if cached else 2)
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_reports_timings_of_phases(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.server_timing = True
+    proxy.tel_collector = mock.Mock()
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    requests_mock.get(
+        proxy.github_api_url + path, status_code=200, headers={"Etag": faker.pystr()}
+    )
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    client = faker.word()
+    resp = proxy.cached_request(path=path, request=request, client=client)
+
+    phases = ["cache_get", "token", "upstream", "filter_headers", "cache_set"]
+    server_timing = resp.headers["Server-Timing"].split(", ")
+    assert [metric.split(";")[0] for metric in server_timing] == [*phases, "total"]
+    # The cached response is not affected
+    cached_response = proxy.cache.get(path, None, media_type)
+    assert cached_response is not None
+    assert "Server-Timing" not in cached_response.headers
+
+    (_, _, timing), kwargs = proxy.tel_collector.collect_phase_metrics.call_args
+    assert [phase.name for phase in timing.phases] == phases
+    assert kwargs == {"cache_hit": False}
+
+
+@pytest.mark.parametrize(
+    argnames="mint_error",
+    argvalues=[None, RuntimeError("boom")],
+    ids=["minted", "mint_failure"],
+)
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_warm_up_builds_integrations_and_mints_tokens(
+    get_access_token_mock: mock.Mock,
+    mint_error: Optional[Exception],
+    proxy: Proxy,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    app_name, *_ = proxy.gh_token_config.github_apps.keys()
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    get_access_token_mock.side_effect = mint_error
+    proxy.tel_collector = mock.Mock()
+
+    durations = proxy.warm_up()
+
+    assert list(durations) == [app_name]
+    assert list(proxy.integrations) == [app_name]
+    get_access_token_mock.assert_called_once()
+    proxy.tel_collector.collect_warm_up_metrics.assert_called_once_with(
+        app_name, durations[app_name]
+    )
+
+
+def test_proxy_refresh_installations_rediscovers_installations(
+    config_factory: Callable[..., Config],
+    github_app_config_factory: Callable[..., GitHubAppConfig],
+    cache_backend: CacheBackend,
+):
+    config = config_factory(
+        app_name="app", app_config=github_app_config_factory(installation_id=None)
+    )
+    proxy = Proxy(
+        github_api_url=config.github_api_url,
+        github_token_config=config,
+        cache=cache_backend,
+        rate_limited={},
+        tel_collector=mock.Mock(),
+    )
+
+    def installation(id_: int, login: str) -> mock.Mock:
+        return mock.Mock(id=id_, raw_data={"account": {"login": login}})
+
+    with mock.patch.object(
+        GithubIntegration, "get_installations", return_value=[installation(1, "foo")]
+    ) as get_installations_mock:
+        assert list(proxy.integrations) == ["app/foo"]
+
+        get_installations_mock.return_value = [
+            installation(1, "foo"),
+            installation(2, "bar"),
+        ]
+        proxy.refresh_installations()
+        assert list(proxy.integrations) == ["app/foo", "app/bar"]
+
+        # Known installations are kept when the discovery fails
+        get_installations_mock.side_effect = RuntimeError("boom")
+        proxy.refresh_installations()
+        assert list(proxy.integrations) == ["app/foo", "app/bar"]
+
+
+def test_proxy_integrations_rediscover_installations_after_a_failed_discovery(
+    config_factory: Callable[..., Config],
+    github_app_config_factory: Callable[..., GitHubAppConfig],
+    cache_backend: CacheBackend,
+):
+    config = config_factory(
+        app_name="app", app_config=github_app_config_factory(installation_id=None)
+    )
+    proxy = Proxy(
+        github_api_url=config.github_api_url,
+        github_token_config=config,
+        cache=cache_backend,
+        rate_limited={},
+        tel_collector=mock.Mock(),
+    )
+
+    with mock.patch.object(
+        GithubIntegration, "get_installations", side_effect=RuntimeError("boom")
+    ) as get_installations_mock:
+        assert list(proxy.integrations) == []
+
+        # The failed discovery is retried after a backoff only
+        get_installations_mock.side_effect = None
+        get_installations_mock.return_value = [
+            mock.Mock(id=1, raw_data={"account": {"login": "foo"}})
+        ]
+        assert list(proxy.integrations) == []
+        assert get_installations_mock.call_count == 1
+
+        with mock.patch(
+            "time.monotonic",
+            return_value=time.monotonic() + DISCOVERY_RETRY_INTERVAL,
+        ):
+            assert list(proxy.integrations) == ["app/foo"]
+        assert list(proxy.integrations) == ["app/foo"]
+
+    assert get_installations_mock.call_count == 2
+
 
 @mock.patch.object(GithubIntegration, "get_access_token")
 def test_send_gh_request_with_all_tokens_rate_limited(
@@ -240,7 +920,7 @@ def test_send_gh_request_with_all_tokens_rate_limited(
         status_code=403,
     )
 
-    with pytest.raises(RuntimeError):
+    with pytest.raises(TokensRateLimitedError):
         proxy._send_gh_request(path=path, request=Request.from_values(method="GET"))
 
     assert len(proxy.rate_limited) == 2
@@ -258,7 +938,7 @@ def test_send_gh_request_with_some_tokens_rate_limited(
     app_token = faker.pystr()
     get_access_token_mock.return_value = installation_authz_factory(app_token)
 
-    path = faker.uri_path()
+    path = f"repos/{faker.uri_path()}"
 
     def custom_matcher(request: requests.Request) -> requests.Response:
         auth_header = request.headers["Authorization"]
@@ -289,10 +969,82 @@ def test_send_gh_request_with_some_tokens_rate_limited(
     assert resp.status_code == 201
 
     assert len(proxy.rate_limited) == 1
-    reset_value = proxy.rate_limited[(GitHubTokenOrigin.GITHUB_APP, app_name)]
+    reset_value = proxy.rate_limited[(GitHubTokenOrigin.GITHUB_APP, app_name, "core")]
     assert isinstance(reset_value, datetime)
 
 
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_send_gh_request_tracks_rate_limits_per_bucket(
+    get_access_token_mock: mock.Mock,
+    requests_mock: requests_mock.Mocker,
+    proxy: Proxy,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    app_name, *_ = proxy.gh_token_config.github_apps.keys()
+    app_token = faker.pystr()
+    get_access_token_mock.return_value = installation_authz_factory(app_token)
+    proxy.rate_limited[
+        (GitHubTokenOrigin.GITHUB_APP, app_name, "search")
+    ] = datetime.utcnow() + timedelta(minutes=30)
+
+    requests_mock.get(re.compile(".*"), status_code=200)
+
+    # The app is rate limited on the search bucket only
+    proxy._send_gh_request(
+        path="search/issues", request=Request.from_values(method="GET")
+    )
+    last_request = requests_mock.last_request
+    assert last_request is not None
+    assert not last_request.headers["Authorization"].endswith(app_token)
+
+    proxy._send_gh_request(
+        path=f"repos/{faker.uri_path()}", request=Request.from_values(method="GET")
+    )
+    last_request = requests_mock.last_request
+    assert last_request is not None
+    assert last_request.headers["Authorization"].endswith(app_token)
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_send_gh_request_retries_secondary_rate_limits_with_next_token(
+    get_access_token_mock: mock.Mock,
+    requests_mock: requests_mock.Mocker,
+    proxy: Proxy,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    app_name, *_ = proxy.gh_token_config.github_apps.keys()
+    app_token = faker.pystr()
+    get_access_token_mock.return_value = installation_authz_factory(app_token)
+    proxy.throttle = ConcurrencyThrottle(max_concurrency=1)
+
+    def custom_matcher(request: requests.Request) -> requests.Response:
+        resp = requests.Response()
+        if request.headers["Authorization"].endswith(app_token):
+            # only the github app hits a secondary rate limit
+            resp.status_code = 429
+            resp.headers = CaseInsensitiveDict(
+                {"Retry-After": "60", "X-RateLimit-Remaining": "4000"}
+            )
+            return resp
+
+        resp.status_code = 200
+        return resp
+
+    requests_mock.add_matcher(custom_matcher)
+
+    resp = proxy._send_gh_request(
+        path=f"repos/{faker.uri_path()}", request=Request.from_values(method="GET")
+    )
+    assert resp.status_code == 200
+
+    key = (GitHubTokenOrigin.GITHUB_APP, app_name, "core")
+    assert proxy.cooldowns[key] > datetime.utcnow() + timedelta(seconds=50)
+    assert key not in proxy.rate_limited
+    assert proxy.throttle.throttled
+
+
 @mock.patch.object(GithubIntegration, "get_access_token")
 def test_send_gh_request_collects_telemetry_metrics(
     get_access_token_mock: mock.Mock,
@@ -330,6 +1082,62 @@ def test_send_gh_request_collects_telemetry_metrics(
     )
 
 
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_send_gh_request_records_rate_limit_budget_of_token(
+    get_access_token_mock: mock.Mock,
+    requests_mock: requests_mock.Mocker,
+    proxy: Proxy,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    app_name, *_ = proxy.gh_token_config.github_apps.keys()
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+
+    path = f"repos/{faker.uri_path()}"
+    requests_mock.get(
+        proxy.github_api_url + path,
+        headers={
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-reset": "1646414677",
+            "x-ratelimit-remaining": "4321",
+        },
+        status_code=200,
+    )
+
+    proxy._send_gh_request(path=path, request=Request.from_values(method="GET"))
+
+    assert proxy.budgets == {
+        (GitHubTokenOrigin.GITHUB_APP, app_name, "core"): RateLimitBudget(
+            remaining=4321,
+            reset=datetime.utcfromtimestamp(1646414677),
+            limit=5000,
+        )
+    }
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_send_gh_request_releases_upstream_of_unconsumed_streamed_response(
+    get_access_token_mock: mock.Mock,
+    requests_mock: requests_mock.Mocker,
+    proxy: Proxy,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.stream_responses = True
+    path = f"repos/{faker.uri_path()}"
+    requests_mock.get(proxy.github_api_url + path, status_code=200, content=b"foo")
+
+    with mock.patch.object(requests.Response, "close", autospec=True) as close_mock:
+        resp = proxy._send_gh_request(
+            path=path, request=Request.from_values(method="GET")
+        )
+        # The client disconnects before the body is sent
+        resp.close()
+
+    close_mock.assert_called_once()
+
+
 @pytest.mark.parametrize(
     argnames=["status_code", "expected_result"],
     argvalues=[(200, True), (401, False)],
@@ -406,7 +1214,7 @@ def test_auth_for_registered_clients(
     faker: Faker,
 ):
     token = faker.pystr()
-    proxy.client_tokens = {token: (name, scopes)}
+    proxy.authorizer = ClientAuthorizer([ProxyClient(name, token, scopes)])
     assert (proxy.auth(token, proxy_request) == name) is decision
 
 
@@ -414,5 +1222,174 @@ def test_auth_for_unnknown_client_fails(
     faker: Faker,
     proxy: Proxy,
 ):
-    proxy.client_tokens = {}
-    assert not proxy.auth(faker.pystr(), Request.from_values(method="GET", path="/zen"))
+    token = faker.pystr()
+    proxy.authorizer = ClientAuthorizer([ProxyClient(faker.word(), token)])
+    request = Request.from_values(method="GET", path="/zen")
+    assert not proxy.auth(faker.pystr(), request)
+    assert not proxy.auth(token[:-1], request)
+
+
+@pytest.mark.parametrize("maxsize, matches", [(1024, 1), (0, 2)])
+def test_client_authorizer_memoizes_decisions(maxsize: int, matches: int, faker: Faker):
+    token = faker.pystr()
+    path = mock.Mock(spec=re.Pattern)
+    path.match.return_value = True
+    authorizer = ClientAuthorizer(
+        [ProxyClient("foo", token, [ProxyClientScope(re.compile("get"), path)])],
+        maxsize=maxsize,
+    )
+
+    for _ in range(2):
+        assert authorizer.authorize(token, "GET", "/zen") == "foo"
+    assert authorizer.authorize(token, "POST", "/zen") is None
+
+    assert path.match.call_count == matches
+
+
+def test_client_authorizer_compiles_scopes_of_other_methods_lazily(faker: Faker):
+    token = faker.pystr()
+    authorizer = ClientAuthorizer(
+        [ProxyClient("foo", token, [ProxyClientScope(re.compile("HEAD"), MATCH_ALL)])]
+    )
+
+    assert authorizer.authorize(token, "HEAD", "/zen") == "foo"
+    assert authorizer.authorize(token, "GET", "/zen") is None
+
+
+@pytest.mark.parametrize(
+    "patterns, combined",
+    [
+        ([r"/repos/.*", r"/orgs/(foo|bar)$", r"/zen"], True),
+        ([r"/repos/(?P<owner>\w+)", r"/users/(?P<owner>\w+)"], False),
+        ([r"/repos/(\w+)/\1", r"/zen"], False),
+    ],
+    ids=["combined", "duplicate_group_names", "backreferences"],
+)
+def test_combine_patterns(patterns: Sequence[str], combined: bool):
+    compiled = [re.compile(pattern) for pattern in patterns]
+
+    result = combine_patterns(compiled)
+
+    assert len(result) == (1 if combined else len(patterns))
+    for path in ["/repos/x/x", "/repos/x/y", "/orgs/foo", "/orgs/foo/", "/zen", "/"]:
+        assert any(p.match(path) for p in result) == any(
+            p.match(path) for p in compiled
+        )
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_writes_to_cache_through_cache_writer(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.cache_writer = mock.Mock()
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    qs = f"{faker.word()}={faker.pystr()}"
+
+    requests_mock.get(
+        proxy.github_api_url + path, status_code=200, headers={"Etag": faker.pystr()}
+    )
+
+    request = Request.from_values(headers=[("Accept", media_type)], query_string=qs)
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    proxy.cache_writer.set.assert_called_once_with(path, qs, media_type, resp)
+    assert not proxy.cache.get(path, qs, media_type)
+
+    proxy.close()
+    proxy.cache_writer.close.assert_called_once()
+
+
+@pytest.mark.parametrize("body_size, cached", [(1024, True), (1025, False)])
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_streams_response_and_caches_it_once_sent(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+    body_size: int,
+    cached: bool,
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.stream_responses = True
+    proxy.cache_max_body_size = 1024
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    body = faker.binary(length=body_size)
+    requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=200,
+        headers={"Etag": faker.pystr()},
+        content=body,
+    )
+
+    request = Request.from_values(headers=[("Accept", media_type)])
+    resp = proxy.cached_request(path=path, request=request, client=faker.word())
+
+    assert resp.is_streamed
+    assert not proxy.cache.get(path, None, media_type)
+
+    assert b"".join(resp.iter_encoded()) == body
+    resp.close()
+
+    cached_response = proxy.cache.get(path, None, media_type)
+    assert (cached_response is not None) is cached
+    if cached_response is not None:
+        assert cached_response.data == body
+
+
+@pytest.mark.parametrize("body_size, cached", [(1024, True), (1025, False)])
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_proxy_cached_request_with_coalescing_lock_caches_streamed_response_first(
+    get_access_token_mock: mock.Mock,
+    faker: Faker,
+    proxy: Proxy,
+    requests_mock: requests_mock.Mocker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+    body_size: int,
+    cached: bool,
+):
+    get_access_token_mock.return_value = installation_authz_factory(faker.pystr())
+    proxy.stream_responses = True
+    proxy.cache_max_body_size = 1024
+    proxy.coalescing_lock_timeout = 5
+
+    path = faker.uri_path()
+    media_type = faker.mime_type()
+    body = faker.binary(length=body_size)
+    requests_mock.get(
+        proxy.github_api_url + path,
+        status_code=200,
+        headers={"Etag": faker.pystr()},
+        content=body,
+    )
+    cached_on_release = []
+
+    @contextmanager
+    def lock(*args: Any, **kwargs: Any) -> Iterator[bool]:
+        yield True
+        # what the processes waiting for the lock find in the cache
+        cached_on_release.append(proxy.cache.get(path, None, media_type))
+
+    with mock.patch.object(proxy.cache, "lock", lock):
+        resp = proxy.cached_request(
+            path=path,
+            request=Request.from_values(headers=[("Accept", media_type)]),
+            client=faker.word(),
+        )
+
+    [cached_response] = cached_on_release
+    assert (cached_response is not None) is cached
+    if cached_response is not None:
+        assert cached_response.data == body
+
+    assert b"".join(resp.iter_encoded()) == body
+    resp.close()
@@ -1,17 +1,24 @@
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 from typing import Callable
+from typing import Optional
 
 import pytest
 from faker import Faker
 from requests import Response
+from werkzeug.http import http_date
 
 from github_proxy.ratelimit import REMAINING_RATELIMIT_HEADER
 from github_proxy.ratelimit import RESET_RATELIMIT_HEADER
+from github_proxy.ratelimit import RETRY_AFTER_HEADER
+from github_proxy.ratelimit import get_ratelimit_bucket
 from github_proxy.ratelimit import get_ratelimit_limit
 from github_proxy.ratelimit import get_ratelimit_remaining
 from github_proxy.ratelimit import get_ratelimit_reset
+from github_proxy.ratelimit import get_retry_after
 from github_proxy.ratelimit import is_rate_limited
+from github_proxy.ratelimit import is_secondary_rate_limited
 
 
 def test_is_rate_limited():
@@ -28,6 +35,43 @@ def test_is_not_rate_limited():
     assert not is_rate_limited(resp)
 
 
+@pytest.mark.parametrize(
+    argnames=["status_code", "remaining", "expected_result"],
+    argvalues=[(403, "10", True), (429, None, True), (403, "0", False)],
+    ids=["forbidden", "too_many_requests", "primary_rate_limit"],
+)
+def test_is_secondary_rate_limited(
+    status_code: int, remaining: Optional[str], expected_result: bool
+):
+    resp = Response()
+    resp.status_code = status_code
+    resp.headers[RETRY_AFTER_HEADER] = "60"
+    if remaining is not None:
+        resp.headers[REMAINING_RATELIMIT_HEADER] = remaining
+    assert is_secondary_rate_limited(resp) is expected_result
+
+
+def test_is_not_secondary_rate_limited_without_retry_after():
+    resp = Response()
+    resp.status_code = 403
+    resp.headers[REMAINING_RATELIMIT_HEADER] = "10"
+    assert not is_secondary_rate_limited(resp)
+
+
+def test_get_retry_after():
+    resp = Response()
+    resp.status_code = 429
+    resp.headers[RETRY_AFTER_HEADER] = "60"
+    assert get_retry_after(resp) == 60
+
+    resp.headers[RETRY_AFTER_HEADER] = http_date(
+        datetime.now(timezone.utc) + timedelta(minutes=2)
+    )
+    retry_after = get_retry_after(resp)
+    assert retry_after is not None
+    assert 100 < retry_after <= 120
+
+
 def test_get_ratelimit_remaining(faker: Faker):
     remaining = faker.pyint()
     resp = Response()
@@ -59,3 +103,17 @@ def test_get_ratelimit_headers_without_header_existing(
     resp = Response()
     resp.status_code = 200
     assert func(resp) is None
+
+
+@pytest.mark.parametrize(
+    argnames=["path", "expected_bucket"],
+    argvalues=[
+        ("repos/foo/bar/pulls", "core"),
+        ("/graphql", "graphql"),
+        ("search/issues", "search"),
+        ("search/code", "code_search"),
+        ("repos/foo/search", "core"),
+    ],
+)
+def test_get_ratelimit_bucket(path: str, expected_bucket: str):
+    assert get_ratelimit_bucket(path) == expected_bucket
@@ -0,0 +1,78 @@
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+from faker import Faker
+
+from github_proxy.github_tokens import GitHubTokenOrigin
+from github_proxy.ratelimit import RateLimitBudget
+from github_proxy.ratelimit_store import redis_cooldowns
+from github_proxy.ratelimit_store import redis_rate_limit_budgets
+from github_proxy.ratelimit_store import redis_rate_limited
+from tests.unit.conftest import FakeRedis
+
+
+def test_redis_rate_limited_is_shared_across_stores(faker: Faker):
+    client: Any = FakeRedis()
+    key = (GitHubTokenOrigin.GITHUB_APP, faker.word(), "core")
+    reset = datetime.utcnow().replace(microsecond=0) + timedelta(minutes=30)
+
+    redis_rate_limited(client, padding=timedelta(minutes=5))[key] = reset
+
+    # Another process learns about the rate-limited token
+    rate_limited = redis_rate_limited(client, padding=timedelta(0))
+    assert key in rate_limited
+    assert rate_limited[key] == reset
+    assert list(rate_limited) == [key]
+    assert (GitHubTokenOrigin.USER, faker.word(), "core") not in rate_limited
+
+    # The entry expires upon the reset, plus the padding
+    (ttl,) = client.ttls.values()
+    assert 34 * 60 < ttl <= 35 * 60
+
+
+def test_redis_rate_limited_caches_lookups_in_process(faker: Faker):
+    client: Any = FakeRedis()
+    rate_limited = redis_rate_limited(client, padding=timedelta(0))
+    key = (GitHubTokenOrigin.USER, faker.word(), "core")
+
+    assert key not in rate_limited
+    assert key not in rate_limited
+    assert client.round_trips == 1
+
+
+def test_redis_rate_limited_skips_outdated_entries(faker: Faker):
+    client: Any = FakeRedis()
+    rate_limited = redis_rate_limited(client, padding=timedelta(0))
+
+    rate_limited[
+        (GitHubTokenOrigin.USER, faker.word(), "core")
+    ] = datetime.utcnow() - timedelta(minutes=1)
+    assert client.store == {}
+
+
+def test_redis_rate_limit_budgets_round_trip(faker: Faker):
+    client: Any = FakeRedis()
+    key = (GitHubTokenOrigin.GITHUB_APP, faker.word(), "core")
+    budget = RateLimitBudget(
+        remaining=42,
+        reset=datetime.utcnow().replace(microsecond=0) + timedelta(minutes=30),
+        limit=5000,
+    )
+
+    redis_rate_limit_budgets(client, padding=timedelta(0))[key] = budget
+
+    budgets = redis_rate_limit_budgets(client, padding=timedelta(0))
+    assert budgets[key] == budget
+
+
+def test_redis_cooldowns_expire_at_the_end_of_the_retry_after_period(faker: Faker):
+    client: Any = FakeRedis()
+    key = (GitHubTokenOrigin.GITHUB_APP, faker.word(), "core")
+
+    redis_cooldowns(client)[key] = datetime.utcnow() + timedelta(seconds=60)
+
+    assert key in redis_cooldowns(client)
+    assert key not in redis_rate_limited(client, padding=timedelta(0))
+    (ttl,) = client.ttls.values()
+    assert 59 <= ttl <= 60
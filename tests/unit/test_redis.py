@@ -0,0 +1,56 @@
+from typing import Callable
+from unittest import mock
+
+import werkzeug
+from faker import Faker
+
+from github_proxy.cache import RedisCache
+from github_proxy.config import Config
+from tests.unit.conftest import FakeRedis
+
+
+def test_redis_cache_set_many_and_get_many_take_a_round_trip(
+    faker: Faker, config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "redis://localhost:6379"
+    cache = RedisCache(config)
+    keys = [(f"{faker.uri_path()}/{i}", None, "application/json") for i in range(10)]
+
+    cache.set_many({key: werkzeug.Response(key[0]) for key in keys})
+    assert fake_redis.round_trips == 1
+
+    values = cache.get_many([*keys, ("missing", None, "application/json")])
+    assert fake_redis.round_trips == 2
+    assert [value.data.decode() for value in values[:-1]] == [  # type: ignore
+        key[0] for key in keys
+    ]
+    assert values[-1] is None
+
+
+def test_redis_cache_get_many_of_no_keys_skips_redis(
+    config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "redis://localhost:6379"
+    cache = RedisCache(config)
+
+    assert cache.get_many([]) == []
+    assert fake_redis.round_trips == 0
+
+
+def test_redis_cache_lock_expires_after_its_ttl(
+    config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "redis://localhost:6379"
+    cache = RedisCache(config)
+    fake_redis.lock = mock.Mock()  # type: ignore
+
+    with cache.lock("repos/foo/bar", None, "application/json", 5, ttl=60) as acquired:
+        assert acquired
+
+    fake_redis.lock.assert_called_once_with(  # type: ignore
+        mock.ANY, timeout=60, blocking_timeout=5
+    )
+    fake_redis.lock.return_value.release.assert_called_once()  # type: ignore
@@ -0,0 +1,124 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any
+from typing import Type
+
+import httpx
+import pytest
+import requests
+import requests_mock
+from faker import Faker
+from requests.adapters import HTTPAdapter
+
+from github_proxy.requester import HTTP2Session
+from github_proxy.requester import build_async_requester
+from github_proxy.requester import build_requester
+
+
+def requester_config(**kwargs: Any) -> Any:
+    return SimpleNamespace(
+        **{
+            "github_pool_maxsize": 64,
+            "github_pool_block": True,
+            "github_connect_timeout": 5.0,
+            "github_read_timeout": 30.0,
+            "github_retries": 3,
+            "github_retry_backoff_factor": 0.5,
+            "github_http2": False,
+            **kwargs,
+        }
+    )
+
+
+def test_build_requester_configures_connection_pool(
+    faker: Faker, requests_mock: requests_mock.Mocker
+):
+    requester = build_requester(requester_config())
+
+    adapter = requester.get_adapter("https://api.github.com")
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 64  # type: ignore
+    assert adapter._pool_block is True  # type: ignore
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.status_forcelist == (502, 503, 504)
+
+    url = faker.url()
+    requests_mock.get(url)
+    requester.request("get", url)
+    assert requests_mock.last_request is not None
+    assert requests_mock.last_request.timeout == (5.0, 30.0)
+
+
+def test_http2_session_translates_httpx_responses(faker: Faker):
+    requester = build_requester(requester_config(github_http2=True))
+    assert isinstance(requester, HTTP2Session)
+
+    sent_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent_requests.append(request)
+        time.sleep(0.01)
+        return httpx.Response(200, content=b"foo" * 1000, headers={"Etag": '"bar"'})
+
+    requester._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    resp = requester.request(
+        "get", faker.url(), params={"page": "2"}, data=b"", headers={}
+    )
+    assert sent_requests[0].url.params["page"] == "2"
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == '"bar"'
+    assert resp.content == b"foo" * 1000
+    assert resp.elapsed >= timedelta(seconds=0.01)
+
+    streamed_resp = requester.request("get", faker.url(), stream=True)
+    assert b"".join(streamed_resp.iter_content(1024)) == b"foo" * 1000
+    assert requester.connection_stats() == (0, 2)
+
+
+def test_http2_session_follows_redirects(faker: Faker):
+    requester = build_requester(requester_config(github_http2=True))
+    url, moved_url = faker.url(), faker.url()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url == url:
+            return httpx.Response(301, headers={"Location": moved_url})
+        return httpx.Response(200, content=b"foo")
+
+    requester._client = httpx.Client(  # type: ignore
+        transport=httpx.MockTransport(handler)
+    )
+
+    resp = requester.request("get", url)
+    assert resp.status_code == 200
+    assert resp.content == b"foo"
+
+
+def test_build_async_requester_follows_redirects():
+    requester = build_async_requester(requester_config())
+
+    assert requester.follow_redirects
+
+
+@pytest.mark.parametrize(
+    "error, expected_error",
+    [
+        (httpx.ConnectTimeout("timeout"), requests.Timeout),
+        (httpx.ConnectError("refused"), requests.ConnectionError),
+    ],
+)
+def test_http2_session_translates_httpx_errors(
+    faker: Faker, error: httpx.HTTPError, expected_error: Type[Exception]
+):
+    requester = build_requester(requester_config(github_http2=True))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise error
+
+    requester._client = httpx.Client(  # type: ignore
+        transport=httpx.MockTransport(handler)
+    )
+
+    with pytest.raises(expected_error):
+        requester.request("get", faker.url())
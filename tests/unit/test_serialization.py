@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+import werkzeug
+from faker import Faker
+
+from github_proxy.cache.serialization import MAGIC
+from github_proxy.cache.serialization import deserialize_value
+from github_proxy.cache.serialization import serialize_value
+
+
+def test_serialization_roundtrip_of_binary_body(faker: Faker):
+    body = os.urandom(1024)  # not valid UTF-8
+    etag = faker.pystr()
+    value = werkzeug.Response(
+        response=body,
+        status=200,
+        headers=[("Etag", etag), ("X-Foo", "ünïcödé")],
+        content_type="application/octet-stream",
+    )
+
+    serialized_value = serialize_value(value)
+    assert serialized_value.startswith(MAGIC)
+
+    deserialized_value = deserialize_value(serialized_value)
+    assert deserialized_value.data == body
+    assert deserialized_value.status_code == 200
+    assert deserialized_value.headers["Etag"] == etag
+    assert deserialized_value.headers["X-Foo"] == "ünïcödé"
+    assert deserialized_value.content_type == "application/octet-stream"
+
+
+def test_serialization_stores_body_without_escaping():
+    body = json.dumps({"foo": 'bar "baz"'}).encode()
+    value = werkzeug.Response(response=body)
+
+    assert serialize_value(value).endswith(body)
+
+
+def test_deserialization_of_json_serialized_value(faker: Faker):
+    body = faker.text()
+    etag = faker.pystr()
+    legacy_serialized_value = json.dumps([body, 200, [["Etag", etag]]]).encode()
+
+    deserialized_value = deserialize_value(legacy_serialized_value)
+    assert deserialized_value.data == body.encode()
+    assert deserialized_value.status_code == 200
+    assert deserialized_value.headers["Etag"] == etag
+
+
+def test_deserialization_of_unsupported_version():
+    serialized_value = bytearray(serialize_value(werkzeug.Response()))
+    serialized_value[len(MAGIC)] = 255
+
+    with pytest.raises(ValueError):
+        deserialize_value(bytes(serialized_value))
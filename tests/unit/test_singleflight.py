@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from github_proxy.singleflight import SingleFlight
+
+
+def test_single_flight_shares_result_of_in_flight_call():
+    single_flight = SingleFlight(timeout=5)
+    in_flight = threading.Event()
+    release = threading.Event()
+    calls: List[str] = []
+
+    def leader_call() -> str:
+        calls.append("leader")
+        in_flight.set()
+        release.wait(timeout=5)
+        return "foo"
+
+    def follower_call() -> str:
+        calls.append("follower")
+        return "bar"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", leader_call)
+        in_flight.wait(timeout=5)
+        follower = executor.submit(single_flight.do, "key", follower_call)
+        time.sleep(0.1)  # the follower is now waiting for the leader
+        release.set()
+
+    assert leader.result() == ("foo", False)
+    assert follower.result() == ("foo", True)
+    assert calls == ["leader"]
+
+
+def test_single_flight_does_not_coalesce_sequential_calls():
+    single_flight = SingleFlight()
+    assert single_flight.do("key", lambda: "foo") == ("foo", False)
+    assert single_flight.do("key", lambda: "bar") == ("bar", False)
+
+
+def test_single_flight_follower_executes_call_on_leader_timeout():
+    single_flight = SingleFlight(timeout=0.01)
+    release = threading.Event()
+    in_flight = threading.Event()
+
+    def leader_call() -> str:
+        in_flight.set()
+        release.wait(timeout=5)
+        return "foo"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(single_flight.do, "key", leader_call)
+        in_flight.wait(timeout=5)
+        assert single_flight.do("key", lambda: "bar") == ("bar", False)
+        release.set()
+        assert leader.result() == ("foo", False)
+
+
+def test_single_flight_propagates_leader_errors():
+    single_flight = SingleFlight(timeout=5)
+    in_flight = threading.Event()
+    release = threading.Event()
+
+    def leader_call() -> str:
+        in_flight.set()
+        release.wait(timeout=5)
+        raise ValueError()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", leader_call)
+        in_flight.wait(timeout=5)
+        follower = executor.submit(single_flight.do, "key", lambda: "bar")
+        time.sleep(0.1)  # the follower is now waiting for the leader
+        release.set()
+
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
@@ -0,0 +1,220 @@
+from datetime import timedelta
+from typing import Any
+from typing import Optional
+from typing import Tuple
+from unittest import mock
+
+import pytest
+import werkzeug
+from faker import Faker
+
+from github_proxy import telemetry
+from github_proxy.github_tokens import GitHubToken
+from github_proxy.github_tokens import GitHubTokenOrigin
+from github_proxy.telemetry import OpenTelemetryTelemetryCollector
+from github_proxy.telemetry import PrometheusTelemetryCollector
+from github_proxy.telemetry import TelemetryCollector
+from github_proxy.timing import Phase
+from github_proxy.timing import RequestTiming
+
+
+@pytest.fixture
+def collector() -> PrometheusTelemetryCollector:
+    prometheus_client = pytest.importorskip("prometheus_client")
+    return PrometheusTelemetryCollector(prometheus_client.CollectorRegistry())
+
+
+@pytest.fixture
+def tracing() -> Tuple[Any, Any]:
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    in_memory = pytest.importorskip(
+        "opentelemetry.sdk.trace.export.in_memory_span_exporter"
+    )
+    provider = sdk_trace.TracerProvider()
+    exporter = in_memory.InMemorySpanExporter()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    return provider, exporter
+
+
+def test_prometheus_collector_is_registered(collector: PrometheusTelemetryCollector):
+    assert isinstance(
+        TelemetryCollector.from_type("prometheus"), PrometheusTelemetryCollector
+    )
+
+
+def test_prometheus_collector_requires_prometheus_client():
+    with mock.patch.object(telemetry, "prometheus_client", None):
+        with pytest.raises(RuntimeError, match=r"github-proxy\[prometheus\]"):
+            PrometheusTelemetryCollector()
+
+
+@pytest.mark.parametrize(
+    "cache_hit, label", [(True, "hit"), (False, "miss"), (None, "uncacheable")]
+)
+def test_prometheus_collector_counts_proxy_requests(
+    cache_hit: Optional[bool],
+    label: str,
+    collector: PrometheusTelemetryCollector,
+    faker: Faker,
+):
+    client = faker.word()
+    request = werkzeug.Request.from_values(method="GET")
+
+    for _ in range(2):
+        collector.collect_proxy_request_metrics(client, request, cache_hit=cache_hit)
+
+    assert (
+        collector.registry.get_sample_value(
+            "github_proxy_requests_total",
+            {"client": client, "method": "GET", "cache_hit": label},
+        )
+        == 2
+    )
+
+
+def test_prometheus_collector_collects_github_responses(
+    collector: PrometheusTelemetryCollector, faker: Faker
+):
+    token = GitHubToken(faker.word(), GitHubTokenOrigin.USER, faker.pystr())
+    response = mock.Mock(
+        status_code=200,
+        headers={"x-ratelimit-remaining": "4321", "x-ratelimit-resource": "search"},
+        elapsed=timedelta(milliseconds=200),
+    )
+
+    collector.collect_gh_response_metrics(token, response)
+
+    labels = {"token_origin": "User", "token": token.name}
+    sample = collector.registry.get_sample_value
+    assert sample("github_proxy_github_responses_total", {**labels, "status": "200"})
+    assert sample(
+        "github_proxy_github_ratelimit_remaining", {**labels, "resource": "search"}
+    ) == pytest.approx(4321)
+    assert sample(
+        "github_proxy_github_response_seconds_bucket",
+        {"token_origin": "User", "le": "0.25"},
+    ) == pytest.approx(1)
+    assert sample(
+        "github_proxy_github_response_seconds_bucket",
+        {"token_origin": "User", "le": "0.1"},
+    ) == pytest.approx(0)
+
+
+def test_prometheus_collector_collects_cache_metrics(
+    collector: PrometheusTelemetryCollector,
+):
+    collector.collect_cache_write_queue_metrics(3)
+    collector.collect_cache_write_queue_metrics(4, dropped=True)
+    collector.collect_cache_compression_metrics("gzip", "compress", 1000, 250, 0.002)
+    collector.collect_cache_memory_metrics(
+        "inmemory", entries=2, size=512, hits=3, misses=2, evictions=0
+    )
+    collector.collect_cache_memory_metrics(
+        "inmemory", entries=2, size=640, hits=5, misses=2, evictions=1
+    )
+
+    sample = collector.registry.get_sample_value
+    assert sample("github_proxy_cache_write_queue_depth") == 4
+    assert sample("github_proxy_cache_write_drops_total") == 1
+    compression = {"encoding": "gzip", "operation": "compress"}
+    assert sample(
+        "github_proxy_cache_compression_ratio_bucket", {**compression, "le": "0.3"}
+    ) == pytest.approx(1)
+    assert sample(
+        "github_proxy_cache_compression_ratio_bucket", {**compression, "le": "0.2"}
+    ) == pytest.approx(0)
+    assert sample(
+        "github_proxy_cache_compression_seconds_count", compression
+    ) == pytest.approx(1)
+    assert sample("github_proxy_memory_cache_bytes", {"cache": "inmemory"}) == 640
+    assert (
+        sample(
+            "github_proxy_memory_cache_lookups_total",
+            {"cache": "inmemory", "result": "hit"},
+        )
+        == 5
+    )
+    assert (
+        sample("github_proxy_memory_cache_evictions_total", {"cache": "inmemory"}) == 1
+    )
+
+
+def test_prometheus_collector_collects_connection_and_timing_metrics(
+    collector: PrometheusTelemetryCollector, faker: Faker
+):
+    app = faker.word()
+    collector.collect_connection_reuse_metrics(1, 1)
+    collector.collect_connection_reuse_metrics(1, 10)
+    collector.collect_warm_up_metrics(app, 0.5)
+    timing = RequestTiming()
+    timing.phases = [Phase("cache_get", timing.start, 0.002)]
+    timing.duration = 0.2
+    collector.collect_phase_metrics(
+        faker.word(), werkzeug.Request.from_values(), timing, cache_hit=False
+    )
+
+    sample = collector.registry.get_sample_value
+    assert sample("github_proxy_github_connections_total") == 1
+    assert sample("github_proxy_github_connection_requests_total") == 10
+    assert sample("github_proxy_github_app_warm_up_seconds", {"app": app}) == 0.5
+    assert sample(
+        "github_proxy_request_phase_seconds_bucket",
+        {"phase": "cache_get", "cache_hit": "miss", "le": "0.0025"},
+    ) == pytest.approx(1)
+    assert sample(
+        "github_proxy_request_phase_seconds_sum",
+        {"phase": "total", "cache_hit": "miss"},
+    ) == pytest.approx(0.2)
+
+
+def test_prometheus_collector_renders_metrics(
+    collector: PrometheusTelemetryCollector,
+):
+    collector.collect_stale_response_metrics(werkzeug.Request.from_values(), "502")
+
+    data, content_type = collector.render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b'github_proxy_stale_responses_total{reason="502"} 1.0' in data
+
+
+def test_opentelemetry_collector_emits_spans_of_request_phases(
+    tracing: Tuple[Any, Any], faker: Faker
+):
+    provider, exporter = tracing
+    collector = OpenTelemetryTelemetryCollector(provider)
+    client = faker.word()
+    request = werkzeug.Request.from_values(
+        path="/repos/foo/bar",
+        headers=[
+            ("traceparent", "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01")
+        ],
+    )
+    timing = RequestTiming()
+    timing.start = 1000.0
+    timing.phases = [Phase("cache_get", 1000.0, 0.001), Phase("upstream", 1000.5, 0.2)]
+    timing.duration = 1.0
+
+    collector.collect_phase_metrics(client, request, timing, cache_hit=False)
+
+    cache_get, upstream, root = exporter.get_finished_spans()
+    assert root.name == "GET /repos/foo/bar"
+    assert root.parent.trace_id == 0x0AF7651916CD43DD8448EB211C80319C
+    assert root.parent.span_id == 0xB7AD6B7169203331
+    assert root.attributes["github_proxy.client"] == client
+    assert root.attributes["github_proxy.cache_hit"] == "miss"
+    assert (root.start_time, root.end_time) == (1000 * 10**9, 1001 * 10**9)
+
+    assert [cache_get.name, upstream.name] == ["cache_get", "upstream"]
+    assert cache_get.parent.span_id == upstream.parent.span_id == root.context.span_id
+    assert upstream.start_time == 1000_500_000_000
+    assert upstream.end_time - upstream.start_time == pytest.approx(
+        200_000_000, abs=1000
+    )
+
+
+def test_opentelemetry_collector_requires_opentelemetry():
+    with mock.patch.object(telemetry, "trace", None):
+        with pytest.raises(RuntimeError, match=r"github-proxy\[opentelemetry\]"):
+            OpenTelemetryTelemetryCollector()
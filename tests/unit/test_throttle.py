@@ -0,0 +1,53 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from github_proxy.throttle import ConcurrencyThrottle
+
+
+def test_throttle_does_not_cap_concurrency_unless_tripped():
+    throttle = ConcurrencyThrottle(max_concurrency=1)
+    assert not throttle.throttled
+
+    with throttle.slot(), throttle.slot():
+        pass
+
+
+def test_throttle_caps_concurrency_once_tripped():
+    throttle = ConcurrencyThrottle(max_concurrency=2)
+    throttle.trip(60)
+    assert throttle.throttled
+
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def request() -> None:
+        nonlocal running, max_running
+        with throttle.slot():
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(16):
+            executor.submit(request)
+
+    assert max_running == 2
+
+
+def test_throttle_expires():
+    throttle = ConcurrencyThrottle(max_concurrency=1)
+    throttle.trip(0.01)
+    time.sleep(0.02)
+    assert not throttle.throttled
+
+
+def test_throttle_requires_positive_concurrency():
+    with pytest.raises(ValueError):
+        ConcurrencyThrottle(max_concurrency=0)
@@ -0,0 +1,116 @@
+from typing import Callable
+from unittest import mock
+
+import werkzeug
+from faker import Faker
+
+from github_proxy.cache import CacheBackend
+from github_proxy.cache import TieredRedisCache
+from github_proxy.cache.tiered import INVALIDATION_CHANNEL
+from github_proxy.config import Config
+from tests.unit.conftest import FakeRedis
+
+
+def test_tiered_cache_factory_strips_l1_params_from_redis_url(
+    config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = (
+        "tiered+redis://localhost:6379/0?l1_max_bytes=1024&l1_ttl=5&db=1"
+    )
+
+    with mock.patch("redis.Redis.from_url", return_value=fake_redis) as from_url:
+        cache = CacheBackend.factory(config)
+
+    assert isinstance(cache, TieredRedisCache)
+    from_url.assert_called_once_with("redis://localhost:6379/0?db=1")
+    assert cache._l1.maxsize == 1024
+    assert cache._l1.ttl == 5
+
+
+def test_tiered_cache_reads_through_l1(
+    faker: Faker, config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "tiered+redis://localhost:6379"
+    cache = TieredRedisCache(config)
+    path, media_type = faker.uri_path(), faker.mime_type()
+
+    cache.set(path, None, media_type, werkzeug.Response("foo"))
+    assert len(fake_redis.store) == 1
+
+    l1_value = cache.get(path, None, media_type)
+    assert l1_value is not None
+    assert l1_value.data == b"foo"
+
+    # L1 misses are read from redis
+    cache._l1.clear()
+    l2_value = cache.get(path, None, media_type)
+    assert l2_value is not None
+    assert l2_value.data == b"foo"
+    assert len(cache._l1) == 1
+
+
+def test_tiered_cache_skips_l1_for_values_exceeding_its_budget(
+    faker: Faker, config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "tiered+redis://localhost:6379?l1_max_bytes=64"
+    cache = TieredRedisCache(config)
+    path, media_type = faker.uri_path(), faker.mime_type()
+
+    cache.set(path, None, media_type, werkzeug.Response("foo" * 100))
+
+    assert len(cache._l1) == 0
+    value = cache.get(path, None, media_type)
+    assert value is not None
+    assert value.data == b"foo" * 100
+
+
+def test_tiered_cache_invalidates_l1_of_other_processes(
+    faker: Faker, config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "tiered+redis://localhost:6379?l1_invalidation=pubsub"
+    fake_redis.pubsub = mock.Mock()  # type: ignore
+    cache = TieredRedisCache(config)
+    other_cache = TieredRedisCache(config)
+    path, media_type = faker.uri_path(), faker.mime_type()
+
+    other_cache.set(path, None, media_type, werkzeug.Response("foo"))
+    cache.set(path, None, media_type, werkzeug.Response("bar"))
+
+    # the message published by the cache itself is ignored
+    (channel, message), *_ = fake_redis.published[1:]
+    assert channel == INVALIDATION_CHANNEL
+    cache._on_invalidation({"data": message.encode()})
+    assert len(cache._l1) == 1
+
+    other_cache._on_invalidation({"data": message.encode()})
+    assert len(other_cache._l1) == 0
+    other_value = other_cache.get(path, None, media_type)
+    assert other_value is not None
+    assert other_value.data == b"bar"
+
+
+def test_tiered_cache_get_many_reads_l1_misses_from_redis(
+    faker: Faker, config_factory: Callable[..., Config], fake_redis: FakeRedis
+):
+    config = config_factory()
+    config.cache_backend_url = "tiered+redis://localhost:6379"
+    cache = TieredRedisCache(config)
+    keys = [(f"{faker.uri_path()}/{i}", None, "application/json") for i in range(3)]
+    cache.set_many({key: werkzeug.Response(key[0]) for key in keys})
+    cache._l1.pop(cache._make_key(*keys[0]))
+    fake_redis.round_trips = 0
+
+    values = cache.get_many(keys)
+
+    assert [value.data.decode() for value in values] == [  # type: ignore
+        key[0] for key in keys
+    ]
+    assert fake_redis.round_trips == 1
+    assert len(cache._l1) == 3
+
+    cache.get_many(keys)
+    assert fake_redis.round_trips == 1
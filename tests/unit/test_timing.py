@@ -0,0 +1,41 @@
+import re
+import time
+
+from github_proxy.timing import request_timing
+from github_proxy.timing import timed
+
+
+def test_request_timing_records_phases_in_order():
+    before = time.time()
+    with request_timing() as timing:
+        with timed("cache_get"):
+            pass
+        with timed("upstream"):
+            time.sleep(0.01)
+
+    assert [phase.name for phase in timing.phases] == ["cache_get", "upstream"]
+    cache_get, upstream = timing.phases
+    assert before <= timing.start <= cache_get.start <= upstream.start
+    assert upstream.duration >= 0.01
+    assert timing.duration is not None
+    assert timing.duration >= cache_get.duration + upstream.duration
+
+
+def test_timed_is_noop_outside_of_request_timing():
+    with request_timing() as timing:
+        pass
+
+    with timed("upstream"):
+        pass
+
+    assert timing.phases == []
+
+
+def test_request_timing_server_timing():
+    with request_timing() as timing:
+        with timed("token"):
+            pass
+
+    assert re.fullmatch(
+        r"token;dur=\d+\.\d{3}, total;dur=\d+\.\d{3}", timing.server_timing()
+    )
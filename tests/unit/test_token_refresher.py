@@ -0,0 +1,112 @@
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import Callable
+from unittest import mock
+
+from faker import Faker
+from github import GithubIntegration
+from github.InstallationAuthorization import InstallationAuthorization
+
+from github_proxy.config import Config
+from github_proxy.github_tokens import construct_installed_integration
+from github_proxy.token_refresher import InstallationTokenRefresher
+from tests.unit.conftest import FakeRedis
+
+
+def make_authz(token: str, expires_in: timedelta) -> InstallationAuthorization:
+    return InstallationAuthorization(
+        requester=None,  # type: ignore
+        headers={},
+        attributes={
+            "token": token,
+            "expires_at": (datetime.utcnow() + expires_in).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            ),
+        },
+        completed=True,
+    )
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_refresher_mints_missing_tokens_ahead_of_requests(
+    create_token_mock: mock.Mock,
+    config: Config,
+    faker: Faker,
+    installation_authz_factory: Callable[..., InstallationAuthorization],
+):
+    mock_token = faker.pystr()
+    create_token_mock.return_value = installation_authz_factory(mock_token)
+    app_name, *_ = config.github_apps.keys()
+    ghi, installation_id = construct_installed_integration(
+        app_name, config, config.github_api_url
+    )
+    refresher = InstallationTokenRefresher(
+        lambda: {app_name: (ghi, installation_id)}, 60
+    )
+
+    refresher.refresh()
+    create_token_mock.assert_called_once()
+
+    # Requests are served by the renewed token, and the fresh token is kept
+    assert ghi.get_access_token(installation_id=installation_id).token == mock_token
+    refresher.refresh()
+    create_token_mock.assert_called_once()
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_refresher_renews_tokens_about_to_expire(
+    create_token_mock: mock.Mock, config: Config, faker: Faker
+):
+    renewed_token = faker.pystr()
+    create_token_mock.return_value = make_authz(renewed_token, timedelta(hours=1))
+    app_name, *_ = config.github_apps.keys()
+    ghi, installation_id = construct_installed_integration(
+        app_name, config, config.github_api_url
+    )
+    ghi.set_access_token(  # type: ignore
+        installation_id, make_authz(faker.pystr(), timedelta(minutes=1))
+    )
+
+    InstallationTokenRefresher(lambda: {app_name: (ghi, installation_id)}, 60).refresh()
+
+    assert ghi.get_access_token(installation_id=installation_id).token == renewed_token
+
+
+@mock.patch.object(GithubIntegration, "get_access_token")
+def test_refreshers_share_tokens_through_redis(
+    create_token_mock: mock.Mock, config: Config, faker: Faker
+):
+    client: Any = FakeRedis()
+    mock_token = faker.pystr()
+    create_token_mock.return_value = make_authz(mock_token, timedelta(hours=1))
+    app_name, *_ = config.github_apps.keys()
+
+    integrations = [
+        construct_installed_integration(app_name, config, config.github_api_url)
+        for _ in range(2)
+    ]
+    for ghi, installation_id in integrations:
+        InstallationTokenRefresher(
+            lambda: {app_name: (ghi, installation_id)}, 60, client=client
+        ).refresh()
+        assert ghi.get_access_token(installation_id=installation_id).token == (
+            mock_token
+        )
+
+    # The second process reused the token minted by the first one
+    create_token_mock.assert_called_once()
+
+    # The token is shared under a key of its own, until its expiration
+    (key,) = client.store
+    assert key == f"installation-token:{app_name}:{installation_id}"
+    assert 59 * 60 < client.ttls[key] <= 60 * 60
+
+
+def test_refresher_runs_in_the_background(config: Config):
+    refresher = InstallationTokenRefresher(lambda: {}, 60)
+    with mock.patch.object(refresher, "refresh") as refresh_mock:
+        refresher.start()
+        refresher.stop(timeout=5)
+
+    refresh_mock.assert_called_once()